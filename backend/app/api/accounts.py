@@ -1,17 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from decimal import Decimal
 
-from app.database import get_db
-from app.models.user import User, RoleEnum
+from app.database import get_db, get_async_db
+from app.models.user import RoleEnum
 from app.models.account import Account
+from app.models.ledger import ACCOUNT_BOOK
 from app.models.savings_goal import SavingsGoal
-from app.api.auth import get_current_user, require_roles
+from app.api.auth import (
+    get_current_user,
+    require_roles,
+    get_current_user_async,
+    require_roles_async,
+    get_read_db,
+    get_read_db_async,
+)
+from app.utils import balance_shards, ledger
+from app.utils.balance_shards import BALANCE_SHARDS_MAX
+from app.utils.db_retry import retry_on_conflict, run_sync_with_retry
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/accounts", tags=["accounts"])
+async_router = APIRouter(prefix="/api/accounts", tags=["accounts"])
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class ActivateRequest(BaseModel):
     active: bool
@@ -20,18 +34,23 @@ class ActivateRequest(BaseModel):
 class BalanceUpdateRequest(BaseModel):
     balance: float
 
+
+class ShardCountRequest(BaseModel):
+    # 0 turns sharding off and folds the shards back into the balance.
+    shards: int = Field(..., ge=0, le=BALANCE_SHARDS_MAX)
+
 def _mask_card(card: str | None) -> str | None:
     if not card or len(card) < 8:
         return card
     return f"{card[:4]} **** **** {card[-4:]}"
 
 @router.get("/me")
-def my_account(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def my_account(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_read_db)):
     acct = db.query(Account).filter(Account.user_id == current_user.id).first()
     if not acct:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    raw_balance = Decimal(str(acct.balance or Decimal("0.00")))
+    raw_balance = balance_shards.total_balance(db, acct)
     total_goals = (
         db.query(func.coalesce(func.sum(SavingsGoal.current_amount), 0))
         .filter(SavingsGoal.user_id == current_user.id)
@@ -53,7 +72,7 @@ def my_account(current_user: User = Depends(get_current_user), db: Session = Dep
 @router.patch("/activate")
 def activate_my_card(
     payload: ActivateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     acct = db.query(Account).filter(Account.user_id == current_user.id).first()
@@ -70,7 +89,7 @@ def activate_my_card(
 def admin_activate_card(
     user_id: int,
     payload: ActivateRequest,
-    _: User = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
     db: Session = Depends(get_db)
 ):
     acct = db.query(Account).filter(Account.user_id == user_id).first()
@@ -85,14 +104,14 @@ def admin_activate_card(
 @router.get("/admin/{user_id}")
 def admin_get_account(
     user_id: int,
-    _: User = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
     db: Session = Depends(get_db),
 ):
     acct = db.query(Account).filter(Account.user_id == user_id).first()
     if not acct:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    raw_balance = Decimal(str(acct.balance or Decimal("0.00")))
+    raw_balance = balance_shards.total_balance(db, acct)
     total_goals = (
         db.query(func.coalesce(func.sum(SavingsGoal.current_amount), 0))
         .filter(SavingsGoal.user_id == user_id)
@@ -109,17 +128,19 @@ def admin_get_account(
         "raw_balance": str(raw_balance),
         "card_number": _mask_card(acct.card_number),
         "card_active": acct.card_active,
+        "shard_count": acct.shard_count,
     }
 
 
 @router.put("/admin/{user_id}/balance")
+@retry_on_conflict
 def admin_update_balance(
     user_id: int,
     payload: BalanceUpdateRequest,
-    _: User = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
     db: Session = Depends(get_db),
 ):
-    acct = db.query(Account).filter(Account.user_id == user_id).first()
+    acct = db.query(Account).filter(Account.user_id == user_id).with_for_update().first()
     if not acct:
         raise HTTPException(status_code=404, detail="Account not found")
 
@@ -131,12 +152,18 @@ def admin_update_balance(
     if new_balance < 0:
         raise HTTPException(status_code=400, detail="Balance cannot be negative")
 
+    # The new balance replaces the whole balance, shards included.
+    if acct.shard_count:
+        balance_shards.consolidate(db, acct)
+    delta = new_balance - Decimal(acct.balance or 0)
     acct.balance = new_balance
     db.add(acct)
+    if delta:
+        ledger.post(db, ledger.adjustment((ACCOUNT_BOOK, acct.id), delta))
     db.commit()
     db.refresh(acct)
 
-    raw_balance = Decimal(str(acct.balance or Decimal("0.00")))
+    raw_balance = balance_shards.total_balance(db, acct)
     total_goals = (
         db.query(func.coalesce(func.sum(SavingsGoal.current_amount), 0))
         .filter(SavingsGoal.user_id == user_id)
@@ -153,4 +180,83 @@ def admin_update_balance(
         "raw_balance": str(raw_balance),
         "card_number": _mask_card(acct.card_number),
         "card_active": acct.card_active,
+        "shard_count": acct.shard_count,
+    }
+
+
+@router.put("/admin/{user_id}/shards")
+@retry_on_conflict
+def admin_set_balance_shards(
+    user_id: int,
+    payload: ShardCountRequest,
+    _: Principal = Depends(require_roles([RoleEnum.admin])),
+    db: Session = Depends(get_db),
+):
+    """Spread a hot receiver's incoming transfers over payload.shards balance rows."""
+    acct = db.query(Account).filter(Account.user_id == user_id).with_for_update().first()
+    if not acct:
+        raise HTTPException(status_code=404, detail="Account not found")
+    balance_shards.set_shard_count(db, acct, payload.shards)
+    db.commit()
+    db.refresh(acct)
+    return {
+        "user_id": user_id,
+        "shard_count": acct.shard_count,
+        "raw_balance": str(balance_shards.total_balance(db, acct)),
     }
+
+
+@async_router.get("/me")
+async def my_account_async(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+    return await db.run_sync(lambda s: my_account(current_user=current_user, db=s))
+
+
+@async_router.patch("/activate")
+async def activate_my_card_async(
+    payload: ActivateRequest,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: activate_my_card(payload, current_user=current_user, db=s))
+
+
+@async_router.patch("/{user_id}/activate")
+async def admin_activate_card_async(
+    user_id: int,
+    payload: ActivateRequest,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: admin_activate_card(user_id, payload, db=s))
+
+
+@async_router.get("/admin/{user_id}")
+async def admin_get_account_async(
+    user_id: int,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: admin_get_account(user_id, db=s))
+
+
+@async_router.put("/admin/{user_id}/balance")
+async def admin_update_balance_async(
+    user_id: int,
+    payload: BalanceUpdateRequest,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(db, lambda s: admin_update_balance(user_id, payload, db=s))
+
+
+@async_router.put("/admin/{user_id}/shards")
+async def admin_set_balance_shards_async(
+    user_id: int,
+    payload: ShardCountRequest,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(db, lambda s: admin_set_balance_shards(user_id, payload, db=s))
@@ -2,90 +2,245 @@ from datetime import datetime, timedelta
 import secrets
 from typing import Optional, Callable, List
 
-from fastapi import APIRouter, Depends, HTTPException, status, Security
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Security
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, get_async_db, open_read_session, open_async_read_session
 from app.models.user import User, RoleEnum
 from app.models.account import Account
-from app.schemas.user import UserRegister, LoginSchema, UserResponse
-from app.utils.security import hash_password, verify_password
+from app.schemas.user import UserRegister, LoginSchema, UserResponse, UserImportResult
+from app.utils.access_tokens import (
+    ACCESS_TOKEN_TTL,
+    SIGNED_TOKENS,
+    is_signed_token,
+    issue_access_token,
+    verify_access_token,
+)
+from app.utils.password_pool import PasswordPool, PasswordPoolBusy
+from app.utils.principal_cache import Principal, PrincipalCache
+from app.utils.security import hash_password, verify_and_rehash
+from app.utils.session_store import SessionRecord, build_session_store
+from app.utils.user_import import UserImporter, unique_violation_detail
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
+async_router = APIRouter(prefix="/api/auth", tags=["auth"])
 security = HTTPBearer()
 
-SESSIONS: dict[str, dict] = {}
+session_store = build_session_store()
+principal_cache = PrincipalCache()
+password_pool = PasswordPool()
 SESSION_EXPIRE_HOURS = 24
 
 
 def _create_session_token(user_id: int) -> str:
-    """Create a new in-memory session token."""
+    """Create a new session token in the configured session store."""
     token = secrets.token_urlsafe(32)
     expires_at = datetime.utcnow() + timedelta(hours=SESSION_EXPIRE_HOURS)
-    SESSIONS[token] = {"user_id": user_id, "expires_at": expires_at}
+    session_store.save(token, SessionRecord(user_id, expires_at))
     return token
 
 
 def _get_session_user_id(token: str) -> Optional[int]:
     """Retrieve the user ID from an active session token."""
-    data = SESSIONS.get(token)
-    if not data or data["expires_at"] < datetime.utcnow():
-        SESSIONS.pop(token, None)
+    record = session_store.get(token)
+    if not record or record.expires_at < datetime.utcnow():
+        if record:
+            session_store.delete(token)
         return None
-    return data["user_id"]
+    return record.user_id
 
 
 def _delete_session(token: str):
-    
-    SESSIONS.pop(token, None)
+    principal_cache.invalidate_token(token)
+    session_store.delete(token)
 
 
+def _delete_user_sessions(user_id: int) -> int:
+    principal_cache.invalidate_user(user_id)
+    return session_store.delete_user_sessions(user_id)
+
+
+async def _get_session_user_id_async(token: str) -> Optional[int]:
+    if session_store.blocking:
+        return await run_in_threadpool(_get_session_user_id, token)
+    return _get_session_user_id(token)
+
+
+def _signed_principal(token: str) -> Principal:
+    principal = verify_access_token(token)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired access token")
+    return principal
+
+
+def _token_user_id(token: str) -> Optional[int]:
+    if SIGNED_TOKENS:
+        principal = verify_access_token(token)
+        return principal.id if principal else None
+    return _get_session_user_id(token)
+
+
+async def _token_user_id_async(token: str) -> Optional[int]:
+    if SIGNED_TOKENS:
+        principal = verify_access_token(token)
+        return principal.id if principal else None
+    return await _get_session_user_id_async(token)
+
+def _load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    row = (
+        db.query(User.id, User.role, User.is_active, User.display_name)
+        .filter(User.id == user_id)
+        .first()
+    )
+    return Principal(*row) if row else None
+
+
+def _cached_principal(token: str, user_id: int) -> Optional[Principal]:
+    principal = principal_cache.get(token)
+    if principal is not None and principal.id != user_id:
+        principal_cache.invalidate_token(token)
+        return None
+    return principal
+
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Security(security),
     db: Session = Depends(get_db),
-) -> User:
-    
+) -> Principal:
+    """Resolve the caller to a cached Principal; only a cache miss queries the database."""
     if not credentials:
         raise HTTPException(status_code=401, detail="Missing authorization token")
 
     token = credentials.credentials
+    if SIGNED_TOKENS:
+        # Refresh tokens are not accepted as bearer tokens in this mode.
+        principal = _signed_principal(token)
+        db.info["user_id"] = principal.id
+        return principal
+
     user_id = _get_session_user_id(token)
     if not user_id:
         raise HTTPException(status_code=401, detail="Invalid or expired session token")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    principal = _cached_principal(token, user_id)
+    if principal is None:
+        principal = _load_principal(db, user_id)
+        if not principal:
+            raise HTTPException(status_code=401, detail="User not found")
+        principal_cache.put(token, principal)
+
+    db.info["user_id"] = principal.id
+    return principal
+
+
+def get_current_user_model(
+    principal: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> User:
+    """The caller's full User row, for routes that read or modify the profile."""
+    user = db.get(User, principal.id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-
     return user
 
 
 def require_roles(allowed_roles: List[RoleEnum]) -> Callable:
     """Restrict access based on user roles."""
-    def _role_checker(current_user: User = Depends(get_current_user)):
+    def _role_checker(current_user: Principal = Depends(get_current_user)):
         if current_user.role not in allowed_roles:
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return current_user
     return _role_checker
 
 
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    db: AsyncSession = Depends(get_async_db),
+) -> Principal:
+    """Async twin of get_current_user."""
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Missing authorization token")
 
-@router.post("/register", response_model=UserResponse, status_code=201)
-def register(payload: UserRegister, db: Session = Depends(get_db)):
-    """Register a new user and auto-create their account."""
-    if db.query(User).filter(User.email == payload.email).first():
-        raise HTTPException(status_code=400, detail="Email already registered")
-    if db.query(User).filter(User.username == payload.username).first():
-        raise HTTPException(status_code=400, detail="Username already taken")
-    if db.query(User).filter(User.phone_number == payload.phone_number).first():
-        raise HTTPException(status_code=400, detail="Phone number already registered")
+    token = credentials.credentials
+    if SIGNED_TOKENS:
+        principal = _signed_principal(token)
+        db.info["user_id"] = principal.id
+        return principal
+
+    user_id = await _get_session_user_id_async(token)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired session token")
+
+    principal = _cached_principal(token, user_id)
+    if principal is None:
+        principal = await db.run_sync(_load_principal, user_id)
+        if not principal:
+            raise HTTPException(status_code=401, detail="User not found")
+        principal_cache.put(token, principal)
+
+    db.info["user_id"] = principal.id
+    return principal
+
+
+async def get_current_user_model_async(
+    principal: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """Async twin of get_current_user_model; the user is attached to the request's AsyncSession."""
+    user = await db.get(User, principal.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
+def get_read_db(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    db: Session = Depends(get_db),
+):
+    """Session for read-only endpoints: the replica, unless the caller wrote recently."""
+    user_id = _token_user_id(credentials.credentials) if credentials else None
+    replica = open_read_session(user_id)
+    if replica is None:
+        yield db
+        return
+    try:
+        yield replica
+    finally:
+        replica.close()
+
+
+async def get_read_db_async(
+    credentials: HTTPAuthorizationCredentials = Security(security),
+    db: AsyncSession = Depends(get_async_db),
+):
+    user_id = await _token_user_id_async(credentials.credentials) if credentials else None
+    replica = open_async_read_session(user_id)
+    if replica is None:
+        yield db
+        return
+    async with replica:
+        yield replica
+
+
+def require_roles_async(allowed_roles: List[RoleEnum]) -> Callable:
+    """Restrict access based on user roles (async routers)."""
+    async def _role_checker(current_user: Principal = Depends(get_current_user_async)):
+        if current_user.role not in allowed_roles:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return current_user
+    return _role_checker
+
+
+def _create_user_with_account(db: Session, payload: UserRegister, hashed_password: str) -> UserResponse:
     user = User(
         email=payload.email,
         username=payload.username,
-        hashed_password=hash_password(payload.password),
+        hashed_password=hashed_password,
         first_name=payload.first_name,
         last_name=payload.last_name,
         phone_number=payload.phone_number,
@@ -94,35 +249,77 @@ def register(payload: UserRegister, db: Session = Depends(get_db)):
         display_name=f"{payload.first_name} {payload.last_name}".strip() or payload.username,
         role=payload.role,
     )
+    # Create a bare account with zero balance and no card; cards will be created only when ordered
+    user.account = Account(balance=0, card_number=None, card_active=False)
     db.add(user)
+    # One round trip per row and no uniqueness probes: a duplicate email,
+    # username or phone surfaces as a constraint violation.
+    try:
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        detail = unique_violation_detail(exc)
+        if detail is None:
+            raise
+        raise HTTPException(status_code=400, detail=detail)
+    # Serialize before commit so the response needs no reload of the new row.
+    response = UserResponse.model_validate(user)
     db.commit()
-    db.refresh(user)
+    return response
 
-    # Create a bare account with zero balance and no card; cards will be created only when ordered
-    account = Account(
-        user_id=user.id,
-        balance=0,
-        card_number=None,
-        card_active=False,
+
+def _password_pool_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-ins in progress, please retry shortly",
+        headers={"Retry-After": "1"},
     )
-    db.add(account)
-    db.commit()
-    db.refresh(account)
-    user.account = account
-    return user
 
 
-@router.post("/login")
-def login(payload: LoginSchema, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == payload.username).first()
+def _run_password_task(fn, *args):
+    try:
+        return password_pool.run(fn, *args)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+
+
+async def _run_password_task_async(fn, *args):
+    try:
+        return await password_pool.run_async(fn, *args)
+    except PasswordPoolBusy:
+        raise _password_pool_busy()
+
+
+@router.post("/register", response_model=UserResponse, status_code=201)
+def register(payload: UserRegister, db: Session = Depends(get_db)):
+    """Register a new user and auto-create their account."""
+    hashed = _run_password_task(hash_password, payload.password)
+    return _create_user_with_account(db, payload, hashed)
+
+
+def _find_login_user(db: Session, login: str) -> Optional[User]:
+    user = db.query(User).filter(User.username == login).first()
     if not user:
-        user = db.query(User).filter(User.email == payload.username).first()
+        user = db.query(User).filter(User.email == login).first()
+    return user
 
-    if not user or not verify_password(payload.password, user.hashed_password):
-        raise HTTPException(status_code=401, detail="Invalid username/email or password")
 
-    token = _create_session_token(user.id)
+def _store_rehash(db: Session, user: User, new_hash: str) -> None:
+    user.hashed_password = new_hash
+    db.commit()
+
+
+def _access_token_response(principal: Principal) -> dict:
     return {
+        "access_token": issue_access_token(principal),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL,
+    }
+
+
+def _login_response(user: User) -> dict:
+    token = _create_session_token(user.id)
+    response = {
         "session_token": token,
         "user": {
             "id": user.id,
@@ -131,25 +328,87 @@ def login(payload: LoginSchema, db: Session = Depends(get_db)):
             "role": user.role.value if isinstance(user.role, RoleEnum) else str(user.role),
         },
     }
+    if SIGNED_TOKENS:
+        # The stored session becomes the refresh token; the bearer token clients
+        # already send (session_token) is the short-lived signed one.
+        response.update(_access_token_response(Principal.from_user(user)))
+        response["refresh_token"] = token
+        response["session_token"] = response["access_token"]
+    return response
+
+
+@router.post("/login")
+def login(payload: LoginSchema, db: Session = Depends(get_db)):
+    user = _find_login_user(db, payload.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid username/email or password")
+    ok, new_hash = _run_password_task(verify_and_rehash, payload.password, user.hashed_password)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid username/email or password")
+    if new_hash:
+        _store_rehash(db, user, new_hash)
+    return _login_response(user)
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+def _refresh_principal(db: Session, refresh_token: str, user_id: Optional[int]) -> Principal:
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    principal = _cached_principal(refresh_token, user_id)
+    if principal is None:
+        principal = _load_principal(db, user_id)
+        if not principal:
+            raise HTTPException(status_code=401, detail="User not found")
+        principal_cache.put(refresh_token, principal)
+    return principal
+
+
+def _ensure_signed_tokens() -> None:
+    if not SIGNED_TOKENS:
+        raise HTTPException(status_code=404, detail="Signed access tokens are disabled")
+
+
+@router.post("/refresh")
+def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+    """Trade a refresh token for a new short-lived access token (AUTH_TOKEN_MODE=signed)."""
+    _ensure_signed_tokens()
+    user_id = _get_session_user_id(payload.refresh_token)
+    return _access_token_response(_refresh_principal(db, payload.refresh_token, user_id))
 
 
 @router.post("/logout")
-def logout(credentials: HTTPAuthorizationCredentials = Security(security)):
-    """Logout the current session."""
+def logout(
+    payload: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Security(security),
+):
+    """Logout the current session (and revoke the refresh token, if one is sent)."""
     token = credentials.credentials
-    _delete_session(token)
+    if not is_signed_token(token):
+        _delete_session(token)
+    if payload is not None:
+        _delete_session(payload.refresh_token)
     return {"message": "Logged out successfully"}
 
 
+@router.post("/logout-all")
+def logout_all(current_user: Principal = Depends(get_current_user)):
+    """Revoke every session of the current user, on every device."""
+    revoked = _delete_user_sessions(current_user.id)
+    return {"message": "Logged out of all sessions", "revoked": revoked}
+
+
 @router.get("/me", response_model=UserResponse)
-def me(current_user: User = Depends(get_current_user)):
+def me(current_user: User = Depends(get_current_user_model)):
     """Return the currently logged-in user's profile."""
     return current_user
 
 
 @router.get("/admin/users")
 def list_users(
-    current_user: User = Depends(require_roles([RoleEnum.admin])),
+    current_user: Principal = Depends(require_roles([RoleEnum.admin])),
     db: Session = Depends(get_db),
 ):
     """Admin-only: List all users."""
@@ -168,6 +427,36 @@ def list_users(
     ]
 
 
+def _import_format(request: Request, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+
+
+def _new_user_importer() -> UserImporter:
+    return UserImporter(hash_many=lambda passwords: password_pool.map(hash_password, passwords))
+
+
+def _import_batch(db: Session, importer: UserImporter, batch: list) -> None:
+    rows = importer.drop_existing(db, importer.validate(batch))
+    importer.hash_passwords(rows)
+    importer.insert(db, rows)
+
+
+@router.post("/admin/users/import", response_model=UserImportResult)
+async def import_users(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    _: Principal = Depends(require_roles([RoleEnum.admin])),
+    db: Session = Depends(get_db),
+):
+    """Admin-only: create users and accounts from a streamed CSV (with header row) or NDJSON body."""
+    importer = _new_user_importer()
+    async for batch in importer.batches(request.stream(), _import_format(request, fmt)):
+        await run_in_threadpool(_import_batch, db, importer, batch)
+    return importer.report()
+
+
 class UserStatusUpdate(BaseModel):
     is_active: bool
 
@@ -176,16 +465,24 @@ class UserStatusUpdate(BaseModel):
 def update_user_status(
     user_id: int,
     payload: UserStatusUpdate,
-    _: User = Depends(require_roles([RoleEnum.admin])),
+    _: Principal = Depends(require_roles([RoleEnum.admin])),
     db: Session = Depends(get_db),
 ):
+    result = _set_user_active(db, user_id, payload.is_active)
+    if not payload.is_active:
+        _delete_user_sessions(user_id)
+    return result
+
+
+def _set_user_active(db: Session, user_id: int, is_active: bool) -> dict:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    user.is_active = payload.is_active
+    user.is_active = is_active
     db.add(user)
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate_user(user.id)
     return {"id": user.id, "is_active": user.is_active}
 
 
@@ -197,7 +494,7 @@ class UserRoleUpdate(BaseModel):
 def update_user_role(
     user_id: int,
     payload: UserRoleUpdate,
-    _: User = Depends(require_roles([RoleEnum.admin])),
+    _: Principal = Depends(require_roles([RoleEnum.admin])),
     db: Session = Depends(get_db),
 ):
     user = db.query(User).filter(User.id == user_id).first()
@@ -208,7 +505,122 @@ def update_user_role(
     db.add(user)
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate_user(user.id)
     return {
         "id": user.id,
         "role": user.role.value if isinstance(user.role, RoleEnum) else str(user.role),
     }
+
+
+# Async routers: the ORM work runs through AsyncSession.run_sync so the request
+# never occupies a threadpool worker while waiting on the database. Password
+# hashing runs in the password process pool, awaited without holding a thread.
+
+
+@async_router.post("/register", response_model=UserResponse, status_code=201)
+async def register_async(payload: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    """Register a new user and auto-create their account."""
+    hashed = await _run_password_task_async(hash_password, payload.password)
+    return await db.run_sync(_create_user_with_account, payload, hashed)
+
+
+@async_router.post("/login")
+async def login_async(payload: LoginSchema, db: AsyncSession = Depends(get_async_db)):
+    user = await db.run_sync(_find_login_user, payload.username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid username/email or password")
+    ok, new_hash = await _run_password_task_async(verify_and_rehash, payload.password, user.hashed_password)
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid username/email or password")
+    if new_hash:
+        await db.run_sync(_store_rehash, user, new_hash)
+    if session_store.blocking:
+        return await run_in_threadpool(_login_response, user)
+    return _login_response(user)
+
+
+@async_router.post("/refresh")
+async def refresh_async(payload: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Trade a refresh token for a new short-lived access token (AUTH_TOKEN_MODE=signed)."""
+    _ensure_signed_tokens()
+    user_id = await _get_session_user_id_async(payload.refresh_token)
+    principal = await db.run_sync(_refresh_principal, payload.refresh_token, user_id)
+    return _access_token_response(principal)
+
+
+@async_router.post("/logout")
+async def logout_async(
+    payload: Optional[RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Security(security),
+):
+    """Logout the current session (and revoke the refresh token, if one is sent)."""
+    if session_store.blocking:
+        return await run_in_threadpool(logout, payload, credentials)
+    return logout(payload, credentials)
+
+
+@async_router.post("/logout-all")
+async def logout_all_async(current_user: Principal = Depends(get_current_user_async)):
+    """Revoke every session of the current user, on every device."""
+    if session_store.blocking:
+        revoked = await run_in_threadpool(_delete_user_sessions, current_user.id)
+    else:
+        revoked = _delete_user_sessions(current_user.id)
+    return {"message": "Logged out of all sessions", "revoked": revoked}
+
+
+@async_router.get("/me", response_model=UserResponse)
+async def me_async(current_user: User = Depends(get_current_user_model_async)):
+    """Return the currently logged-in user's profile."""
+    return current_user
+
+
+@async_router.get("/admin/users")
+async def list_users_async(
+    current_user: Principal = Depends(require_roles_async([RoleEnum.admin])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Admin-only: List all users."""
+    return await db.run_sync(lambda s: list_users(current_user=current_user, db=s))
+
+
+@async_router.post("/admin/users/import", response_model=UserImportResult)
+async def import_users_async(
+    request: Request,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    _: Principal = Depends(require_roles_async([RoleEnum.admin])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Admin-only: create users and accounts from a streamed CSV (with header row) or NDJSON body."""
+    importer = _new_user_importer()
+    async for batch in importer.batches(request.stream(), _import_format(request, fmt)):
+        rows = await db.run_sync(lambda s: importer.drop_existing(s, importer.validate(batch)))
+        await run_in_threadpool(importer.hash_passwords, rows)
+        await db.run_sync(importer.insert, rows)
+    return importer.report()
+
+
+@async_router.put("/admin/users/{user_id}/status")
+async def update_user_status_async(
+    user_id: int,
+    payload: UserStatusUpdate,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    result = await db.run_sync(_set_user_active, user_id, payload.is_active)
+    if not payload.is_active:
+        if session_store.blocking:
+            await run_in_threadpool(_delete_user_sessions, user_id)
+        else:
+            _delete_user_sessions(user_id)
+    return result
+
+
+@async_router.put("/admin/users/{user_id}/role")
+async def update_user_role_async(
+    user_id: int,
+    payload: UserRoleUpdate,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: update_user_role(user_id, payload, db=s))
@@ -1,36 +1,84 @@
 import random
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
-from app.api.auth import get_current_user, require_roles
-from app.database import get_db
+from app.api.auth import (
+    get_current_user,
+    get_current_user_model,
+    require_roles,
+    get_current_user_async,
+    get_current_user_model_async,
+    require_roles_async,
+    get_read_db,
+    get_read_db_async,
+)
+from app.database import get_db, get_async_db
 from app.models.card import Card, CardStatus, CardType
+from app.models.ledger import CARD_BOOK
 from app.models.user import User, RoleEnum
 from app.schemas.card import CardOrderRequest, CardResponse, CardStatusUpdate
 from app.utils.cards import generate_unique_card_number
+from app.utils import ledger
+from app.utils.db_retry import retry_on_conflict, run_sync_with_retry
+from app.utils.fast_json import rows_response
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/cards", tags=["cards"])
+async_router = APIRouter(prefix="/api/cards", tags=["cards"])
 
 
-@router.get("", response_model=list[CardResponse])
-def list_cards(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
-    return (
-        db.query(Card)
-        .filter(Card.user_id == current_user.id)
+_LIST_COLUMNS = (
+    Card.id,
+    Card.user_id,
+    Card.design_slug,
+    Card.theme,
+    Card.card_type,
+    Card.holder_name,
+    Card.card_number,
+    Card.expiry_month,
+    Card.expiry_year,
+    Card.cvv,
+    Card.status,
+    Card.is_primary,
+    Card.balance,
+    Card.created_at,
+)
+
+
+def card_items(db: Session, user_id: int) -> list[dict]:
+    """The user's cards, newest first, as CardResponse dicts."""
+    rows = (
+        db.query(*_LIST_COLUMNS)
+        .filter(Card.user_id == user_id)
         .order_by(Card.created_at.desc())
         .all()
     )
+    return [
+        {
+            **row._asdict(),
+            "card_type": row.card_type.value,
+            "status": row.status.value,
+            "balance": float(row.balance or 0),
+        }
+        for row in rows
+    ]
+
+
+@router.get("", response_model=list[CardResponse])
+def list_cards(
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    return rows_response(card_items(db, current_user.id))
 
 
 @router.post("", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
 def order_card(
     payload: CardOrderRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     db: Session = Depends(get_db),
 ):
     # Enforce at most one non-canceled virtual card and one non-canceled physical card per user
@@ -96,7 +144,7 @@ def order_card(
 def update_card_status(
     card_id: int,
     payload: CardStatusUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     card = (
@@ -124,22 +172,17 @@ def update_card_status(
 @router.get("/admin/{user_id}", response_model=list[CardResponse])
 def admin_list_user_cards(
     user_id: int,
-    _: User = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
     db: Session = Depends(get_db),
 ):
-    return (
-        db.query(Card)
-        .filter(Card.user_id == user_id)
-        .order_by(Card.created_at.desc())
-        .all()
-    )
+    return rows_response(card_items(db, user_id))
 
 
 @router.patch("/admin/{card_id}/status", response_model=CardResponse)
 def admin_update_card_status(
     card_id: int,
     payload: CardStatusUpdate,
-    _: User = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
     db: Session = Depends(get_db),
 ):
     card = db.query(Card).filter(Card.id == card_id).first()
@@ -169,15 +212,16 @@ class CardBalanceUpdate(BaseModel):
 
 
 @router.put("/admin/{card_id}/balance", response_model=CardResponse)
+@retry_on_conflict
 def admin_update_card_balance(
     card_id: int,
     payload: CardBalanceUpdate,
-    _: User = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
     db: Session = Depends(get_db),
 ):
     from decimal import Decimal
 
-    card = db.query(Card).filter(Card.id == card_id).first()
+    card = db.query(Card).filter(Card.id == card_id).with_for_update().first()
     if not card:
         raise HTTPException(status_code=404, detail="Card not found")
 
@@ -189,8 +233,69 @@ def admin_update_card_balance(
     if new_balance < 0:
         raise HTTPException(status_code=400, detail="Balance cannot be negative")
 
+    delta = new_balance - Decimal(card.balance or 0)
     card.balance = new_balance
     db.add(card)
+    if delta:
+        ledger.post(db, ledger.adjustment((CARD_BOOK, card.id), delta))
     db.commit()
     db.refresh(card)
     return card
+
+
+@async_router.get("", response_model=list[CardResponse])
+async def list_cards_async(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+    return await db.run_sync(lambda s: list_cards(current_user=current_user, db=s))
+
+
+@async_router.post("", response_model=CardResponse, status_code=status.HTTP_201_CREATED)
+async def order_card_async(
+    payload: CardOrderRequest,
+    current_user: User = Depends(get_current_user_model_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: order_card(payload, current_user=current_user, db=s))
+
+
+@async_router.patch("/{card_id}/status", response_model=CardResponse)
+async def update_card_status_async(
+    card_id: int,
+    payload: CardStatusUpdate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(
+        lambda s: update_card_status(card_id, payload, current_user=current_user, db=s)
+    )
+
+
+@async_router.get("/admin/{user_id}", response_model=list[CardResponse])
+async def admin_list_user_cards_async(
+    user_id: int,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: admin_list_user_cards(user_id, db=s))
+
+
+@async_router.patch("/admin/{card_id}/status", response_model=CardResponse)
+async def admin_update_card_status_async(
+    card_id: int,
+    payload: CardStatusUpdate,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: admin_update_card_status(card_id, payload, db=s))
+
+
+@async_router.put("/admin/{card_id}/balance", response_model=CardResponse)
+async def admin_update_card_balance_async(
+    card_id: int,
+    payload: CardBalanceUpdate,
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(db, lambda s: admin_update_card_balance(card_id, payload, db=s))
@@ -1,16 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from app.database import get_db
 from app.api.auth import get_current_user
 from app.models.user import User
 from app.models.contact import Contact
 from app.schemas.contact import ContactCreate, ContactResponse
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/contacts", tags=["contacts"])
 
 @router.post("", response_model=ContactResponse, status_code=status.HTTP_201_CREATED)
-def add_contact(payload: ContactCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def add_contact(payload: ContactCreate, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     # Find contact user by username
     target = db.query(User).filter(User.username == payload.username).first()
     if not target:
@@ -40,8 +41,13 @@ def add_contact(payload: ContactCreate, current_user: User = Depends(get_current
 
 
 @router.get("", response_model=list[ContactResponse])
-def list_contacts(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    rows = db.query(Contact).filter(Contact.owner_id == current_user.id).all()
+def list_contacts(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    rows = (
+        db.query(Contact)
+        .options(joinedload(Contact.contact))
+        .filter(Contact.owner_id == current_user.id)
+        .all()
+    )
     return [
         ContactResponse(
             id=c.id,
@@ -55,7 +61,7 @@ def list_contacts(current_user: User = Depends(get_current_user), db: Session =
 
 
 @router.delete("/{contact_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_contact(contact_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def delete_contact(contact_id: int, current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
     c = db.query(Contact).filter(
         Contact.id == contact_id,
         Contact.owner_id == current_user.id
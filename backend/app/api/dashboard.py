@@ -0,0 +1,139 @@
+"""Everything the landing page shows, in one request (GET /api/dashboard).
+
+The page used to make six calls: account, cards, savings goals, recent
+transactions, support tickets and recipients. Each one authenticated the
+caller and checked out its own session. This endpoint authenticates once and
+splits the requested sections over at most DASHBOARD_CONNECTIONS sessions
+that run at the same time. The first group runs on the request's own session
+and the others run on DASHBOARD_WORKERS threads (the sync router) or as
+concurrent tasks (the async router). Each session reads from the replica
+unless the caller wrote recently, the same as get_read_db.
+
+``sections`` selects a subset, e.g. ``?sections=account,transactions`` for
+mobile clients. Each section has the same shape as its standalone endpoint.
+"""
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import database
+from app.api.accounts import my_account
+from app.api.auth import get_current_user, get_current_user_async, get_read_db, get_read_db_async
+from app.api.cards import card_items
+from app.api.recipients import recipient_items
+from app.api.savings_goals import goal_items
+from app.api.support import list_my_tickets
+from app.api.transactions import recent_transactions
+from app.schemas.dashboard import DashboardResponse
+from app.utils.fast_json import FastJSONResponse
+from app.utils.principal_cache import Principal
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+async_router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+# Sessions one dashboard request may hold at once; budget it against the pool.
+DASHBOARD_CONNECTIONS = int(os.getenv("DASHBOARD_CONNECTIONS", "3"))
+DASHBOARD_WORKERS = int(os.getenv("DASHBOARD_WORKERS", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS, thread_name_prefix="dashboard")
+
+
+def _account(db: Session, user: Principal, limit: int):
+    try:
+        return my_account(current_user=user, db=db)
+    except HTTPException as exc:
+        if exc.status_code == 404:
+            return None
+        raise
+
+
+def _support_tickets(db: Session, user: Principal, limit: int):
+    return [ticket.model_dump() for ticket in list_my_tickets(current_user=user, db=db)]
+
+
+SECTIONS = {
+    "account": _account,
+    "cards": lambda db, user, limit: card_items(db, user.id),
+    "savings_goals": lambda db, user, limit: goal_items(db, user.id),
+    "transactions": lambda db, user, limit: recent_transactions(db, user.id, limit),
+    "support_tickets": _support_tickets,
+    "recipients": lambda db, user, limit: recipient_items(db, user.id),
+}
+
+
+def _parse_sections(sections: str | None) -> list[str]:
+    if not sections:
+        return list(SECTIONS)
+    requested = {name.strip() for name in sections.split(",") if name.strip()}
+    unknown = requested - SECTIONS.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown sections: {', '.join(sorted(unknown))}; expected {', '.join(SECTIONS)}",
+        )
+    return [name for name in SECTIONS if name in requested]
+
+
+def _groups(names: list[str]) -> list[list[str]]:
+    count = max(1, min(DASHBOARD_CONNECTIONS, len(names)))
+    return [names[n::count] for n in range(count)]
+
+
+def _load(db: Session, names: list[str], user: Principal, limit: int) -> dict:
+    return {name: SECTIONS[name](db, user, limit) for name in names}
+
+
+def _load_on_own_session(names: list[str], user: Principal, limit: int) -> dict:
+    db = database.open_read_session(user.id) or database.SessionLocal()
+    try:
+        return _load(db, names, user, limit)
+    finally:
+        db.close()
+
+
+async def _load_on_own_session_async(names: list[str], user: Principal, limit: int) -> dict:
+    db = database.open_async_read_session(user.id) or database.AsyncSessionLocal()
+    async with db:
+        return await db.run_sync(lambda s: _load(s, names, user, limit))
+
+
+@router.get("", response_model=DashboardResponse)
+def dashboard(
+    sections: str | None = Query(None, description=f"Comma-separated subset of: {', '.join(SECTIONS)}"),
+    transactions_limit: int = Query(20, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    names = _parse_sections(sections)
+    first, *rest = _groups(names)
+    # copy_context() carries the request's SQL profile into the worker threads.
+    futures = [
+        _executor.submit(contextvars.copy_context().run, _load_on_own_session, group, current_user, transactions_limit)
+        for group in rest
+    ]
+    body = _load(db, first, current_user, transactions_limit)
+    for future in futures:
+        body.update(future.result())
+    return FastJSONResponse({name: body[name] for name in names})
+
+
+@async_router.get("", response_model=DashboardResponse)
+async def dashboard_async(
+    sections: str | None = Query(None, description=f"Comma-separated subset of: {', '.join(SECTIONS)}"),
+    transactions_limit: int = Query(20, ge=1, le=200),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+    names = _parse_sections(sections)
+    first, *rest = _groups(names)
+    results = await asyncio.gather(
+        db.run_sync(lambda s: _load(s, first, current_user, transactions_limit)),
+        *(_load_on_own_session_async(group, current_user, transactions_limit) for group in rest),
+    )
+    body = {name: value for result in results for name, value in result.items()}
+    return FastJSONResponse({name: body[name] for name in names})
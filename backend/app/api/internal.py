@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends
+
+from app import database
+from app.api.auth import password_pool, principal_cache, require_roles, session_store
+from app.models.user import RoleEnum
+from app.utils import outbox
+from app.utils.db_retry import reset_retry_stats, retry_stats
+from app.utils.pool_metrics import pool_stats
+from app.utils.principal_cache import Principal
+from app.utils.sql_profiler import reset_route_stats, route_stats
+
+router = APIRouter(prefix="/api/internal", tags=["internal"])
+
+
+@router.get("/db/pool")
+def db_pool_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    """Admin-only: connection pool occupancy and checkout wait statistics."""
+    return {
+        "primary": pool_stats(database.engine),
+        "replica": pool_stats(database.read_engine),
+        "async": pool_stats(database.async_engine),
+        "async_replica": pool_stats(database.async_read_engine),
+    }
+
+
+@router.get("/db/queries")
+def db_query_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    """Admin-only: per-route query counts, DB time and slowest statements since start/reset."""
+    return route_stats()
+
+
+@router.delete("/db/queries", status_code=204)
+def reset_db_query_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    reset_route_stats()
+    return None
+
+
+@router.get("/db/retries")
+def db_retry_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    """Admin-only: lock conflicts (deadlocks, serialization failures), retries and 503 give-ups."""
+    return retry_stats()
+
+
+@router.delete("/db/retries", status_code=204)
+def reset_db_retry_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    reset_retry_stats()
+    return None
+
+
+@router.get("/sessions")
+def session_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    """Admin-only: live session and principal-cache gauges for this worker."""
+    return {**session_store.stats(), **principal_cache.stats()}
+
+
+@router.get("/password-pool")
+def password_pool_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    """Admin-only: bcrypt process pool occupancy and rejected (503) calls."""
+    return password_pool.stats()
+
+
+@router.get("/outbox")
+def outbox_metrics(_: Principal = Depends(require_roles([RoleEnum.admin]))):
+    """Admin-only: outbox backlog, lag and this worker's dispatcher counters."""
+    return outbox.dispatcher.stats()
@@ -11,6 +11,8 @@ from app.schemas.recipient import (
     RecipientVerifyRequest,
     RecipientResponse,
 )
+from app.utils.fast_json import rows_response
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/recipients", tags=["recipients"])
 
@@ -33,7 +35,7 @@ def _to_response(model: Contact) -> RecipientResponse:
 @router.post("", response_model=RecipientResponse, status_code=status.HTTP_201_CREATED)
 def add_recipient(
     payload: RecipientCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     q = payload.lookup.strip()
@@ -69,20 +71,52 @@ def add_recipient(
     return _to_response(c)
 
 
+def recipient_items(db: Session, user_id: int) -> list[dict]:
+    """The user's saved recipients as RecipientResponse dicts."""
+    rows = (
+        db.query(
+            Contact.id,
+            Contact.owner_id,
+            Contact.contact_id,
+            Contact.alias,
+            Contact.created_at,
+            User.username,
+            User.email,
+            User.phone_number,
+        )
+        .outerjoin(User, User.id == Contact.contact_id)
+        .filter(Contact.owner_id == user_id)
+        .all()
+    )
+    return [
+        {
+            "id": c.id,
+            "user_id": c.owner_id,
+            "recipient_id": c.contact_id,
+            "username": c.username or "",
+            "email": c.email or "",
+            "phone_number": c.phone_number,
+            "nickname": c.alias,
+            "saved_at": c.created_at,
+            "is_verified": True,
+        }
+        for c in rows
+    ]
+
+
 @router.get("", response_model=list[RecipientResponse])
 def list_recipients(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    rows = db.query(Contact).filter(Contact.owner_id == current_user.id).all()
-    return [_to_response(c) for c in rows]
+    return rows_response(recipient_items(db, current_user.id))
 
 
 @router.put("/{recipient_id}", response_model=RecipientResponse)
 def update_recipient(
     recipient_id: int,
     payload: RecipientUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     c = (
@@ -105,7 +139,7 @@ def update_recipient(
 @router.delete("/{recipient_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_recipient(
     recipient_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     c = (
@@ -123,7 +157,7 @@ def delete_recipient(
 @router.post("/verify")
 def verify_recipient(
     payload: RecipientVerifyRequest,
-    current_user: User = Depends(get_current_user),  # noqa: F401 - ensure auth
+    current_user: Principal = Depends(get_current_user),  # noqa: F401 - ensure auth
     db: Session = Depends(get_db),
 ):
     q = payload.lookup.strip()
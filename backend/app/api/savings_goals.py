@@ -3,16 +3,21 @@ from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.api.auth import get_current_user
-from app.models.user import User
+from app.database import get_db, get_async_db
+from app.api.auth import get_current_user, get_current_user_async
 from app.models.account import Account
 from app.models.savings_goal import SavingsGoal
 from app.schemas.savings_goal import SavingsGoalCreate, SavingsGoalUpdate, SavingsGoalResponse
+from app.utils import balance_shards, outbox
+from app.utils.db_retry import retry_on_conflict, run_sync_with_retry
+from app.utils.fast_json import rows_response
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/savings-goals", tags=["savings-goals"])
+async_router = APIRouter(prefix="/api/savings-goals", tags=["savings-goals"])
 
 
 def _to_response(model: SavingsGoal) -> SavingsGoalResponse:
@@ -25,22 +30,44 @@ def _to_response(model: SavingsGoal) -> SavingsGoalResponse:
     )
 
 
-def _get_account(db: Session, user_id: int) -> Account:
-    acct = db.query(Account).filter(Account.user_id == user_id).first()
+def goal_items(db: Session, user_id: int) -> list[dict]:
+    """The user's goals, oldest first, as SavingsGoalResponse dicts."""
+    rows = (
+        db.query(SavingsGoal.id, SavingsGoal.name, SavingsGoal.target_amount, SavingsGoal.current_amount, SavingsGoal.created_at)
+        .filter(SavingsGoal.user_id == user_id)
+        .order_by(SavingsGoal.created_at.asc())
+        .all()
+    )
+    return [
+        {
+            "id": g.id,
+            "name": g.name,
+            "target_amount": float(g.target_amount or 0),
+            "current_amount": float(g.current_amount or 0),
+            "created_at": g.created_at,
+        }
+        for g in rows
+    ]
+
+
+def _lock_account(db: Session, user_id: int) -> Account:
+    # Goal mutations lock the account first, then the goal, like transfers do,
+    # so concurrent deposits cannot both pass the balance check.
+    acct = db.query(Account).filter(Account.user_id == user_id).with_for_update().first()
     if not acct:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Account not found")
     return acct
 
 
-def _ensure_within_balance(db: Session, user_id: int, new_current: Decimal, exclude_goal_id: int | None = None) -> None:
-    acct = _get_account(db, user_id)
+def _ensure_within_balance(db: Session, acct: Account, new_current: Decimal, exclude_goal_id: int | None = None) -> None:
+    user_id = acct.user_id
     total_q = db.query(func.coalesce(func.sum(SavingsGoal.current_amount), 0)).filter(
         SavingsGoal.user_id == user_id
     )
     if exclude_goal_id is not None:
         total_q = total_q.filter(SavingsGoal.id != exclude_goal_id)
     existing_total: Decimal = total_q.scalar() or Decimal("0")
-    if existing_total + new_current > (acct.balance or Decimal("0")):
+    if existing_total + new_current > balance_shards.total_balance(db, acct):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Total saved across all goals cannot exceed your account balance",
@@ -48,22 +75,22 @@ def _ensure_within_balance(db: Session, user_id: int, new_current: Decimal, excl
 
 
 @router.get("", response_model=list[SavingsGoalResponse])
-def list_savings_goals(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    rows = db.query(SavingsGoal).filter(SavingsGoal.user_id == current_user.id).order_by(SavingsGoal.created_at.asc()).all()
-    return [_to_response(g) for g in rows]
+def list_savings_goals(current_user: Principal = Depends(get_current_user), db: Session = Depends(get_db)):
+    return rows_response(goal_items(db, current_user.id))
 
 
 @router.post("", response_model=SavingsGoalResponse, status_code=status.HTTP_201_CREATED)
+@retry_on_conflict
 def create_savings_goal(
     payload: SavingsGoalCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     target = Decimal(str(payload.target_amount)).quantize(Decimal("0.01"))
     current = Decimal(str(payload.current_amount or 0)).quantize(Decimal("0.01"))
     if current < 0 or target <= 0:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid goal amounts")
-    _ensure_within_balance(db, current_user.id, current)
+    _ensure_within_balance(db, _lock_account(db, current_user.id), current)
 
     goal = SavingsGoal(
         user_id=current_user.id,
@@ -78,19 +105,15 @@ def create_savings_goal(
 
 
 @router.put("/{goal_id}", response_model=SavingsGoalResponse)
+@retry_on_conflict
 def update_savings_goal(
     goal_id: int,
     payload: SavingsGoalUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    goal = (
-        db.query(SavingsGoal)
-        .filter(SavingsGoal.id == goal_id, SavingsGoal.user_id == current_user.id)
-        .first()
-    )
-    if not goal:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Goal not found")
+    acct = _lock_account(db, current_user.id)
+    goal = _get_goal_for_user(db, goal_id, current_user.id)
 
     if payload.name is not None:
         goal.name = payload.name.strip()
@@ -100,7 +123,7 @@ def update_savings_goal(
         new_current = Decimal(str(payload.current_amount)).quantize(Decimal("0.01"))
         if new_current < 0:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid current amount")
-        _ensure_within_balance(db, current_user.id, new_current, exclude_goal_id=goal.id)
+        _ensure_within_balance(db, acct, new_current, exclude_goal_id=goal.id)
         goal.current_amount = new_current
 
     db.add(goal)
@@ -112,7 +135,7 @@ def update_savings_goal(
 @router.delete("/{goal_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_savings_goal(
     goal_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     goal = (
@@ -135,6 +158,7 @@ def _get_goal_for_user(db: Session, goal_id: int, user_id: int) -> SavingsGoal:
     goal = (
         db.query(SavingsGoal)
         .filter(SavingsGoal.id == goal_id, SavingsGoal.user_id == user_id)
+        .with_for_update()
         .first()
     )
     if not goal:
@@ -142,13 +166,24 @@ def _get_goal_for_user(db: Session, goal_id: int, user_id: int) -> SavingsGoal:
     return goal
 
 
+def _goal_event(goal: SavingsGoal, amount: Decimal) -> dict:
+    return {
+        "goal_id": goal.id,
+        "user_id": goal.user_id,
+        "amount": str(amount),
+        "current_amount": str(goal.current_amount),
+    }
+
+
 @router.post("/{goal_id}/deposit", response_model=SavingsGoalResponse)
+@retry_on_conflict
 def deposit_into_goal(
     goal_id: int,
     payload: SavingsAmountChange,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    acct = _lock_account(db, current_user.id)
     goal = _get_goal_for_user(db, goal_id, current_user.id)
     amount = Decimal(str(payload.amount)).quantize(Decimal("0.01"))
     if amount <= 0:
@@ -161,19 +196,21 @@ def deposit_into_goal(
             detail="Amount exceeds this goal's target",
         )
 
-    _ensure_within_balance(db, current_user.id, new_current, exclude_goal_id=goal.id)
+    _ensure_within_balance(db, acct, new_current, exclude_goal_id=goal.id)
     goal.current_amount = new_current
     db.add(goal)
+    outbox.emit(db, [("savings_goal.deposited", _goal_event(goal, amount))])
     db.commit()
     db.refresh(goal)
     return _to_response(goal)
 
 
 @router.post("/{goal_id}/withdraw", response_model=SavingsGoalResponse)
+@retry_on_conflict
 def withdraw_from_goal(
     goal_id: int,
     payload: SavingsAmountChange,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     goal = _get_goal_for_user(db, goal_id, current_user.id)
@@ -190,6 +227,71 @@ def withdraw_from_goal(
 
     goal.current_amount = current_amount - amount
     db.add(goal)
+    outbox.emit(db, [("savings_goal.withdrawn", _goal_event(goal, amount))])
     db.commit()
     db.refresh(goal)
     return _to_response(goal)
+
+
+@async_router.get("", response_model=list[SavingsGoalResponse])
+async def list_savings_goals_async(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: list_savings_goals(current_user=current_user, db=s))
+
+
+@async_router.post("", response_model=SavingsGoalResponse, status_code=status.HTTP_201_CREATED)
+async def create_savings_goal_async(
+    payload: SavingsGoalCreate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(
+        db, lambda s: create_savings_goal(payload, current_user=current_user, db=s)
+    )
+
+
+@async_router.put("/{goal_id}", response_model=SavingsGoalResponse)
+async def update_savings_goal_async(
+    goal_id: int,
+    payload: SavingsGoalUpdate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(
+        db, lambda s: update_savings_goal(goal_id, payload, current_user=current_user, db=s)
+    )
+
+
+@async_router.delete("/{goal_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_savings_goal_async(
+    goal_id: int,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: delete_savings_goal(goal_id, current_user=current_user, db=s))
+
+
+@async_router.post("/{goal_id}/deposit", response_model=SavingsGoalResponse)
+async def deposit_into_goal_async(
+    goal_id: int,
+    payload: SavingsAmountChange,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(
+        db, lambda s: deposit_into_goal(goal_id, payload, current_user=current_user, db=s)
+    )
+
+
+@async_router.post("/{goal_id}/withdraw", response_model=SavingsGoalResponse)
+async def withdraw_from_goal_async(
+    goal_id: int,
+    payload: SavingsAmountChange,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(
+        db, lambda s: withdraw_from_goal(goal_id, payload, current_user=current_user, db=s)
+    )
@@ -4,10 +4,12 @@ import os
 from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 
-from app.database import get_db
-from app.api.auth import get_current_user
+from app.database import get_db, get_async_db
+from app.api.auth import get_current_user, get_current_user_async, get_read_db, get_read_db_async
 from app.models.user import User, RoleEnum
 from app.models.support import (
     SupportTicket,
@@ -25,8 +27,10 @@ from app.schemas.support import (
     TicketStatusUpdate,
     TicketAssign,
 )
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/support", tags=["support"])
+async_router = APIRouter(prefix="/api/support", tags=["support"])
 
 
 ATTACHMENTS_ROOT = os.path.join(os.path.dirname(__file__), "..", "static", "support_attachments")
@@ -46,7 +50,7 @@ def _message_to_response(m: SupportMessage) -> MessageResponse:
   )
 
 
-def _ticket_to_summary(ticket: SupportTicket, messages: List[SupportMessage], current_user: User) -> TicketSummary:
+def _ticket_to_summary(ticket: SupportTicket, messages: List[SupportMessage], current_user: Principal) -> TicketSummary:
   last_message_at = messages[-1].timestamp if messages else None
   unread = 0
   for m in messages:
@@ -63,7 +67,23 @@ def _ticket_to_summary(ticket: SupportTicket, messages: List[SupportMessage], cu
   )
 
 
-def _ticket_to_admin_summary(ticket: SupportTicket, messages: List[SupportMessage], viewer: User) -> AdminTicketSummary:
+def _messages_by_ticket(db: Session, ticket_ids: List[int]) -> dict[int, List[SupportMessage]]:
+  """Load the messages of many tickets in one query, grouped by ticket."""
+  grouped: dict[int, List[SupportMessage]] = {tid: [] for tid in ticket_ids}
+  if not ticket_ids:
+      return grouped
+  rows = (
+      db.query(SupportMessage)
+      .filter(SupportMessage.ticket_id.in_(ticket_ids))
+      .order_by(SupportMessage.ticket_id, SupportMessage.timestamp.asc())
+      .all()
+  )
+  for m in rows:
+      grouped[m.ticket_id].append(m)
+  return grouped
+
+
+def _ticket_to_admin_summary(ticket: SupportTicket, messages: List[SupportMessage], viewer: Principal) -> AdminTicketSummary:
   base = _ticket_to_summary(ticket, messages, viewer)
   return AdminTicketSummary(
       id=base.id,
@@ -84,7 +104,7 @@ def _ticket_to_admin_summary(ticket: SupportTicket, messages: List[SupportMessag
 @router.post("/tickets")
 def create_ticket(
     payload: TicketCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
   subject = payload.subject.strip()
@@ -137,8 +157,8 @@ def create_ticket(
 
 @router.get("/tickets", response_model=list[TicketSummary])
 def list_my_tickets(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
 ):
   tickets = (
       db.query(SupportTicket)
@@ -147,22 +167,14 @@ def list_my_tickets(
       .all()
   )
 
-  summaries: List[TicketSummary] = []
-  for t in tickets:
-      msgs = (
-          db.query(SupportMessage)
-          .filter(SupportMessage.ticket_id == t.id)
-          .order_by(SupportMessage.timestamp.asc())
-          .all()
-      )
-      summaries.append(_ticket_to_summary(t, msgs, current_user))
-  return summaries
+  messages = _messages_by_ticket(db, [t.id for t in tickets])
+  return [_ticket_to_summary(t, messages[t.id], current_user) for t in tickets]
 
 
 @router.get("/tickets/{ticket_id}/messages", response_model=list[MessageResponse])
 def get_ticket_messages(
     ticket_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
   ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
@@ -196,7 +208,7 @@ def get_ticket_messages(
 @router.post("/messages", response_model=MessageResponse)
 def send_message(
     payload: MessageCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
   ticket = db.query(SupportTicket).filter(SupportTicket.id == payload.ticket_id).first()
@@ -225,13 +237,7 @@ def send_message(
   return _message_to_response(message)
 
 
-@router.post("/messages/{ticket_id}/attachments", response_model=MessageResponse)
-async def upload_attachment(
-    ticket_id: int,
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-):
+def _get_reply_ticket(db: Session, ticket_id: int, current_user: Principal) -> SupportTicket:
   ticket = db.query(SupportTicket).filter(SupportTicket.id == ticket_id).first()
   if not ticket:
       raise HTTPException(status_code=404, detail="Ticket not found")
@@ -240,26 +246,34 @@ async def upload_attachment(
   is_staff = current_user.role in (RoleEnum.admin, RoleEnum.account_manager)
   if not (is_owner or is_staff):
       raise HTTPException(status_code=403, detail="Not allowed to reply to this ticket")
+  return ticket
 
-  if not file or not file.filename:
-      raise HTTPException(status_code=400, detail="No file uploaded")
 
-  ticket_dir = os.path.join(ATTACHMENTS_ROOT, str(ticket.id))
+def _write_attachment(ticket_id: int, original_name: str, contents: bytes) -> str:
+  ticket_dir = os.path.join(ATTACHMENTS_ROOT, str(ticket_id))
   os.makedirs(ticket_dir, exist_ok=True)
 
-  original_name = file.filename
   _, ext = os.path.splitext(original_name)
   safe_name = f"{uuid4().hex}{ext}"
   disk_path = os.path.join(ticket_dir, safe_name)
 
-  contents = await file.read()
   try:
       with open(disk_path, "wb") as f:
           f.write(contents)
   except OSError:
       raise HTTPException(status_code=500, detail="Failed to store attachment")
 
-  relative_url = f"/static/support_attachments/{ticket.id}/{safe_name}"
+  return f"/static/support_attachments/{ticket_id}/{safe_name}"
+
+
+def _add_attachment_message(
+    db: Session,
+    ticket: SupportTicket,
+    current_user: Principal,
+    original_name: str,
+    relative_url: str,
+) -> SupportMessage:
+  is_owner = ticket.user_id == current_user.id
   msg_type = MessageType.user if is_owner else MessageType.agent
 
   message = SupportMessage(
@@ -272,40 +286,53 @@ async def upload_attachment(
   db.add(message)
   db.commit()
   db.refresh(message)
+  return message
+
+
+@router.post("/messages/{ticket_id}/attachments", response_model=MessageResponse)
+async def upload_attachment(
+    ticket_id: int,
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+  ticket = _get_reply_ticket(db, ticket_id, current_user)
+
+  if not file or not file.filename:
+      raise HTTPException(status_code=400, detail="No file uploaded")
+
+  original_name = file.filename
+  contents = await file.read()
+  relative_url = _write_attachment(ticket.id, original_name, contents)
+
+  message = _add_attachment_message(db, ticket, current_user, original_name, relative_url)
   return _message_to_response(message)
 
 
 @router.get("/admin/tickets", response_model=list[AdminTicketSummary])
 def admin_list_tickets(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
 ):
   if current_user.role not in (RoleEnum.admin, RoleEnum.account_manager):
       raise HTTPException(status_code=403, detail="Not allowed")
 
   tickets = (
       db.query(SupportTicket)
+      .options(selectinload(SupportTicket.user), selectinload(SupportTicket.assignee))
       .order_by(SupportTicket.created_at.desc())
       .all()
   )
 
-  summaries: List[AdminTicketSummary] = []
-  for t in tickets:
-      msgs = (
-          db.query(SupportMessage)
-          .filter(SupportMessage.ticket_id == t.id)
-          .order_by(SupportMessage.timestamp.asc())
-          .all()
-      )
-      summaries.append(_ticket_to_admin_summary(t, msgs, current_user))
-  return summaries
+  messages = _messages_by_ticket(db, [t.id for t in tickets])
+  return [_ticket_to_admin_summary(t, messages[t.id], current_user) for t in tickets]
 
 
 @router.put("/admin/tickets/{ticket_id}/status", response_model=AdminTicketSummary)
 def admin_update_ticket_status(
     ticket_id: int,
     payload: TicketStatusUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
   if current_user.role not in (RoleEnum.admin, RoleEnum.account_manager):
@@ -338,7 +365,7 @@ def admin_update_ticket_status(
 def admin_assign_ticket(
     ticket_id: int,
     payload: TicketAssign,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
   if current_user.role not in (RoleEnum.admin, RoleEnum.account_manager):
@@ -371,3 +398,90 @@ def admin_assign_ticket(
       .all()
   )
   return _ticket_to_admin_summary(ticket, msgs, current_user)
+
+
+@async_router.post("/tickets")
+async def create_ticket_async(
+    payload: TicketCreate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+  return await db.run_sync(lambda s: create_ticket(payload, current_user=current_user, db=s))
+
+
+@async_router.get("/tickets", response_model=list[TicketSummary])
+async def list_my_tickets_async(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+  return await db.run_sync(lambda s: list_my_tickets(current_user=current_user, db=s))
+
+
+@async_router.get("/tickets/{ticket_id}/messages", response_model=list[MessageResponse])
+async def get_ticket_messages_async(
+    ticket_id: int,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+  return await db.run_sync(lambda s: get_ticket_messages(ticket_id, current_user=current_user, db=s))
+
+
+@async_router.post("/messages", response_model=MessageResponse)
+async def send_message_async(
+    payload: MessageCreate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+  return await db.run_sync(lambda s: send_message(payload, current_user=current_user, db=s))
+
+
+@async_router.post("/messages/{ticket_id}/attachments", response_model=MessageResponse)
+async def upload_attachment_async(
+    ticket_id: int,
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+  ticket = await db.run_sync(_get_reply_ticket, ticket_id, current_user)
+
+  if not file or not file.filename:
+      raise HTTPException(status_code=400, detail="No file uploaded")
+
+  original_name = file.filename
+  contents = await file.read()
+  relative_url = await run_in_threadpool(_write_attachment, ticket.id, original_name, contents)
+
+  message = await db.run_sync(_add_attachment_message, ticket, current_user, original_name, relative_url)
+  return _message_to_response(message)
+
+
+@async_router.get("/admin/tickets", response_model=list[AdminTicketSummary])
+async def admin_list_tickets_async(
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+  return await db.run_sync(lambda s: admin_list_tickets(current_user=current_user, db=s))
+
+
+@async_router.put("/admin/tickets/{ticket_id}/status", response_model=AdminTicketSummary)
+async def admin_update_ticket_status_async(
+    ticket_id: int,
+    payload: TicketStatusUpdate,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+  return await db.run_sync(
+      lambda s: admin_update_ticket_status(ticket_id, payload, current_user=current_user, db=s)
+  )
+
+
+@async_router.post("/admin/tickets/{ticket_id}/assign", response_model=AdminTicketSummary)
+async def admin_assign_ticket_async(
+    ticket_id: int,
+    payload: TicketAssign,
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+  return await db.run_sync(
+      lambda s: admin_assign_ticket(ticket_id, payload, current_user=current_user, db=s)
+  )
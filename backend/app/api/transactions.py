@@ -1,19 +1,85 @@
+import base64
+import json
+import os
 from decimal import Decimal
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-
-from app.database import get_db
-from app.api.auth import get_current_user, require_roles
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Query as ORMQuery, Session
+from sqlalchemy import Row, and_, insert, or_, select, tuple_, union_all
+from sqlalchemy.exc import IntegrityError
+
+from app.database import (
+    AsyncSessionLocal,
+    SessionLocal,
+    get_db,
+    get_async_db,
+    open_async_read_session,
+    open_read_session,
+)
+from app.api.auth import (
+    get_current_user,
+    require_roles,
+    get_current_user_async,
+    require_roles_async,
+    get_read_db,
+    get_read_db_async,
+)
 from app.models.user import User, RoleEnum
 from app.models.account import Account
 from app.models.transaction import Transaction, TxType
 from app.models.card import Card, CardStatus
-from app.schemas.transaction import TransactionCreate, TransactionResponse
+from app.models.ledger import ACCOUNT_BOOK, CARD_BOOK
+from app.schemas.transaction import (
+    BatchTransferRequest,
+    BatchTransferResponse,
+    TransactionAnalyticsResponse,
+    TransactionCreate,
+    TransactionResponse,
+)
+from app.utils.idempotency import (
+    IDEMPOTENCY_KEY_HEADER,
+    IDEMPOTENCY_REPLAYED_HEADER,
+    MAX_KEY_LENGTH,
+    find_key,
+    request_fingerprint,
+    store_key,
+)
+from app.utils import analytics, balance_shards, ledger, outbox
+from app.utils.db_retry import retry_on_conflict, run_sync_with_retry
+from app.utils.fast_json import rows_response
+from app.utils.principal_cache import Principal
+from app.utils.statement_export import (
+    EXPORT_FETCH_SIZE,
+    EXPORT_FORMATS,
+    StatementEncoder,
+    export_query,
+)
+from app.utils.transaction_search import (
+    LIST_COLUMNS,
+    MIN_NOTE_LENGTH,
+    SearchFilters,
+    estimate_count,
+    search_query,
+)
 
 router = APIRouter(prefix="/api/transactions", tags=["transactions"])
+async_router = APIRouter(prefix="/api/transactions", tags=["transactions"])
+
+# History pages carry the cursor for the next page in this header (the body
+# stays a plain list); pass it back as ?cursor= to continue.
+NEXT_CURSOR_HEADER = "x-next-cursor"
+# Admin search results carry an estimate of the total number of matches.
+TOTAL_ESTIMATE_HEADER = "x-total-count-estimate"
+
+# Largest number of payments accepted by one POST /batch.
+TRANSFER_BATCH_MAX = int(os.getenv("TRANSFER_BATCH_MAX", "500"))
+# Opt-in for old clients that send no Idempotency-Key: a keyless send or top-up
+# identical to one made in the last N seconds is answered with that one. It costs
+# a scan on every keyless write and rejects real repeat payments; 0 disables it.
+DUPLICATE_WINDOW_SECONDS = int(os.getenv("DUPLICATE_WINDOW_SECONDS", "0"))
 
 
 class TopUpRequest(BaseModel):
@@ -21,7 +87,7 @@ class TopUpRequest(BaseModel):
     card_id: int
 
 
-def _recent_duplicate_transaction(
+def _duplicate_query(
     db: Session,
     *,
     sender_id: int | None,
@@ -30,8 +96,7 @@ def _recent_duplicate_transaction(
     tx_type: TxType,
     note: str | None = None,
     window_seconds: int = 5,
-):
-    """Return a recently created duplicate transaction to guard against double submissions."""
+) -> ORMQuery:
     window_start = datetime.utcnow() - timedelta(seconds=window_seconds)
     q = db.query(Transaction).filter(
         Transaction.tx_type == tx_type,
@@ -50,15 +115,207 @@ def _recent_duplicate_transaction(
         q = q.filter(Transaction.note.is_(None))
     else:
         q = q.filter(Transaction.note == note)
-    return q.order_by(Transaction.created_at.desc()).first()
+    return q.order_by(Transaction.created_at.desc())
+
+
+def _recent_duplicate_transaction(db: Session, **criteria):
+    """Return a recently created duplicate transaction to guard against double submissions.
+
+    Only used for clients that do not send an Idempotency-Key, and only when
+    DUPLICATE_WINDOW_SECONDS is set.
+    """
+    if not DUPLICATE_WINDOW_SECONDS:
+        return None
+    return _duplicate_query(db, window_seconds=DUPLICATE_WINDOW_SECONDS, **criteria).first()
+
+
+def _replay_idempotent(db: Session, response: Response, user_id: int, key: str, fingerprint: str) -> dict | None:
+    record = find_key(db, user_id, key)
+    if record is None:
+        return None
+    if record.fingerprint != fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key was already used for a different request",
+        )
+    response.status_code = record.status_code
+    response.headers[IDEMPOTENCY_REPLAYED_HEADER] = "true"
+    return json.loads(record.response)
+
+
+def _commit_idempotent(
+    db: Session,
+    response: Response,
+    user_id: int,
+    key: str | None,
+    fingerprint: str | None,
+    body: dict,
+) -> dict:
+    """Commit the money movement together with its idempotency record."""
+    if key is None:
+        db.commit()
+        return body
+    store_key(db, user_id, key, fingerprint, status.HTTP_201_CREATED, body)
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request with the same key committed first: undo ours
+        # and answer with theirs.
+        db.rollback()
+        replay = _replay_idempotent(db, response, user_id, key, fingerprint)
+        if replay is None:
+            raise
+        return replay
+    return body
+
+
+def _idempotency_key_header():
+    return Header(
+        None,
+        alias=IDEMPOTENCY_KEY_HEADER,
+        max_length=MAX_KEY_LENGTH,
+        description="Unique per logical request; retries with the same key are replayed, not re-executed",
+    )
+
+
+def _history_query(
+    db: Session,
+    user_id: int,
+    tx_type: TxType | None,
+    fetch: int,
+    before: tuple[datetime, int] | None = None,
+) -> ORMQuery:
+    """LIST_COLUMNS rows of the transactions where user_id is a party, newest first.
+
+    Written as a UNION ALL of the sent and received sides instead of
+    ``sender_id = X OR receiver_id = X`` so each side is a backward range scan
+    over its (party, created_at, id) index, stopping after ``fetch`` rows,
+    rather than a BitmapOr followed by a sort of the whole history.
+
+    ``before`` is a keyset cursor: only rows strictly older than that
+    (created_at, id) are returned, so each side starts its scan right there.
+    """
+    def side(condition):
+        q = select(*LIST_COLUMNS).where(condition)
+        if tx_type is not None:
+            q = q.where(Transaction.tx_type == tx_type)
+        if before is not None:
+            q = q.where(tuple_(Transaction.created_at, Transaction.id) < tuple_(*before))
+        q = q.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(fetch)
+        return select(q.subquery())
+
+    received_only = and_(
+        Transaction.receiver_id == user_id,
+        or_(Transaction.sender_id.is_(None), Transaction.sender_id != user_id),
+    )
+    merged = union_all(side(Transaction.sender_id == user_id), side(received_only)).subquery()
+    return db.query(*merged.c).order_by(merged.c.created_at.desc(), merged.c.id.desc())
+
+
+def _encode_cursor(tx: Row) -> str:
+    raw = f"{tx.created_at.isoformat()}|{tx.id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, tx_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(tx_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _history_page(
+    db: Session,
+    response: Response,
+    user_id: int,
+    tx_type: TxType | None,
+    limit: int,
+    offset: int = 0,
+    cursor: str | None = None,
+) -> list[Row]:
+    if cursor is not None and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset, not both")
+    before = _decode_cursor(cursor) if cursor is not None else None
+    # One extra row tells whether another page exists.
+    rows = (
+        _history_query(db, user_id, tx_type, offset + limit + 1, before)
+        .offset(offset)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(rows[-1])
+    return rows
+
+
+def recent_transactions(db: Session, user_id: int, limit: int) -> list[dict]:
+    """The newest limit transactions of user_id as TransactionResponse dicts."""
+    return [_list_item(r) for r in _history_query(db, user_id, None, limit).limit(limit).all()]
+
+
+def _lock_accounts(db: Session, user_ids: list[int]) -> dict[int, Account]:
+    """Lock the accounts of user_ids with one SELECT ... FOR UPDATE.
+
+    Rows are locked in the order they are returned, so ordering by user_id
+    makes every transfer take its locks in the same global order: two users
+    paying each other at once queue up instead of deadlocking.
+    """
+    rows = (
+        db.query(Account)
+        .filter(Account.user_id.in_(sorted(set(user_ids))))
+        .order_by(Account.user_id)
+        .with_for_update()
+        .all()
+    )
+    return {acct.user_id: acct for acct in rows}
+
+
+def _transfer_event(tx_id: int, values: dict) -> tuple[str, dict]:
+    return (
+        "transfer.completed",
+        {
+            "transaction_id": tx_id,
+            "sender_id": values["sender_id"],
+            "receiver_id": values["receiver_id"],
+            "amount": str(values["amount"]),
+            "note": values["note"],
+            "created_at": values["created_at"].isoformat(),
+        },
+    )
+
+
+def _list_item(r: Row) -> dict:
+    """A LIST_COLUMNS row as a TransactionResponse dict."""
+    return {
+        "id": r.id,
+        "sender_id": r.sender_id,
+        "receiver_id": r.receiver_id,
+        "amount": float(r.amount),
+        "description": r.note,
+        "timestamp": r.created_at,
+        "tx_type": r.tx_type.value,
+    }
 
 
 @router.post("/topup", status_code=status.HTTP_201_CREATED)
+@retry_on_conflict
 def top_up(
     payload: TopUpRequest,
-    current_user: User = Depends(get_current_user),
+    response: Response,
+    idempotency_key: str | None = _idempotency_key_header(),
+    current_user: Principal = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
+    fingerprint = None
+    if idempotency_key:
+        fingerprint = request_fingerprint("topup", payload.model_dump())
+        replay = _replay_idempotent(db, response, current_user.id, idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+
     amount = Decimal(str(payload.amount)).quantize(Decimal("0.01"))
     if amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
@@ -90,7 +347,7 @@ def top_up(
     if not acct:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    duplicate = _recent_duplicate_transaction(
+    duplicate = not idempotency_key and _recent_duplicate_transaction(
         db,
         sender_id=None,
         receiver_id=current_user.id,
@@ -121,38 +378,70 @@ def top_up(
     )
     db.add(tx)
     db.flush()
+    ledger.post(db, ledger.movement("top_up", (CARD_BOOK, card.id), (ACCOUNT_BOOK, acct.id), amount, tx.id))
+    analytics.record(db, [(None, current_user.id, amount, tx.created_at)])
+    outbox.emit(
+        db,
+        [(
+            "top_up.completed",
+            {
+                "transaction_id": tx.id,
+                "user_id": current_user.id,
+                "card_id": card.id,
+                "amount": str(amount),
+                "created_at": tx.created_at.isoformat(),
+            },
+        )],
+    )
 
     reference = f"TP-{tx.id:06d}"
-    db.commit()
-
-    return {
+    body = {
         "message": "Top up completed",
         "reference": reference,
         "transaction_id": tx.id,
     }
+    return _commit_idempotent(db, response, current_user.id, idempotency_key, fingerprint, body)
 
 
 @router.post("/send", status_code=status.HTTP_201_CREATED)
-def send_money(payload: TransactionCreate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+@retry_on_conflict
+def send_money(
+    payload: TransactionCreate,
+    response: Response,
+    idempotency_key: str | None = _idempotency_key_header(),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    fingerprint = None
+    if idempotency_key:
+        fingerprint = request_fingerprint("send", payload.model_dump())
+        replay = _replay_idempotent(db, response, current_user.id, idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+
     if not payload.receiver_id and not (payload.receiver_username and payload.receiver_username.strip()):
         raise HTTPException(status_code=422, detail="receiver_id or receiver_username is required")
 
-    receiver_query = db.query(User)
-    receiver = None
+    # The receiver's account id and shard count come along with the user, so
+    # a sharded receiver's account row is never locked.
+    receiver_query = db.query(User, Account.id, Account.shard_count).outerjoin(Account, Account.user_id == User.id)
+    row = None
     if payload.receiver_id:
-        receiver = receiver_query.filter(User.id == payload.receiver_id).first()
+        row = receiver_query.filter(User.id == payload.receiver_id).first()
     elif payload.receiver_username:
-        receiver = receiver_query.filter(User.username == payload.receiver_username).first()
+        row = receiver_query.filter(User.username == payload.receiver_username).first()
 
-    if not receiver:
+    if not row:
         raise HTTPException(status_code=404, detail="Receiver not found")
+    receiver, recv_account_id, recv_shards = row
     if receiver.id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot transfer to yourself")
 
-    sender_acct = db.query(Account).filter(Account.user_id == current_user.id).with_for_update().first()
-    recv_acct = db.query(Account).filter(Account.user_id == receiver.id).with_for_update().first()
+    accounts = _lock_accounts(db, [current_user.id] if recv_shards else [current_user.id, receiver.id])
+    sender_acct = accounts.get(current_user.id)
+    recv_acct = accounts.get(receiver.id)
 
-    if not sender_acct or not recv_acct:
+    if not sender_acct or recv_account_id is None or not (recv_shards or recv_acct):
         raise HTTPException(status_code=404, detail="Account missing")
 
     has_active_card = (
@@ -168,10 +457,12 @@ def send_money(payload: TransactionCreate, current_user: User = Depends(get_curr
     if amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
+    if Decimal(sender_acct.balance or 0) < amount and sender_acct.shard_count:
+        balance_shards.consolidate(db, sender_acct)
     if Decimal(sender_acct.balance or 0) < amount:
         raise HTTPException(status_code=400, detail="Insufficient balance")
 
-    duplicate = _recent_duplicate_transaction(
+    duplicate = not idempotency_key and _recent_duplicate_transaction(
         db,
         sender_id=current_user.id,
         receiver_id=receiver.id,
@@ -188,8 +479,9 @@ def send_money(payload: TransactionCreate, current_user: User = Depends(get_curr
         }
 
     sender_acct.balance = (Decimal(sender_acct.balance or 0) - amount).quantize(Decimal("0.01"))
-    recv_acct.balance = (Decimal(recv_acct.balance or 0) + amount).quantize(Decimal("0.01"))
-    db.add_all([sender_acct, recv_acct])
+    if not recv_shards:
+        recv_acct.balance = (Decimal(recv_acct.balance or 0) + amount).quantize(Decimal("0.01"))
+    db.add_all([sender_acct, *([recv_acct] if recv_acct else [])])
 
     transaction = Transaction(
         sender_id=current_user.id,
@@ -200,71 +492,521 @@ def send_money(payload: TransactionCreate, current_user: User = Depends(get_curr
     )
     db.add(transaction)
     db.flush()
+    if recv_shards:
+        balance_shards.credit(db, recv_account_id, recv_shards, amount, transaction.id)
+    ledger.post(
+        db,
+        ledger.movement(
+            "transfer", (ACCOUNT_BOOK, sender_acct.id), (ACCOUNT_BOOK, recv_account_id), amount, transaction.id
+        ),
+    )
+    analytics.record(db, [(current_user.id, receiver.id, amount, transaction.created_at)])
+    outbox.emit(
+        db,
+        [_transfer_event(transaction.id, {
+            "sender_id": current_user.id,
+            "receiver_id": receiver.id,
+            "amount": amount,
+            "note": payload.description,
+            "created_at": transaction.created_at,
+        })],
+    )
 
     reference = f"TX-{transaction.id:06d}"
-
-    db.commit()
-
-    return {
+    body = {
         "message": "Transfer completed",
         "reference": reference,
         "transaction_id": transaction.id,
     }
+    return _commit_idempotent(db, response, current_user.id, idempotency_key, fingerprint, body)
+
+def _resolve_receivers(db: Session, items) -> tuple[dict[int, int], dict[str, int]]:
+    """Map the batch's receiver ids and usernames to user ids with one query."""
+    ids = {item.receiver_id for item in items if item.receiver_id}
+    names = {
+        item.receiver_username.strip()
+        for item in items
+        if not item.receiver_id and item.receiver_username and item.receiver_username.strip()
+    }
+    by_id: dict[int, int] = {}
+    by_name: dict[str, int] = {}
+    if ids or names:
+        conditions = []
+        if ids:
+            conditions.append(User.id.in_(ids))
+        if names:
+            conditions.append(User.username.in_(names))
+        for user_id, username in db.query(User.id, User.username).filter(or_(*conditions)):
+            by_id[user_id] = user_id
+            by_name[username] = user_id
+    return by_id, by_name
+
+
+@router.post("/batch", response_model=BatchTransferResponse, status_code=status.HTTP_201_CREATED)
+@retry_on_conflict
+def send_batch(
+    payload: BatchTransferRequest,
+    response: Response,
+    idempotency_key: str | None = _idempotency_key_header(),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Send many transfers from the caller's account in one transaction.
+
+    Receivers are resolved with one query and every account involved is locked
+    with one statement (see _lock_accounts); the transfers and their ledger
+    entries are written with one multi-row INSERT each. In all_or_nothing mode any failed item rejects
+    the batch with 400 and nothing is sent; in best_effort mode failed items
+    are reported and skipped.
+    """
+    if len(payload.items) > TRANSFER_BATCH_MAX:
+        raise HTTPException(status_code=422, detail=f"A batch may contain at most {TRANSFER_BATCH_MAX} transfers")
+
+    fingerprint = None
+    if idempotency_key:
+        fingerprint = request_fingerprint("batch", payload.model_dump())
+        replay = _replay_idempotent(db, response, current_user.id, idempotency_key, fingerprint)
+        if replay is not None:
+            return replay
+
+    by_id, by_name = _resolve_receivers(db, payload.items)
+    errors: dict[int, str] = {}
+    receivers: dict[int, int] = {}
+    for index, item in enumerate(payload.items):
+        if item.receiver_id:
+            receiver_id = by_id.get(item.receiver_id)
+        elif item.receiver_username and item.receiver_username.strip():
+            receiver_id = by_name.get(item.receiver_username.strip())
+        else:
+            errors[index] = "receiver_id or receiver_username is required"
+            continue
+        if receiver_id is None:
+            errors[index] = "Receiver not found"
+        elif receiver_id == current_user.id:
+            errors[index] = "Cannot transfer to yourself"
+        else:
+            receivers[index] = receiver_id
+
+    # Sharded receivers are credited through their shards and stay unlocked.
+    sharded: dict[int, tuple[int, int]] = {}
+    if receivers:
+        sharded = {
+            user_id: (account_id, shard_count)
+            for user_id, account_id, shard_count in db.query(Account.user_id, Account.id, Account.shard_count)
+            .filter(Account.user_id.in_(set(receivers.values())), Account.shard_count > 0)
+        }
+    accounts = _lock_accounts(
+        db, [current_user.id, *(user_id for user_id in receivers.values() if user_id not in sharded)]
+    )
+    sender_acct = accounts.get(current_user.id)
+    if not sender_acct:
+        raise HTTPException(status_code=404, detail="Account missing")
+    if sender_acct.shard_count:
+        balance_shards.consolidate(db, sender_acct)
+
+    has_active_card = (
+        db.query(Card)
+        .filter(Card.user_id == current_user.id, Card.status == CardStatus.active)
+        .first()
+    )
+    if not sender_acct.card_active and not has_active_card:
+        raise HTTPException(status_code=403, detail="You must activate at least one card to transfer funds")
+
+    # Walk the items in order against a running balance, so in best_effort
+    # mode the payments that fit are the first ones.
+    balance = Decimal(sender_acct.balance or 0)
+    now = datetime.utcnow()
+    credits: dict[int, Decimal] = {}
+    rows = []
+    for index, item in enumerate(payload.items):
+        if index in errors:
+            continue
+        receiver_id = receivers[index]
+        amount = Decimal(str(item.amount)).quantize(Decimal("0.01"))
+        if receiver_id not in accounts and receiver_id not in sharded:
+            errors[index] = "Account missing"
+        elif amount <= 0:
+            errors[index] = "Amount must be positive"
+        elif amount > balance:
+            errors[index] = "Insufficient balance"
+        else:
+            balance -= amount
+            credits[receiver_id] = credits.get(receiver_id, Decimal("0")) + amount
+            rows.append(
+                (
+                    index,
+                    {
+                        "sender_id": current_user.id,
+                        "receiver_id": receiver_id,
+                        "amount": amount,
+                        "note": item.description,
+                        "tx_type": TxType.sent,
+                        "created_at": now,
+                    },
+                )
+            )
+
+    if errors and payload.mode == "all_or_nothing":
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "No transfers were made",
+                "errors": [{"index": index, "error": error} for index, error in sorted(errors.items())],
+            },
+        )
+
+    results = {
+        index: {"index": index, "status": "failed", "error": error} for index, error in errors.items()
+    }
+    total = Decimal("0")
+    if rows:
+        tx_ids = db.execute(
+            insert(Transaction).returning(Transaction.id, sort_by_parameter_order=True),
+            [values for _, values in rows],
+        ).scalars().all()
+        entries = []
+        credit_keys: dict[int, int] = {}
+        for (index, values), tx_id in zip(rows, tx_ids):
+            total += values["amount"]
+            receiver_id = values["receiver_id"]
+            credit_keys.setdefault(receiver_id, tx_id)
+            entries += ledger.movement(
+                "transfer",
+                (ACCOUNT_BOOK, sender_acct.id),
+                (ACCOUNT_BOOK, sharded[receiver_id][0] if receiver_id in sharded else accounts[receiver_id].id),
+                values["amount"],
+                tx_id,
+            )
+            results[index] = {
+                "index": index,
+                "status": "completed",
+                "transaction_id": tx_id,
+                "reference": f"TX-{tx_id:06d}",
+            }
+        sender_acct.balance = balance.quantize(Decimal("0.01"))
+        # In user_id order, like the account locks, so shard locks cannot deadlock either.
+        for receiver_id, credit in sorted(credits.items()):
+            if receiver_id in sharded:
+                account_id, shard_count = sharded[receiver_id]
+                balance_shards.credit(db, account_id, shard_count, credit, credit_keys[receiver_id])
+                continue
+            recv_acct = accounts[receiver_id]
+            recv_acct.balance = (Decimal(recv_acct.balance or 0) + credit).quantize(Decimal("0.01"))
+        ledger.post(db, entries)
+        analytics.record(
+            db, [(current_user.id, values["receiver_id"], values["amount"], now) for _, values in rows]
+        )
+        outbox.emit(db, [_transfer_event(tx_id, values) for (_, values), tx_id in zip(rows, tx_ids)])
+
+    body = {
+        "mode": payload.mode,
+        "completed": len(rows),
+        "failed": len(errors),
+        "total_amount": float(total),
+        "results": [results[index] for index in sorted(results)],
+    }
+    return _commit_idempotent(db, response, current_user.id, idempotency_key, fingerprint, body)
+
 
 @router.get("", response_model=list[TransactionResponse])
 def list_transactions(
+    response: Response,
     direction: str | None = Query(None, description="sent | received (optional)"),
     limit: int = Query(50, ge=1, le=200),
-    offset: int = Query(0, ge=0),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    offset: int = Query(0, ge=0, description="Deprecated: use cursor"),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
 ):
-    q = db.query(Transaction).filter(
-        or_(Transaction.sender_id == current_user.id, Transaction.receiver_id == current_user.id)
-    ).order_by(Transaction.created_at.desc())
-
+    enum_val = None
     if direction in ("sent", "received"):
         enum_val = TxType.sent if direction == "sent" else TxType.received
-        q = q.filter(Transaction.tx_type == enum_val)
-
-    rows = q.offset(offset).limit(limit).all()
 
-    out: list[TransactionResponse] = []
-    for r in rows:
-        out.append(TransactionResponse(
-            id=r.id,
-            sender_id=r.sender_id,
-            receiver_id=r.receiver_id,
-            amount=float(r.amount),
-            description=r.note,
-            timestamp=r.created_at,
-            tx_type=r.tx_type.value,
-        ))
-    return out
+    rows = _history_page(db, response, current_user.id, enum_val, limit, offset, cursor)
+    return rows_response(map(_list_item, rows), response.headers)
 
 
 @router.get("/admin", response_model=list[TransactionResponse])
 def admin_list_transactions(
+    response: Response,
     user_id: int,
     limit: int = Query(50, ge=1, le=200),
-    _: User = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    db: Session = Depends(get_read_db),
 ):
-    q = db.query(Transaction).filter(
-        or_(Transaction.sender_id == user_id, Transaction.receiver_id == user_id)
-    ).order_by(Transaction.created_at.desc())
-
-    rows = q.limit(limit).all()
-
-    out: list[TransactionResponse] = []
-    for r in rows:
-        out.append(TransactionResponse(
-            id=r.id,
-            sender_id=r.sender_id,
-            receiver_id=r.receiver_id,
-            amount=float(r.amount),
-            description=r.note,
-            timestamp=r.created_at,
-            tx_type=r.tx_type.value,
-        ))
-    return out
+    rows = _history_page(db, response, user_id, None, limit, cursor=cursor)
+    return rows_response(map(_list_item, rows), response.headers)
+
+
+@router.get("/admin/search", response_model=list[TransactionResponse])
+def admin_search_transactions(
+    response: Response,
+    start: datetime | None = Query(None, description="Inclusive"),
+    end: datetime | None = Query(None, description="Exclusive"),
+    min_amount: float | None = Query(None, ge=0),
+    max_amount: float | None = Query(None, ge=0),
+    tx_type: str | None = Query(None, pattern="^(sent|received)$"),
+    note: str | None = Query(None, min_length=MIN_NOTE_LENGTH, description="Case-insensitive substring"),
+    user_id: int | None = Query(None, description="Sender or receiver"),
+    counterparty_id: int | None = Query(None, description="Other party; alone, matches either side"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+    db: Session = Depends(get_read_db),
+):
+    """Search every user's transactions, newest first, one keyset page at a time."""
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise HTTPException(status_code=400, detail="min_amount must not exceed max_amount")
+    filters = SearchFilters(
+        start=start,
+        end=end,
+        min_amount=None if min_amount is None else Decimal(str(min_amount)),
+        max_amount=None if max_amount is None else Decimal(str(max_amount)),
+        tx_type=TxType(tx_type) if tx_type else None,
+        note=note,
+        user_id=user_id,
+        counterparty_id=counterparty_id,
+    )
+    before = _decode_cursor(cursor) if cursor is not None else None
+    rows = search_query(db, filters, limit + 1, before).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(rows[-1])
+    response.headers[TOTAL_ESTIMATE_HEADER] = str(estimate_count(db, filters))
+    return rows_response(map(_list_item, rows), response.headers)
+
+
+@router.get("/analytics", response_model=TransactionAnalyticsResponse)
+def transaction_analytics(
+    period: str = Query("month", pattern="^(day|week|month)$"),
+    start: date | None = Query(None, description="Inclusive; defaults to the last 30 days, 12 weeks or 12 months"),
+    end: date | None = Query(None, description="Exclusive; defaults to tomorrow (UTC)"),
+    top: int = Query(5, ge=0, le=50, description="Number of top counterparties"),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    """Sent and received totals per day, week or month, and the top counterparties.
+
+    Served from the per-user daily aggregate, so the cost depends on the
+    number of days in the window, not on the number of transactions.
+    """
+    if end is None:
+        end = datetime.utcnow().date() + timedelta(days=1)
+    if start is None:
+        start = analytics.default_start(end - timedelta(days=1), period)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return analytics.summary(db, current_user.id, period, start, end, top)
+
+
+def _export_filename(user_id: int, fmt: str, compress: bool) -> str:
+    _, extension = EXPORT_FORMATS[fmt]
+    return f"statement-{user_id}.{extension}" + (".gz" if compress else "")
+
+
+def _export_headers(user_id: int, fmt: str, start: datetime | None, end: datetime | None, compress: bool):
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    media_type = "application/gzip" if compress else EXPORT_FORMATS[fmt][0]
+    headers = {"Content-Disposition": f'attachment; filename="{_export_filename(user_id, fmt, compress)}"'}
+    return media_type, headers
+
+
+def _stream_export(user_id: int, fmt: str, start: datetime | None, end: datetime | None, compress: bool):
+    # The request's session is closed before the body is streamed, so the
+    # export holds its own (replica when available) for as long as it runs.
+    db = open_read_session(user_id) or SessionLocal()
+    try:
+        encoder = StatementEncoder(fmt, compress)
+        yield encoder.begin()
+        result = db.execute(export_query(user_id, start, end).execution_options(yield_per=EXPORT_FETCH_SIZE))
+        for rows in result.partitions():
+            chunk = encoder.write(rows)
+            if chunk:
+                yield chunk
+        yield encoder.end()
+    finally:
+        db.close()
+
+
+async def _stream_export_async(user_id: int, fmt: str, start: datetime | None, end: datetime | None, compress: bool):
+    async with open_async_read_session(user_id) or AsyncSessionLocal() as db:
+        encoder = StatementEncoder(fmt, compress)
+        yield encoder.begin()
+        result = await db.stream(export_query(user_id, start, end).execution_options(yield_per=EXPORT_FETCH_SIZE))
+        async for rows in result.partitions():
+            chunk = encoder.write(rows)
+            if chunk:
+                yield chunk
+        yield encoder.end()
+
+
+def _export_response(user_id: int, fmt: str, start: datetime | None, end: datetime | None, compress: bool):
+    media_type, headers = _export_headers(user_id, fmt, start, end, compress)
+    return StreamingResponse(
+        _stream_export(user_id, fmt, start, end, compress), media_type=media_type, headers=headers
+    )
+
+
+def _export_response_async(user_id: int, fmt: str, start: datetime | None, end: datetime | None, compress: bool):
+    media_type, headers = _export_headers(user_id, fmt, start, end, compress)
+    return StreamingResponse(
+        _stream_export_async(user_id, fmt, start, end, compress), media_type=media_type, headers=headers
+    )
+
+
+@router.get("/export")
+def export_transactions(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start: datetime | None = Query(None, description="Inclusive"),
+    end: datetime | None = Query(None, description="Exclusive"),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    current_user: Principal = Depends(get_current_user),
+):
+    return _export_response(current_user.id, fmt, start, end, gzip)
+
+
+@router.get("/admin/export")
+def admin_export_transactions(
+    user_id: int,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start: datetime | None = Query(None, description="Inclusive"),
+    end: datetime | None = Query(None, description="Exclusive"),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    _: Principal = Depends(require_roles([RoleEnum.admin, RoleEnum.account_manager])),
+):
+    return _export_response(user_id, fmt, start, end, gzip)
+
+
+@async_router.post("/topup", status_code=status.HTTP_201_CREATED)
+async def top_up_async(
+    payload: TopUpRequest,
+    response: Response,
+    idempotency_key: str | None = _idempotency_key_header(),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(
+        db, lambda s: top_up(payload, response, idempotency_key, current_user=current_user, db=s)
+    )
+
+
+@async_router.post("/send", status_code=status.HTTP_201_CREATED)
+async def send_money_async(
+    payload: TransactionCreate,
+    response: Response,
+    idempotency_key: str | None = _idempotency_key_header(),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(
+        db, lambda s: send_money(payload, response, idempotency_key, current_user=current_user, db=s)
+    )
+
+
+@async_router.post("/batch", response_model=BatchTransferResponse, status_code=status.HTTP_201_CREATED)
+async def send_batch_async(
+    payload: BatchTransferRequest,
+    response: Response,
+    idempotency_key: str | None = _idempotency_key_header(),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await run_sync_with_retry(
+        db, lambda s: send_batch(payload, response, idempotency_key, current_user=current_user, db=s)
+    )
+
+
+@async_router.get("", response_model=list[TransactionResponse])
+async def list_transactions_async(
+    response: Response,
+    direction: str | None = Query(None, description="sent | received (optional)"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0, description="Deprecated: use cursor"),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+    return await db.run_sync(
+        lambda s: list_transactions(
+            response, direction, limit, offset, cursor, current_user=current_user, db=s
+        )
+    )
+
+
+@async_router.get("/admin", response_model=list[TransactionResponse])
+async def admin_list_transactions_async(
+    response: Response,
+    user_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+    return await db.run_sync(
+        lambda s: admin_list_transactions(response, user_id, limit, cursor, db=s)
+    )
+
+
+@async_router.get("/admin/search", response_model=list[TransactionResponse])
+async def admin_search_transactions_async(
+    response: Response,
+    start: datetime | None = Query(None, description="Inclusive"),
+    end: datetime | None = Query(None, description="Exclusive"),
+    min_amount: float | None = Query(None, ge=0),
+    max_amount: float | None = Query(None, ge=0),
+    tx_type: str | None = Query(None, pattern="^(sent|received)$"),
+    note: str | None = Query(None, min_length=MIN_NOTE_LENGTH, description="Case-insensitive substring"),
+    user_id: int | None = Query(None, description="Sender or receiver"),
+    counterparty_id: int | None = Query(None, description="Other party; alone, matches either side"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: str | None = Query(None, description="X-Next-Cursor from the previous page"),
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+    return await db.run_sync(
+        lambda s: admin_search_transactions(
+            response, start, end, min_amount, max_amount, tx_type, note,
+            user_id, counterparty_id, limit, cursor, db=s,
+        )
+    )
+
+
+@async_router.get("/export")
+async def export_transactions_async(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start: datetime | None = Query(None, description="Inclusive"),
+    end: datetime | None = Query(None, description="Exclusive"),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    current_user: Principal = Depends(get_current_user_async),
+):
+    return _export_response_async(current_user.id, fmt, start, end, gzip)
+
+
+@async_router.get("/admin/export")
+async def admin_export_transactions_async(
+    user_id: int,
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    start: datetime | None = Query(None, description="Inclusive"),
+    end: datetime | None = Query(None, description="Exclusive"),
+    gzip: bool = Query(False, description="Compress the file with gzip"),
+    _: Principal = Depends(require_roles_async([RoleEnum.admin, RoleEnum.account_manager])),
+):
+    return _export_response_async(user_id, fmt, start, end, gzip)
+
+
+@async_router.get("/analytics", response_model=TransactionAnalyticsResponse)
+async def transaction_analytics_async(
+    period: str = Query("month", pattern="^(day|week|month)$"),
+    start: date | None = Query(None, description="Inclusive; defaults to the last 30 days, 12 weeks or 12 months"),
+    end: date | None = Query(None, description="Exclusive; defaults to tomorrow (UTC)"),
+    top: int = Query(5, ge=0, le=50, description="Number of top counterparties"),
+    current_user: Principal = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_read_db_async),
+):
+    return await db.run_sync(
+        lambda s: transaction_analytics(period, start, end, top, current_user=current_user, db=s)
+    )
@@ -6,10 +6,11 @@ from fastapi import APIRouter, Depends, Query, HTTPException, UploadFile, File
 from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
-from app.api.auth import get_current_user
+from app.api.auth import get_current_user, get_current_user_model, get_read_db, principal_cache
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserResponse, UserSearchResult, UserUpdate
+from app.utils.principal_cache import Principal
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -21,8 +22,8 @@ ALLOWED_IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
 @router.get("/search", response_model=list[UserSearchResult])
 def search_users(
     query: str = Query(..., min_length=1, max_length=64, description="Username, email, or name"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
 ):
     q = query.strip()
     if not q:
@@ -63,7 +64,7 @@ def search_users(
 @router.put("/me", response_model=UserResponse)
 def update_profile(
     payload: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     db: Session = Depends(get_db),
 ):
     if payload.username and payload.username != current_user.username:
@@ -96,13 +97,14 @@ def update_profile(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    principal_cache.invalidate_user(current_user.id)
     return current_user
 
 
 @router.post("/me/avatar")
 async def upload_avatar(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_model),
     db: Session = Depends(get_db),
 ):
     if not file.filename:
@@ -4,16 +4,18 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.openapi.utils import get_openapi
 import os
 
-from app.database import create_db_and_tables
-from app.api.auth import router as auth_router
-from app.api.accounts import router as accounts_router
+from app.database import DB_ASYNC, engine
+from app.migrations import check_schema, migrate
+from app.utils.access_tokens import SIGNED_TOKENS
+from app.utils.sql_profiler import QUERY_COUNT_HEADER, QUERY_TIME_HEADER, SQLProfilerMiddleware
+from app.api import auth, accounts, transactions, cards, support, savings_goals, dashboard
+from app.utils.idempotency import IDEMPOTENCY_REPLAYED_HEADER, purge_expired_keys
+from app.utils.outbox import dispatcher as outbox_dispatcher
+from app.utils.session_store import SessionSweeper
 from app.api.contact import router as contacts_router
-from app.api.transactions import router as transactions_router
-from app.api.cards import router as cards_router
 from app.api.users import router as users_router
 from app.api.recipients import router as recipients_router
-from app.api.support import router as support_router
-from app.api.savings_goals import router as savings_goals_router
+from app.api.internal import router as internal_router
 
 app = FastAPI(title="DiceBank API", version="1.0")
 
@@ -33,12 +35,20 @@ if env_origins:
 else:
     allow_origins = default_origins
 
+app.add_middleware(SQLProfilerMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allow_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        QUERY_COUNT_HEADER,
+        QUERY_TIME_HEADER,
+        transactions.NEXT_CURSOR_HEADER,
+        transactions.TOTAL_ESTIMATE_HEADER,
+        IDEMPOTENCY_REPLAYED_HEADER,
+    ],
 )
 
 # Static directory
@@ -46,20 +56,46 @@ STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
+# Schema changes ship as versioned migrations (`python -m app.migrate`). Workers
+# only verify the recorded version; DB_AUTO_MIGRATE=1 applies pending
+# migrations at boot, which is convenient for local SQLite databases.
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "0").lower() in ("1", "true", "yes")
+
+
+session_sweeper = SessionSweeper(auth.session_store, extra_sweeps=[purge_expired_keys])
+
+
 @app.on_event("startup")
 def on_startup():
-    create_db_and_tables()
+    if AUTO_MIGRATE:
+        migrate(engine)
+    check_schema(engine)
+    session_sweeper.start()
+    auth.password_pool.start()
+    outbox_dispatcher.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    session_sweeper.stop()
+    auth.password_pool.stop()
+    outbox_dispatcher.stop()
+
+# Routers (DB_ASYNC=1 swaps in the async twins served by the AsyncEngine)
+def _pick(module):
+    return module.async_router if DB_ASYNC else module.router
 
-# Routers
-app.include_router(auth_router)
-app.include_router(accounts_router)
+app.include_router(_pick(auth))
+app.include_router(_pick(accounts))
 app.include_router(contacts_router)
-app.include_router(transactions_router)
-app.include_router(cards_router)
+app.include_router(_pick(transactions))
+app.include_router(_pick(cards))
 app.include_router(users_router)
 app.include_router(recipients_router)
-app.include_router(support_router)
-app.include_router(savings_goals_router)
+app.include_router(_pick(support))
+app.include_router(_pick(savings_goals))
+app.include_router(_pick(dashboard))
+app.include_router(internal_router)
 
 @app.get("/")
 def root():
@@ -76,12 +112,13 @@ def custom_openapi():
         routes=app.routes,
     )
 
-    openapi_schema["components"]["securitySchemes"] = {
-        "BearerAuth": {
-            "type": "http",
-            "scheme": "bearer",
-            "bearerFormat": "JWT",
-        }
+    # Keep the HTTPBearer scheme the routes reference and add BearerAuth for
+    # the global "Authorize" button; both carry the same bearer token.
+    openapi_schema["components"].setdefault("securitySchemes", {})["BearerAuth"] = {
+        "type": "http",
+        "scheme": "bearer",
+        "bearerFormat": "signed" if SIGNED_TOKENS else "opaque",
+        "description": "session_token (or access_token) from POST /api/auth/login",
     }
 
     openapi_schema["security"] = [{"BearerAuth": []}]
@@ -0,0 +1,36 @@
+"""Command-line entry point for schema migrations.
+
+    python -m app.migrate            # apply all pending migrations
+    python -m app.migrate --status   # print current and latest versions
+    python -m app.migrate --target 3 # stop after version 3
+"""
+import argparse
+import logging
+
+from app.database import engine
+from app.migrations import LATEST_VERSION, current_version, migrate
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.migrate", description="Apply database migrations.")
+    parser.add_argument("--status", action="store_true", help="show the schema version and exit")
+    parser.add_argument("--target", type=int, default=None, help="highest version to apply")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.status:
+        with engine.connect() as conn:
+            print(f"current: {current_version(conn)}  latest: {LATEST_VERSION}")
+        return 0
+
+    applied = migrate(engine, target=args.target)
+    if applied:
+        print(f"applied: {', '.join(str(v) for v in applied)}")
+    else:
+        print("schema is up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,143 @@
+"""Versioned schema migrations.
+
+Each migration module exposes VERSION, DESCRIPTION and upgrade(conn). They are
+applied in order by ``python -m app.migrate``; every migration runs in its own
+transaction and records its version in the ``schema_version`` table. Worker
+startup only compares the recorded version with LATEST_VERSION.
+
+A migration that sets ``CONCURRENT = True`` builds indexes on a live table.
+On Postgres it runs on an AUTOCOMMIT connection, outside any transaction, so
+its indexes can be built CONCURRENTLY (app.migrations.concurrent). Its version
+is recorded only after every statement has succeeded.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+
+from app.migrations import (
+    m0001_baseline,
+    m0002_transaction_created_at_index,
+    m0003_transaction_party_indexes,
+    m0004_sessions,
+    m0005_idempotency_keys,
+    m0006_ledger,
+    m0007_user_daily_totals,
+    m0008_transaction_search_indexes,
+    m0009_account_balance_shards,
+    m0010_outbox_events,
+)
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = [
+    m0001_baseline,
+    m0002_transaction_created_at_index,
+    m0003_transaction_party_indexes,
+    m0004_sessions,
+    m0005_idempotency_keys,
+    m0006_ledger,
+    m0007_user_daily_totals,
+    m0008_transaction_search_indexes,
+    m0009_account_balance_shards,
+    m0010_outbox_events,
+]
+LATEST_VERSION = MIGRATIONS[-1].VERSION
+
+# Arbitrary application-wide key so concurrent `migrate` runs on Postgres
+# serialize instead of racing on DDL.
+_ADVISORY_LOCK_KEY = 7_310_462
+
+_version_metadata = MetaData()
+schema_version = Table(
+    "schema_version",
+    _version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+class SchemaOutOfDateError(RuntimeError):
+    pass
+
+
+def current_version(conn: Connection) -> int:
+    """Highest applied version, or 0 for a database that has never been migrated."""
+    try:
+        with conn.begin_nested():
+            return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+def _lock(conn: Connection) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+
+def _migrate_concurrently(engine: Engine, migration) -> bool:
+    """Apply a CONCURRENT migration on Postgres; returns False if it was already applied."""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Session-level: there is no transaction for an xact lock to live in.
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+        try:
+            version = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+            if version >= migration.VERSION:
+                return False
+            logger.info("Applying migration %04d concurrently: %s", migration.VERSION, migration.DESCRIPTION)
+            migration.upgrade(conn)
+            conn.execute(
+                schema_version.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    applied_at=datetime.utcnow(),
+                )
+            )
+            return True
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+
+
+def migrate(engine: Engine, target: int | None = None) -> list[int]:
+    """Apply pending migrations up to target (default: latest). Returns the versions applied."""
+    target = LATEST_VERSION if target is None else target
+    _version_metadata.create_all(engine, checkfirst=True)
+
+    applied: list[int] = []
+    for migration in MIGRATIONS:
+        if migration.VERSION > target:
+            break
+        if getattr(migration, "CONCURRENT", False) and engine.dialect.name == "postgresql":
+            if _migrate_concurrently(engine, migration):
+                applied.append(migration.VERSION)
+            continue
+        with engine.begin() as conn:
+            _lock(conn)
+            if current_version(conn) >= migration.VERSION:
+                continue
+            logger.info("Applying migration %04d: %s", migration.VERSION, migration.DESCRIPTION)
+            migration.upgrade(conn)
+            conn.execute(
+                schema_version.insert().values(
+                    version=migration.VERSION,
+                    description=migration.DESCRIPTION,
+                    applied_at=datetime.utcnow(),
+                )
+            )
+        applied.append(migration.VERSION)
+    return applied
+
+
+def check_schema(engine: Engine) -> int:
+    """Fail fast when the database is behind the code. Costs a single query."""
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version < LATEST_VERSION:
+        raise SchemaOutOfDateError(
+            f"Database schema is at version {version}, code expects {LATEST_VERSION}; "
+            "run `python -m app.migrate`"
+        )
+    return version
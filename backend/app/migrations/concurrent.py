@@ -0,0 +1,38 @@
+"""Index DDL for migrations that set ``CONCURRENT = True``.
+
+On Postgres such migrations run on an AUTOCOMMIT connection (see migrate()),
+so these helpers can build and drop indexes CONCURRENTLY. Writes to the table
+keep flowing during the build instead of queuing behind a SHARE lock. Each
+statement commits on its own, so a migration made of them must be safe to
+re-run after failing part way. A failed concurrent build leaves an INVALID
+index behind, and create_index() replaces it. Other databases get the plain
+statements.
+"""
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def create_index(conn: Connection, name: str, definition: str) -> None:
+    """CREATE INDEX name <definition>, e.g. definition="ON transactions (created_at)"."""
+    if not _is_postgres(conn):
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} {definition}"))
+        return
+    valid = conn.execute(
+        text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name"
+        ),
+        {"name": name},
+    ).scalar()
+    if valid is False:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+
+
+def drop_index(conn: Connection, name: str) -> None:
+    concurrently = "CONCURRENTLY " if _is_postgres(conn) else ""
+    conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {name}"))
@@ -0,0 +1,154 @@
+"""Tables as they existed before versioned migrations.
+
+The schema is frozen here (not taken from the live models) so that later
+migrations stay replayable. Databases created by the old create_all startup
+hook already have these tables; checkfirst leaves them untouched and only the
+cards.balance backfill is applied.
+"""
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
+    inspect,
+    text,
+)
+from sqlalchemy.engine import Connection
+
+VERSION = 1
+DESCRIPTION = "baseline schema"
+
+metadata = MetaData()
+
+Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String, unique=True, index=True, nullable=False),
+    Column("username", String, unique=True, index=True, nullable=False),
+    Column("hashed_password", String, nullable=False),
+    Column("first_name", String, nullable=False),
+    Column("last_name", String, nullable=False),
+    Column("phone_number", String, unique=True, nullable=False),
+    Column("country", String),
+    Column("city", String),
+    Column("profile_picture", String),
+    Column("display_name", String),
+    Column("role", Enum("admin", "account_manager", "user", name="roleenum"), nullable=False),
+    Column("is_active", Boolean, nullable=False),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "accounts",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, unique=True),
+    Column("balance", Numeric(12, 2)),
+    Column("card_number", String, unique=True, index=True),
+    Column("card_active", Boolean),
+)
+
+Table(
+    "cards",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("design_slug", String, nullable=False),
+    Column("theme", String, nullable=False),
+    Column("card_type", Enum("virtual", "physical", name="cardtype"), nullable=False),
+    Column("holder_name", String, nullable=False),
+    Column("card_number", String, unique=True, nullable=False, index=True),
+    Column("expiry_month", Integer, nullable=False),
+    Column("expiry_year", Integer, nullable=False),
+    Column("cvv", String, nullable=False),
+    Column("status", Enum("active", "frozen", "canceled", name="cardstatus"), nullable=False),
+    Column("is_primary", Boolean, nullable=False),
+    Column("balance", Numeric(12, 2), nullable=False, server_default="0"),
+    Column("created_at", DateTime, nullable=False),
+)
+
+Table(
+    "contacts",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("owner_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("contact_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("alias", String),
+    Column("created_at", DateTime),
+    UniqueConstraint("owner_id", "contact_id", name="unique_contact_pair"),
+)
+
+Table(
+    "savings_goals",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False),
+    Column("name", String, nullable=False),
+    Column("target_amount", Numeric(12, 2), nullable=False),
+    Column("current_amount", Numeric(12, 2), nullable=False),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "support_tickets",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("subject", String, nullable=False),
+    Column(
+        "status",
+        Enum("open", "in_progress", "resolved", "closed", name="ticketstatus"),
+        nullable=False,
+    ),
+    Column(
+        "priority",
+        Enum("low", "medium", "high", "critical", name="ticketpriority"),
+        nullable=False,
+    ),
+    Column("assigned_to", Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True),
+    Column("created_at", DateTime, nullable=False),
+)
+
+Table(
+    "support_messages",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("ticket_id", Integer, ForeignKey("support_tickets.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("sender_id", Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True),
+    Column("message_type", Enum("user", "agent", "system", name="messagetype"), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("attachments", String),
+    Column("timestamp", DateTime, nullable=False),
+    Column("is_read", Boolean, nullable=False),
+)
+
+Table(
+    "transactions",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("sender_id", Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True),
+    Column("receiver_id", Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True),
+    Column("amount", Numeric(12, 2), nullable=False),
+    Column("note", String),
+    Column("created_at", DateTime),
+    Column("tx_type", Enum("sent", "received", name="txtype"), nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    metadata.create_all(conn, checkfirst=True)
+
+    # Pre-migration databases may predate cards.balance.
+    columns = {c["name"] for c in inspect(conn).get_columns("cards")}
+    if "balance" not in columns:
+        conn.execute(text("ALTER TABLE cards ADD COLUMN balance NUMERIC(12, 2) NOT NULL DEFAULT 0"))
@@ -0,0 +1,12 @@
+from sqlalchemy.engine import Connection
+
+from app.migrations.concurrent import create_index
+
+VERSION = 2
+DESCRIPTION = "index transactions.created_at"
+# Built without blocking transfers; see app.migrations.concurrent.
+CONCURRENT = True
+
+
+def upgrade(conn: Connection) -> None:
+    create_index(conn, "ix_transactions_created_at", "ON transactions (created_at)")
@@ -0,0 +1,17 @@
+from sqlalchemy.engine import Connection
+
+from app.migrations.concurrent import create_index, drop_index
+
+VERSION = 3
+DESCRIPTION = "composite (party, created_at, id) indexes on transactions"
+# Built without blocking transfers; see app.migrations.concurrent.
+CONCURRENT = True
+
+
+def upgrade(conn: Connection) -> None:
+    create_index(conn, "ix_transactions_sender_created", "ON transactions (sender_id, created_at, id)")
+    create_index(conn, "ix_transactions_receiver_created", "ON transactions (receiver_id, created_at, id)")
+    # The composites lead with the same columns, so the single-column indexes
+    # only cost write amplification now.
+    drop_index(conn, "ix_transactions_sender_id")
+    drop_index(conn, "ix_transactions_receiver_id")
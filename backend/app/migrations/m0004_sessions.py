@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table
+from sqlalchemy.engine import Connection
+
+VERSION = 4
+DESCRIPTION = "sessions table for the database session store"
+
+metadata = MetaData()
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+sessions = Table(
+    "sessions",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("session_token", String, unique=True, index=True, nullable=False),
+    Column("created_at", DateTime),
+    Column("expires_at", DateTime, nullable=False),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    sessions.create(conn, checkfirst=True)
@@ -0,0 +1,78 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    func,
+    literal,
+    select,
+)
+from sqlalchemy.engine import Connection
+
+VERSION = 6
+DESCRIPTION = "ledger_entries and balance_checkpoints, opened with the current balances"
+
+metadata = MetaData()
+Table("transactions", metadata, Column("id", Integer, primary_key=True))
+accounts = Table("accounts", metadata, Column("id", Integer, primary_key=True), Column("balance", Numeric(12, 2)))
+cards = Table("cards", metadata, Column("id", Integer, primary_key=True), Column("balance", Numeric(12, 2)))
+
+EntryId = BigInteger().with_variant(Integer, "sqlite")
+
+ledger_entries = Table(
+    "ledger_entries",
+    metadata,
+    Column("id", EntryId, primary_key=True),
+    Column("book", String(16), nullable=False),
+    Column("book_id", Integer, nullable=False),
+    Column("amount", Numeric(14, 2), nullable=False),
+    Column("kind", String(16), nullable=False),
+    Column("transaction_id", Integer, ForeignKey("transactions.id", ondelete="SET NULL"), nullable=True),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_ledger_entries_book", "book", "book_id", "id"),
+)
+
+balance_checkpoints = Table(
+    "balance_checkpoints",
+    metadata,
+    Column("book", String(16), primary_key=True),
+    Column("book_id", Integer, primary_key=True),
+    Column("balance", Numeric(14, 2), nullable=False),
+    Column("last_entry_id", EntryId, nullable=False, index=True),
+    Column("checkpointed_at", DateTime, nullable=False),
+)
+
+
+def _open_books(conn: Connection, table: Table, book: str) -> None:
+    # One opening entry per funded book, and the matching system entry.
+    columns = ["book", "book_id", "amount", "kind", "created_at"]
+    funded = table.c.balance != 0
+    conn.execute(
+        ledger_entries.insert().from_select(
+            columns,
+            select(literal(book), table.c.id, table.c.balance, literal("opening"), func.current_timestamp())
+            .where(funded)
+            .order_by(table.c.id),
+        )
+    )
+    conn.execute(
+        ledger_entries.insert().from_select(
+            columns,
+            select(literal("system"), literal(0), -func.sum(table.c.balance), literal("opening"), func.current_timestamp())
+            .where(funded)
+            .having(func.count() > 0),
+        )
+    )
+
+
+def upgrade(conn: Connection) -> None:
+    ledger_entries.create(conn, checkfirst=True)
+    balance_checkpoints.create(conn, checkfirst=True)
+    _open_books(conn, accounts, "account")
+    _open_books(conn, cards, "card")
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, MetaData, Numeric, Table
+from sqlalchemy.engine import Connection
+
+VERSION = 7
+DESCRIPTION = "user_daily_totals aggregate for transaction analytics (fill with backfill_daily_totals.py)"
+
+metadata = MetaData()
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+user_daily_totals = Table(
+    "user_daily_totals",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("day", Date, primary_key=True),
+    Column("counterparty_id", Integer, primary_key=True),
+    Column("sent", Numeric(14, 2), nullable=False, server_default="0"),
+    Column("sent_count", Integer, nullable=False, server_default="0"),
+    Column("received", Numeric(14, 2), nullable=False, server_default="0"),
+    Column("received_count", Integer, nullable=False, server_default="0"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    user_daily_totals.create(conn, checkfirst=True)
@@ -0,0 +1,35 @@
+"""Trigram index for the admin transaction search.
+
+Postgres only. The GIN index lets ILIKE '%term%' on note avoid a sequential
+scan. Date ranges need nothing new: the created_at btree from migration 2
+serves both the range and the newest-first order. pg_trgm ships
+with Postgres, but CREATE EXTENSION needs a role that may create it. If that
+fails, the trigram index is skipped with a warning and note searches scan
+instead. The index is built CONCURRENTLY, so writes to transactions continue
+during the build.
+"""
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+
+from app.migrations.concurrent import create_index
+
+VERSION = 8
+DESCRIPTION = "trigram index on transactions.note"
+CONCURRENT = True
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade(conn: Connection) -> None:
+    if conn.dialect.name != "postgresql":
+        return
+    try:
+        # Autocommit: a failure here rolls back only this statement.
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError as exc:
+        logger.warning("pg_trgm unavailable, note search will scan: %s", exc.orig)
+        return
+    create_index(conn, "ix_transactions_note_trgm", "ON transactions USING gin (note gin_trgm_ops)")
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, ForeignKey, Integer, MetaData, Numeric, Table, inspect, text
+from sqlalchemy.engine import Connection
+
+VERSION = 9
+DESCRIPTION = "accounts.shard_count and account_balance_shards for hot receivers"
+
+metadata = MetaData()
+Table("accounts", metadata, Column("id", Integer, primary_key=True))
+
+account_balance_shards = Table(
+    "account_balance_shards",
+    metadata,
+    Column("account_id", Integer, ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True),
+    Column("shard", Integer, primary_key=True),
+    Column("balance", Numeric(12, 2), nullable=False, server_default="0"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    columns = {c["name"] for c in inspect(conn).get_columns("accounts")}
+    if "shard_count" not in columns:
+        conn.execute(text("ALTER TABLE accounts ADD COLUMN shard_count INTEGER NOT NULL DEFAULT 0"))
+    account_balance_shards.create(conn, checkfirst=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, MetaData, String, Table, Text
+from sqlalchemy.engine import Connection
+
+VERSION = 10
+DESCRIPTION = "outbox_events for the background event dispatcher"
+
+metadata = MetaData()
+
+EntryId = BigInteger().with_variant(Integer, "sqlite")
+
+outbox_events = Table(
+    "outbox_events",
+    metadata,
+    Column("id", EntryId, primary_key=True),
+    Column("event_type", String(64), nullable=False),
+    Column("payload", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("available_at", DateTime, nullable=False),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("last_error", Text, nullable=True),
+    Column("dead_at", DateTime, nullable=True),
+    Index("ix_outbox_events_due", "dead_at", "available_at", "id"),
+)
+
+
+def upgrade(conn: Connection) -> None:
+    outbox_events.create(conn, checkfirst=True)
@@ -12,5 +12,18 @@ class Account(Base):
     balance = Column(Numeric(12, 2), default=0)
     card_number = Column(String, unique=True, index=True)
     card_active = Column(Boolean, default=False)
+    # 0 for a normal account. Otherwise incoming transfers are spread over this
+    # many AccountBalanceShard rows, and the account's money is balance plus
+    # the sum of its shards (see app.utils.balance_shards).
+    shard_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="account")
+
+
+class AccountBalanceShard(Base):
+    """One of the sub-balances that take credits for a hot receiving account."""
+    __tablename__ = "account_balance_shards"
+
+    account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    balance = Column(Numeric(12, 2), nullable=False, default=0)
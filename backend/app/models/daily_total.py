@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, Numeric
+from app.database import Base
+
+# counterparty_id for money that came from outside the bank (card top-ups).
+EXTERNAL_COUNTERPARTY = 0
+
+
+class UserDailyTotal(Base):
+    """Money one user sent to and received from one counterparty on one (UTC) day.
+
+    Kept up to date in the same transaction as each transfer and top-up, so
+    analytics over any window read a few rows per day instead of the raw
+    transactions.
+    """
+    __tablename__ = "user_daily_totals"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    counterparty_id = Column(Integer, primary_key=True)
+    sent = Column(Numeric(14, 2), nullable=False, default=0)
+    sent_count = Column(Integer, nullable=False, default=0)
+    received = Column(Numeric(14, 2), nullable=False, default=0)
+    received_count = Column(Integer, nullable=False, default=0)
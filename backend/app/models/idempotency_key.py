@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from app.database import Base
+
+
+class IdempotencyKey(Base):
+    """Outcome of a money-moving request, replayed when the client retries with the same key."""
+    __tablename__ = "idempotency_keys"
+
+    # Keys are scoped to the caller, so a lookup is a primary-key point read.
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,42 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index, Integer, Numeric, String
+from app.database import Base
+
+# Books a ledger entry can post to. book_id is accounts.id or cards.id; the
+# system book (book_id 0) is the other side of top-ups from outside, admin
+# adjustments and opening balances, so every movement still nets to zero.
+ACCOUNT_BOOK = "account"
+CARD_BOOK = "card"
+SYSTEM_BOOK = "system"
+
+# BIGINT on Postgres; SQLite only auto-increments a plain INTEGER primary key.
+EntryId = BigInteger().with_variant(Integer, "sqlite")
+
+
+class LedgerEntry(Base):
+    """One side of a money movement. Rows are only ever inserted."""
+    __tablename__ = "ledger_entries"
+    __table_args__ = (
+        # Balance of one book since its checkpoint: an index range scan.
+        Index("ix_ledger_entries_book", "book", "book_id", "id"),
+    )
+
+    id = Column(EntryId, primary_key=True)
+    book = Column(String(16), nullable=False)
+    book_id = Column(Integer, nullable=False)
+    # Signed: credits are positive, debits negative.
+    amount = Column(Numeric(14, 2), nullable=False)
+    kind = Column(String(16), nullable=False)
+    transaction_id = Column(Integer, ForeignKey("transactions.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class BalanceCheckpoint(Base):
+    """Balance of a book including every entry up to last_entry_id."""
+    __tablename__ = "balance_checkpoints"
+
+    book = Column(String(16), primary_key=True)
+    book_id = Column(Integer, primary_key=True)
+    balance = Column(Numeric(14, 2), nullable=False)
+    last_entry_id = Column(EntryId, nullable=False, index=True)
+    checkpointed_at = Column(DateTime, nullable=False)
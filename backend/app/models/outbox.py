@@ -0,0 +1,26 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from app.database import Base
+from app.models.ledger import EntryId
+
+
+class OutboxEvent(Base):
+    """An event written in the same transaction as the change it describes.
+
+    The dispatcher deletes it once every handler has run. A row that keeps
+    failing is retried with backoff until it is marked dead.
+    """
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # The dispatcher claims the oldest due rows that are not dead.
+        Index("ix_outbox_events_due", "dead_at", "available_at", "id"),
+    )
+
+    id = Column(EntryId, primary_key=True)
+    event_type = Column(String(64), nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    dead_at = Column(DateTime, nullable=True)
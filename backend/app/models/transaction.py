@@ -1,6 +1,6 @@
 import enum
 from datetime import datetime
-from sqlalchemy import Column, Integer, Numeric, DateTime, Enum, ForeignKey, String
+from sqlalchemy import Column, Integer, Numeric, DateTime, Enum, ForeignKey, String, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -12,14 +12,27 @@ class TxType(enum.Enum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # History is read per party, newest first: each composite index serves one
+    # side of the UNION ALL in the history query and the duplicate check.
+    __table_args__ = (
+        Index("ix_transactions_sender_created", "sender_id", "created_at", "id"),
+        Index("ix_transactions_receiver_created", "receiver_id", "created_at", "id"),
+        # Admin search by note substring (Postgres only, migration 8).
+        Index(
+            "ix_transactions_note_trgm",
+            "note",
+            postgresql_using="gin",
+            postgresql_ops={"note": "gin_trgm_ops"},
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    sender_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
-    receiver_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    sender_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
+    receiver_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
 
     amount = Column(Numeric(12, 2), nullable=False)
     note = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
     tx_type = Column(Enum(TxType), nullable=False)
 
     
@@ -33,3 +33,4 @@ class User(Base):
     
     account = relationship("Account", back_populates="user", uselist=False)
     cards = relationship("Card", back_populates="user", cascade="all, delete-orphan")
+    sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
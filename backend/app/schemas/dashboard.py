@@ -0,0 +1,27 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+from app.schemas.card import CardResponse
+from app.schemas.recipient import RecipientResponse
+from app.schemas.savings_goal import SavingsGoalResponse
+from app.schemas.support import TicketSummary
+from app.schemas.transaction import TransactionResponse
+
+
+class DashboardAccount(BaseModel):
+    user_id: int
+    balance: str
+    raw_balance: str
+    card_number: Optional[str] = None
+    card_active: bool
+
+
+class DashboardResponse(BaseModel):
+    # Only the requested sections are present; account is null without an account.
+    account: Optional[DashboardAccount] = None
+    cards: Optional[list[CardResponse]] = None
+    savings_goals: Optional[list[SavingsGoalResponse]] = None
+    transactions: Optional[list[TransactionResponse]] = None
+    support_tickets: Optional[list[TicketSummary]] = None
+    recipients: Optional[list[RecipientResponse]] = None
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Literal, Optional
 
 class TransactionCreate(BaseModel):
     receiver_id: Optional[int] = None
@@ -33,3 +33,61 @@ class TransactionResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class BatchTransferItem(BaseModel):
+    receiver_id: Optional[int] = None
+    receiver_username: Optional[str] = None
+    amount: float = Field(..., gt=0)
+    description: Optional[str] = None
+
+
+class BatchTransferRequest(BaseModel):
+    items: list[BatchTransferItem] = Field(..., min_length=1)
+    # all_or_nothing: one bad item rejects the whole batch.
+    # best_effort: bad items are reported and the rest are sent.
+    mode: Literal["all_or_nothing", "best_effort"] = "all_or_nothing"
+
+
+class BatchTransferItemResult(BaseModel):
+    index: int
+    status: Literal["completed", "failed"]
+    transaction_id: Optional[int] = None
+    reference: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchTransferResponse(BaseModel):
+    mode: str
+    completed: int
+    failed: int
+    total_amount: float
+    results: list[BatchTransferItemResult]
+
+
+class AnalyticsTotals(BaseModel):
+    sent: float
+    sent_count: int
+    received: float
+    received_count: int
+
+
+class AnalyticsBucket(AnalyticsTotals):
+    start: date
+
+
+class AnalyticsCounterparty(BaseModel):
+    user_id: int
+    username: str
+    display_name: Optional[str] = None
+    sent: float
+    received: float
+
+
+class TransactionAnalyticsResponse(BaseModel):
+    period: str
+    start: date
+    end: date
+    totals: AnalyticsTotals
+    buckets: list[AnalyticsBucket]
+    top_counterparties: list[AnalyticsCounterparty]
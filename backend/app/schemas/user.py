@@ -18,6 +18,22 @@ class UserRegister(UserBase):
     role: RoleEnum = RoleEnum.user
 
 
+class UserImportRow(UserBase):
+    """One record of an admin bulk import; without a password the account cannot log in yet."""
+    password: Optional[str] = None
+    hashed_password: Optional[str] = None
+    country: Optional[str] = None
+    city: Optional[str] = None
+    display_name: Optional[str] = None
+    role: RoleEnum = RoleEnum.user
+
+
+class UserImportResult(BaseModel):
+    created: int
+    skipped: int
+    errors: list[dict]
+
+
 class UserResponse(UserBase):
     id: int
     role: RoleEnum
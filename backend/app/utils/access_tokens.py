@@ -0,0 +1,100 @@
+"""Stateless, HMAC-signed access tokens (AUTH_TOKEN_MODE=signed).
+
+In the default ``session`` mode every bearer token is an opaque key into the
+session store. In ``signed`` mode login also hands out a short-lived access
+token that carries the caller's id, role and expiry and is verified with the
+shared secret alone, so authenticated reads never touch the session store. The
+long-lived refresh token is an ordinary store-backed session token; trading it
+for a new access token (POST /api/auth/refresh) is the only store lookup.
+
+Format: ``v1.<base64url(claims json)>.<base64url(HMAC-SHA256)>``. Opaque
+session tokens never contain a dot, so both kinds can be told apart cheaply.
+
+ACCESS_TOKEN_SECRET may list several comma-separated secrets: the first signs,
+all of them verify, which allows rotating the secret without logging anyone out.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Optional
+
+from app.models.user import RoleEnum
+from app.utils.principal_cache import Principal
+
+AUTH_TOKEN_MODE = os.getenv("AUTH_TOKEN_MODE", "session").lower()
+ACCESS_TOKEN_TTL = int(os.getenv("ACCESS_TOKEN_TTL", "900"))
+ACCESS_TOKEN_SECRETS = [
+    secret.strip().encode() for secret in os.getenv("ACCESS_TOKEN_SECRET", "").split(",") if secret.strip()
+]
+
+TOKEN_VERSION = "v1"
+
+if AUTH_TOKEN_MODE not in ("session", "signed"):
+    raise ValueError(f"Unknown AUTH_TOKEN_MODE {AUTH_TOKEN_MODE!r}; expected session or signed")
+if AUTH_TOKEN_MODE == "signed" and not ACCESS_TOKEN_SECRETS:
+    raise RuntimeError("AUTH_TOKEN_MODE=signed requires ACCESS_TOKEN_SECRET")
+
+SIGNED_TOKENS = AUTH_TOKEN_MODE == "signed"
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(secret: bytes, signing_input: str) -> bytes:
+    return hmac.new(secret, signing_input.encode("ascii"), hashlib.sha256).digest()
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_VERSION + ".")
+
+
+def issue_access_token(principal: Principal, ttl: int = ACCESS_TOKEN_TTL) -> str:
+    role = principal.role.value if isinstance(principal.role, RoleEnum) else str(principal.role)
+    claims = {
+        "sub": principal.id,
+        "role": role,
+        "act": principal.is_active,
+        "name": principal.display_name,
+        "exp": int(time.time()) + ttl,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    signing_input = f"{TOKEN_VERSION}.{payload}"
+    return f"{signing_input}.{_b64encode(_sign(ACCESS_TOKEN_SECRETS[0], signing_input))}"
+
+
+def verify_access_token(token: str) -> Optional[Principal]:
+    """Return the Principal a valid, unexpired token was issued for, else None."""
+    if not token.isascii():
+        # Issued tokens are pure base64url; _sign() could not even encode this one.
+        return None
+    try:
+        version, payload, signature = token.split(".")
+        if version != TOKEN_VERSION:
+            return None
+        signature_bytes = _b64decode(signature)
+    except ValueError:
+        return None
+
+    signing_input = f"{version}.{payload}"
+    # Check every secret so the comparison time does not reveal which one matched.
+    valid = False
+    for secret in ACCESS_TOKEN_SECRETS:
+        valid |= hmac.compare_digest(_sign(secret, signing_input), signature_bytes)
+    if not valid:
+        return None
+
+    try:
+        claims = json.loads(_b64decode(payload))
+        if claims["exp"] < time.time():
+            return None
+        return Principal(int(claims["sub"]), RoleEnum(claims["role"]), bool(claims["act"]), claims.get("name"))
+    except (ValueError, KeyError, TypeError):
+        return None
@@ -0,0 +1,199 @@
+"""Spending analytics from the user_daily_totals aggregate.
+
+record() adds each new transaction to the sender's and the receiver's row for
+(day, counterparty) with one multi-row upsert, in the transaction that moves
+the money. summary() serves GET /api/transactions/analytics from those rows:
+at most one row per day and counterparty, however many transactions there
+were. rebuild() recomputes a date range from the raw transactions; it is what
+backfill_daily_totals.py runs.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Integer, and_, delete, func, insert, literal, select, text, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models.daily_total import EXTERNAL_COUNTERPARTY, UserDailyTotal
+from app.models.transaction import Transaction
+from app.models.user import User
+
+PERIODS = ("day", "week", "month")
+# Window used when the caller gives no start.
+DEFAULT_BUCKETS = {"day": 30, "week": 12, "month": 12}
+
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def record(db: Session, transactions: list[tuple[int | None, int | None, Decimal, datetime]]) -> None:
+    """Add (sender_id, receiver_id, amount, created_at) transactions to the daily totals."""
+    rows: dict[tuple[int, date, int], dict] = {}
+
+    def add(user_id, day, counterparty_id, column, amount):
+        row = rows.setdefault(
+            (user_id, day, counterparty_id),
+            {"user_id": user_id, "day": day, "counterparty_id": counterparty_id,
+             "sent": Decimal("0"), "sent_count": 0, "received": Decimal("0"), "received_count": 0},
+        )
+        row[column] += amount
+        row[column + "_count"] += 1
+
+    for sender_id, receiver_id, amount, created_at in transactions:
+        day = created_at.date()
+        if sender_id is not None:
+            add(sender_id, day, receiver_id or EXTERNAL_COUNTERPARTY, "sent", amount)
+        if receiver_id is not None:
+            add(receiver_id, day, sender_id or EXTERNAL_COUNTERPARTY, "received", amount)
+    if not rows:
+        return
+
+    table = UserDailyTotal.__table__
+    stmt = _DIALECT_INSERTS[db.get_bind().dialect.name](table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day, table.c.counterparty_id],
+        set_={
+            column: table.c[column] + stmt.excluded[column]
+            for column in ("sent", "sent_count", "received", "received_count")
+        },
+    )
+    # Sorted, so concurrent transactions touching the same rows lock them in
+    # the same order.
+    db.execute(stmt, [rows[key] for key in sorted(rows)])
+
+
+def _bucket_start(day: date, period: str) -> date:
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+
+def default_start(last_day: date, period: str) -> date:
+    """Start of the DEFAULT_BUCKETS[period] buckets ending with the one holding last_day."""
+    count = DEFAULT_BUCKETS[period]
+    if period == "day":
+        return last_day - timedelta(days=count - 1)
+    if period == "week":
+        return _bucket_start(last_day, "week") - timedelta(weeks=count - 1)
+    month = last_day.year * 12 + last_day.month - 1 - (count - 1)
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def summary(db: Session, user_id: int, period: str, start: date, end: date, top: int) -> dict:
+    """Totals per period in [start, end) and the top counterparties over the window."""
+    window = and_(UserDailyTotal.user_id == user_id, UserDailyTotal.day >= start, UserDailyTotal.day < end)
+    per_day = (
+        db.query(
+            UserDailyTotal.day,
+            func.sum(UserDailyTotal.sent),
+            func.sum(UserDailyTotal.sent_count),
+            func.sum(UserDailyTotal.received),
+            func.sum(UserDailyTotal.received_count),
+        )
+        .filter(window)
+        .group_by(UserDailyTotal.day)
+        .order_by(UserDailyTotal.day)
+        .all()
+    )
+    buckets: dict[date, dict] = defaultdict(
+        lambda: {"sent": Decimal("0"), "sent_count": 0, "received": Decimal("0"), "received_count": 0}
+    )
+    for day, sent, sent_count, received, received_count in per_day:
+        bucket = buckets[_bucket_start(day, period)]
+        bucket["sent"] += Decimal(sent or 0)
+        bucket["sent_count"] += int(sent_count or 0)
+        bucket["received"] += Decimal(received or 0)
+        bucket["received_count"] += int(received_count or 0)
+
+    volume = func.sum(UserDailyTotal.sent) + func.sum(UserDailyTotal.received)
+    counterparties = (
+        db.query(
+            UserDailyTotal.counterparty_id,
+            User.username,
+            User.display_name,
+            func.sum(UserDailyTotal.sent),
+            func.sum(UserDailyTotal.received),
+        )
+        .join(User, User.id == UserDailyTotal.counterparty_id)
+        .filter(window, UserDailyTotal.counterparty_id != EXTERNAL_COUNTERPARTY)
+        .group_by(UserDailyTotal.counterparty_id, User.username, User.display_name)
+        .order_by(volume.desc(), UserDailyTotal.counterparty_id)
+        .limit(top)
+        .all()
+    )
+
+    totals = {"sent": Decimal("0"), "sent_count": 0, "received": Decimal("0"), "received_count": 0}
+    for bucket in buckets.values():
+        for key in totals:
+            totals[key] += bucket[key]
+    return {
+        "period": period,
+        "start": start,
+        "end": end,
+        "totals": totals,
+        "buckets": [{"start": key, **buckets[key]} for key in sorted(buckets)],
+        "top_counterparties": [
+            {
+                "user_id": counterparty_id,
+                "username": username,
+                "display_name": display_name,
+                "sent": Decimal(sent or 0),
+                "received": Decimal(received or 0),
+            }
+            for counterparty_id, username, display_name, sent, received in counterparties
+        ],
+    }
+
+
+def rebuild(db: Session, start: datetime, end: datetime) -> int:
+    """Recompute the daily totals for transactions in [start, end); start and end are UTC midnights.
+
+    Increments for new transactions are held off while the range is rebuilt
+    (a table lock on Postgres, SQLite's single writer otherwise), so the
+    result is exact even for today. Commits; returns the number of rows written.
+    """
+    table = UserDailyTotal.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE user_daily_totals IN SHARE ROW EXCLUSIVE MODE"))
+    db.execute(delete(table).where(table.c.day >= start.date(), table.c.day < end.date()))
+
+    in_range = and_(Transaction.created_at >= start, Transaction.created_at < end)
+    zero = literal(0, Integer)
+    sent_side = select(
+        Transaction.sender_id.label("user_id"),
+        func.date(Transaction.created_at).label("day"),
+        func.coalesce(Transaction.receiver_id, EXTERNAL_COUNTERPARTY).label("counterparty_id"),
+        Transaction.amount.label("sent"),
+        literal(1, Integer).label("sent_count"),
+        zero.label("received"),
+        zero.label("received_count"),
+    ).where(in_range, Transaction.sender_id.isnot(None))
+    received_side = select(
+        Transaction.receiver_id,
+        func.date(Transaction.created_at),
+        func.coalesce(Transaction.sender_id, EXTERNAL_COUNTERPARTY),
+        zero,
+        zero,
+        Transaction.amount,
+        literal(1, Integer),
+    ).where(in_range, Transaction.receiver_id.isnot(None))
+    sides = union_all(sent_side, received_side).subquery()
+    grouped = select(
+        sides.c.user_id,
+        sides.c.day,
+        sides.c.counterparty_id,
+        func.sum(sides.c.sent),
+        func.sum(sides.c.sent_count),
+        func.sum(sides.c.received),
+        func.sum(sides.c.received_count),
+    ).group_by(sides.c.user_id, sides.c.day, sides.c.counterparty_id)
+    result = db.execute(
+        insert(table).from_select(
+            ["user_id", "day", "counterparty_id", "sent", "sent_count", "received", "received_count"],
+            grouped,
+        )
+    )
+    db.commit()
+    return result.rowcount
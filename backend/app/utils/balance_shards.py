@@ -0,0 +1,109 @@
+"""Sharded balances for accounts that receive more transfers than one row lock allows.
+
+Every transfer locks the receiving Account row, so a merchant receiving
+thousands of payments a second handles them one at a time. An account with
+``shard_count = K`` instead takes incoming transfers on K
+AccountBalanceShard rows:
+
+* credit() adds to one shard, picked by hashing the transaction id, with an
+  atomic UPDATE. The Account row is not locked, so K payments can commit at
+  once.
+* The account's money is Account.balance plus the sum of its shards.
+  total_balance() is what balance reads show.
+* Debits lock the Account row as usual. When the main balance does not cover
+  the amount, consolidate() moves the shards into it first. Locks are always
+  taken on the Account row before any shard, in shard order, so credits and
+  consolidations cannot deadlock.
+
+set_shard_count() turns sharding on, resizes it or turns it off (K=0). Admins
+do this with PUT /api/accounts/admin/{user_id}/shards.
+"""
+import os
+from decimal import Decimal
+
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.orm import Session
+
+from app.models.account import Account, AccountBalanceShard
+
+BALANCE_SHARDS_MAX = int(os.getenv("BALANCE_SHARDS_MAX", "64"))
+
+# Knuth's multiplicative hash, so that keys sharing a stride still spread out.
+_HASH_MULTIPLIER = 2654435761
+
+
+def pick_shard(key: int, shard_count: int) -> int:
+    return (key * _HASH_MULTIPLIER) % 2**32 % shard_count
+
+
+def credit(db: Session, account_id: int, shard_count: int, amount: Decimal, key: int) -> None:
+    """Add amount to one of the account's shards, without locking the account row.
+
+    shard_count was read without a lock. If the shard it points at has just
+    been removed by set_shard_count(), the amount goes to the main balance
+    instead.
+    """
+    shard = pick_shard(key, shard_count)
+    result = db.execute(
+        update(AccountBalanceShard)
+        .where(AccountBalanceShard.account_id == account_id, AccountBalanceShard.shard == shard)
+        .values(balance=AccountBalanceShard.balance + amount)
+    )
+    if result.rowcount == 0:
+        db.execute(update(Account).where(Account.id == account_id).values(balance=Account.balance + amount))
+
+
+def _lock_shards(db: Session, account_id: int) -> list[AccountBalanceShard]:
+    return (
+        db.query(AccountBalanceShard)
+        .filter(AccountBalanceShard.account_id == account_id)
+        .order_by(AccountBalanceShard.shard)
+        .with_for_update()
+        .all()
+    )
+
+
+def consolidate(db: Session, acct: Account) -> Decimal:
+    """Move the shards into acct.balance; acct must already be locked. Returns the amount moved."""
+    moved = Decimal("0")
+    for shard in _lock_shards(db, acct.id):
+        if shard.balance:
+            moved += Decimal(shard.balance)
+            shard.balance = Decimal("0")
+    if moved:
+        acct.balance = (Decimal(acct.balance or 0) + moved).quantize(Decimal("0.01"))
+    return moved
+
+
+def total_balance(db: Session, acct: Account) -> Decimal:
+    """The account's money: the main balance plus its shards."""
+    balance = Decimal(str(acct.balance or Decimal("0.00")))
+    if acct.shard_count:
+        balance += Decimal(
+            db.query(func.coalesce(func.sum(AccountBalanceShard.balance), 0))
+            .filter(AccountBalanceShard.account_id == acct.id)
+            .scalar()
+        )
+    return balance
+
+
+def set_shard_count(db: Session, acct: Account, shard_count: int) -> None:
+    """Re-shard a locked account into shard_count shards (0 turns sharding off)."""
+    consolidate(db, acct)
+    db.execute(
+        delete(AccountBalanceShard).where(
+            AccountBalanceShard.account_id == acct.id, AccountBalanceShard.shard >= shard_count
+        )
+    )
+    existing = {
+        shard
+        for (shard,) in db.query(AccountBalanceShard.shard).filter(AccountBalanceShard.account_id == acct.id)
+    }
+    missing = [
+        {"account_id": acct.id, "shard": shard, "balance": Decimal("0")}
+        for shard in range(shard_count)
+        if shard not in existing
+    ]
+    if missing:
+        db.execute(insert(AccountBalanceShard), missing)
+    acct.shard_count = shard_count
@@ -0,0 +1,131 @@
+"""Retry money-moving transactions that lost a lock conflict.
+
+Postgres aborts one side of a deadlock (SQLSTATE 40P01) or of a serialization
+conflict under REPEATABLE READ/SERIALIZABLE (40001). Nothing was written, so
+the whole unit of work can simply run again. ``retry_on_conflict`` wraps a sync
+route that takes a ``db`` session: on such an error it rolls back, sleeps for a
+jittered, exponentially growing delay capped at DB_RETRY_MAX_DELAY, and calls
+the route again, at most DB_RETRY_ATTEMPTS times in total. After that the
+client gets a 503 with Retry-After. SQLite's "database is locked" is treated
+the same way so local runs behave alike. retry_stats() counts the conflicts
+by kind, the retries and the give-ups since start or reset.
+
+Async twins call the sync route through ``AsyncSession.run_sync``, on the event
+loop thread, where sleeping would stall every request. There the decorator
+runs the route once and ``run_sync_with_retry`` does the waiting with
+``asyncio.sleep`` instead.
+"""
+import asyncio
+import functools
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+
+from fastapi import HTTPException
+from sqlalchemy.exc import DBAPIError
+
+DB_RETRY_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "5"))
+DB_RETRY_BASE_DELAY = float(os.getenv("DB_RETRY_BASE_DELAY", "0.01"))
+DB_RETRY_MAX_DELAY = float(os.getenv("DB_RETRY_MAX_DELAY", "0.5"))
+
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+_CONFLICT_KINDS = {"40001": "serialization_failure", "40P01": "deadlock"}
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats: Counter[str] = Counter()
+
+
+def _record(exc: DBAPIError, gave_up: bool) -> None:
+    orig = exc.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    with _stats_lock:
+        _stats[_CONFLICT_KINDS.get(code, "database_locked")] += 1
+        _stats["gave_up" if gave_up else "retries"] += 1
+
+
+def retry_stats() -> dict:
+    with _stats_lock:
+        return {
+            key: _stats[key]
+            for key in ("deadlock", "serialization_failure", "database_locked", "retries", "gave_up")
+        }
+
+
+def reset_retry_stats() -> None:
+    with _stats_lock:
+        _stats.clear()
+
+
+def is_retryable(exc: BaseException) -> bool:
+    if not isinstance(exc, DBAPIError) or exc.connection_invalidated:
+        return False
+    orig = exc.orig
+    # psycopg2 and the asyncpg adapter expose pgcode, psycopg 3 sqlstate.
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    if code in RETRYABLE_SQLSTATES:
+        return True
+    return "database is locked" in str(orig)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Delay before retry number ``attempt`` (1-based): full jitter, capped."""
+    return random.uniform(0, min(DB_RETRY_MAX_DELAY, DB_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def _conflict_exhausted() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The account is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def retry_on_conflict(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _on_event_loop():
+            return fn(*args, **kwargs)
+        db = kwargs["db"]
+        for attempt in range(1, DB_RETRY_ATTEMPTS + 1):
+            try:
+                return fn(*args, **kwargs)
+            except DBAPIError as exc:
+                if not is_retryable(exc):
+                    raise
+                db.rollback()
+                _record(exc, gave_up=attempt == DB_RETRY_ATTEMPTS)
+                if attempt == DB_RETRY_ATTEMPTS:
+                    logger.warning("%s gave up after %d lock conflicts", fn.__name__, attempt)
+                    raise _conflict_exhausted() from exc
+                time.sleep(backoff_delay(attempt))
+
+    return wrapper
+
+
+async def run_sync_with_retry(db, fn):
+    """``await db.run_sync(fn)`` with the same retry policy as retry_on_conflict."""
+    for attempt in range(1, DB_RETRY_ATTEMPTS + 1):
+        try:
+            return await db.run_sync(fn)
+        except DBAPIError as exc:
+            if not is_retryable(exc):
+                raise
+            await db.rollback()
+            _record(exc, gave_up=attempt == DB_RETRY_ATTEMPTS)
+            if attempt == DB_RETRY_ATTEMPTS:
+                logger.warning("run_sync gave up after %d lock conflicts", attempt)
+                raise _conflict_exhausted() from exc
+            await asyncio.sleep(backoff_delay(attempt))
@@ -0,0 +1,52 @@
+"""Pre-encoded JSON responses for the hot list endpoints.
+
+A route that returns model instances pays twice per row: once to build the
+model, and again when FastAPI validates the list against ``response_model``
+and serializes it. The list endpoints select only the columns they show, turn
+each row into a plain dict and return rows_response(), whose body is encoded
+in a single pass. FastAPI passes a returned Response through untouched. The
+route keeps its ``response_model``, which then only documents the schema in
+OpenAPI, so the dicts must match that model field for field.
+
+orjson is used when it is installed. Otherwise the standard library's json is
+used, which is slower but produces the same output.
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Iterable, Mapping
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_response(rows: Iterable[dict], headers: Mapping[str, str] | None = None) -> FastJSONResponse:
+    """A JSON array of rows, copying headers a route set on its injected Response."""
+    if headers is not None:
+        headers = {name: value for name, value in headers.items() if name != "content-length"}
+    return FastJSONResponse(list(rows), headers=headers)
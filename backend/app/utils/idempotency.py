@@ -0,0 +1,76 @@
+"""Idempotency-Key support for money-moving endpoints.
+
+A client that may retry a transfer or top-up sends a unique Idempotency-Key
+header. The first successful request stores its response under
+(user_id, key) in the same transaction as the money movement; a retry with the
+same key finds it with a primary-key read and gets the stored response back
+instead of moving money twice. Reusing a key for a different request body is
+an error. Keys expire after IDEMPOTENCY_KEY_TTL_HOURS and are purged by the
+background sweeper.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+IDEMPOTENCY_REPLAYED_HEADER = "Idempotent-Replayed"
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(scope: str, payload: dict) -> str:
+    canonical = json.dumps([scope, payload], sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def find_key(db: Session, user_id: int, key: str) -> Optional[IdempotencyKey]:
+    record = db.get(IdempotencyKey, (user_id, key))
+    if record is None:
+        return None
+    if record.expires_at < datetime.utcnow():
+        # Expired but not purged yet: the key is free again. The delete is
+        # flushed with the caller's commit (as an UPDATE if store_key() reuses it).
+        db.delete(record)
+        return None
+    return record
+
+
+def store_key(
+    db: Session,
+    user_id: int,
+    key: str,
+    fingerprint: str,
+    status_code: int,
+    body: dict,
+) -> None:
+    """Stage the response; it is written by the caller's commit, together with the money movement."""
+    now = datetime.utcnow()
+    db.add(
+        IdempotencyKey(
+            user_id=user_id,
+            key=key,
+            fingerprint=fingerprint,
+            status_code=status_code,
+            response=json.dumps(body, default=str),
+            created_at=now,
+            expires_at=now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS),
+        )
+    )
+
+
+def purge_expired_keys(now: datetime) -> int:
+    with SessionLocal() as db:
+        removed = (
+            db.query(IdempotencyKey)
+            .filter(IdempotencyKey.expires_at < now)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+    return removed
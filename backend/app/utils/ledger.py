@@ -0,0 +1,215 @@
+"""Append-only double-entry ledger behind account and card balances.
+
+Every change to Account.balance or Card.balance writes a pair of ledger entries
+in the same transaction: a debit (negative) on one book and the matching credit
+on another, so the whole ledger always sums to zero. Entries are only inserted,
+never updated, so they take no row locks and form the audit trail.
+
+Account.balance and Card.balance stay the hot copy that routes read and lock.
+The overdraft check needs that lock on the paying row whatever is stored. The
+ledger is authoritative:
+
+* checkpoint_balances() folds entries older than LEDGER_CHECKPOINT_LAG
+  seconds into one balance_checkpoints row per book. The lag gives
+  transactions that drew lower entry ids time to commit. It runs as one job
+  (checkpoint_ledger.py), not in every API worker. On Postgres an advisory
+  lock also keeps two runs from folding the same entries twice.
+* ledger_balance() is a book's checkpoint plus the entries since it, an index
+  range scan over a few recent rows.
+* reconcile() checks the stored balances (shards included) against the
+  ledger. It works in chunks of LEDGER_RECONCILE_CHUNK books spread over
+  LEDGER_RECONCILE_WORKERS threads, each chunk reading one consistent
+  snapshot.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, func, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.account import Account, AccountBalanceShard
+from app.models.card import Card
+from app.models.ledger import ACCOUNT_BOOK, CARD_BOOK, SYSTEM_BOOK, BalanceCheckpoint, LedgerEntry
+
+LEDGER_CHECKPOINT_LAG = float(os.getenv("LEDGER_CHECKPOINT_LAG", "300"))
+LEDGER_RECONCILE_CHUNK = int(os.getenv("LEDGER_RECONCILE_CHUNK", "10000"))
+LEDGER_RECONCILE_WORKERS = int(os.getenv("LEDGER_RECONCILE_WORKERS", "4"))
+
+SYSTEM = (SYSTEM_BOOK, 0)
+# pg_advisory_xact_lock key held while folding checkpoints.
+_CHECKPOINT_LOCK_KEY = 7_310_463
+MAX_REPORTED_MISMATCHES = 100
+
+BOOK_TABLES = {ACCOUNT_BOOK: Account, CARD_BOOK: Card}
+_DIALECT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def movement(kind: str, debit: tuple[str, int], credit: tuple[str, int], amount: Decimal,
+             transaction_id: int | None = None) -> list[dict]:
+    """The two entries moving amount from the debit book to the credit book."""
+    now = datetime.utcnow()
+    return [
+        {"book": debit[0], "book_id": debit[1], "amount": -amount, "kind": kind,
+         "transaction_id": transaction_id, "created_at": now},
+        {"book": credit[0], "book_id": credit[1], "amount": amount, "kind": kind,
+         "transaction_id": transaction_id, "created_at": now},
+    ]
+
+
+def adjustment(book: tuple[str, int], delta: Decimal) -> list[dict]:
+    """Entries for an admin setting a balance directly: delta against the system book."""
+    return movement("adjustment", SYSTEM, book, delta)
+
+
+def post(db: Session, entries: list[dict]) -> None:
+    """Stage entries in the caller's transaction with one multi-row INSERT."""
+    if entries:
+        db.execute(insert(LedgerEntry), entries)
+
+
+def ledger_balance(db: Session, book: str, book_id: int) -> Decimal:
+    checkpoint = db.get(BalanceCheckpoint, (book, book_id))
+    since = checkpoint.last_entry_id if checkpoint else 0
+    recent = (
+        db.query(func.coalesce(func.sum(LedgerEntry.amount), 0))
+        .filter(LedgerEntry.book == book, LedgerEntry.book_id == book_id, LedgerEntry.id > since)
+        .scalar()
+    )
+    return (checkpoint.balance if checkpoint else Decimal("0")) + Decimal(recent)
+
+
+def checkpoint_balances(now: datetime) -> int:
+    """Fold settled entries into balance_checkpoints; returns the number of books updated."""
+    with SessionLocal() as db:
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            # Taken before reading the watermark, so a concurrent run that
+            # commits first is seen and its entries are not added again.
+            db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _CHECKPOINT_LOCK_KEY})
+        watermark = db.query(func.max(BalanceCheckpoint.last_entry_id)).scalar() or 0
+        cutoff = now - timedelta(seconds=LEDGER_CHECKPOINT_LAG)
+        upto = (
+            db.query(func.max(LedgerEntry.id))
+            .filter(LedgerEntry.id > watermark, LedgerEntry.created_at < cutoff)
+            .scalar()
+        )
+        if upto is None:
+            return 0
+        totals = (
+            db.query(LedgerEntry.book, LedgerEntry.book_id, func.sum(LedgerEntry.amount))
+            .filter(LedgerEntry.id > watermark, LedgerEntry.id <= upto)
+            .group_by(LedgerEntry.book, LedgerEntry.book_id)
+            .order_by(LedgerEntry.book, LedgerEntry.book_id)
+            .all()
+        )
+        table = BalanceCheckpoint.__table__
+        stmt = _DIALECT_INSERTS[dialect](table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.book, table.c.book_id],
+            set_={
+                "balance": table.c.balance + stmt.excluded.balance,
+                "last_entry_id": stmt.excluded.last_entry_id,
+                "checkpointed_at": stmt.excluded.checkpointed_at,
+            },
+        )
+        db.execute(
+            stmt,
+            [
+                {"book": book, "book_id": book_id, "balance": total, "last_entry_id": upto, "checkpointed_at": now}
+                for book, book_id, total in totals
+            ],
+        )
+        db.commit()
+    return len(totals)
+
+
+def _reconcile_chunk(book: str, low: int, high: int) -> tuple[int, list[dict]]:
+    model = BOOK_TABLES[book]
+    with SessionLocal() as db:
+        if db.get_bind().dialect.name == "postgresql":
+            # Stored balances and entries must come from the same snapshot.
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        stored = {
+            book_id: Decimal(balance or 0)
+            for book_id, balance in db.query(model.id, model.balance).filter(model.id >= low, model.id < high)
+        }
+        if model is Account:
+            # A sharded account's money is its balance plus its shards.
+            for book_id, shard_total in (
+                db.query(AccountBalanceShard.account_id, func.sum(AccountBalanceShard.balance))
+                .filter(AccountBalanceShard.account_id >= low, AccountBalanceShard.account_id < high)
+                .group_by(AccountBalanceShard.account_id)
+            ):
+                if book_id in stored:
+                    stored[book_id] += Decimal(shard_total or 0)
+        checkpoints = {
+            cp.book_id: cp
+            for cp in db.query(BalanceCheckpoint).filter(
+                BalanceCheckpoint.book == book,
+                BalanceCheckpoint.book_id >= low,
+                BalanceCheckpoint.book_id < high,
+            )
+        }
+        recent = dict(
+            db.query(LedgerEntry.book_id, func.sum(LedgerEntry.amount))
+            .outerjoin(
+                BalanceCheckpoint,
+                and_(BalanceCheckpoint.book == LedgerEntry.book, BalanceCheckpoint.book_id == LedgerEntry.book_id),
+            )
+            .filter(
+                LedgerEntry.book == book,
+                LedgerEntry.book_id >= low,
+                LedgerEntry.book_id < high,
+                LedgerEntry.id > func.coalesce(BalanceCheckpoint.last_entry_id, 0),
+            )
+            .group_by(LedgerEntry.book_id)
+        )
+    mismatches = []
+    for book_id in sorted(set(stored) | set(checkpoints) | set(recent)):
+        checkpoint = checkpoints.get(book_id)
+        derived = (Decimal(checkpoint.balance) if checkpoint else Decimal("0")) + Decimal(recent.get(book_id) or 0)
+        if stored.get(book_id) != derived:
+            mismatches.append({
+                "book": book,
+                "book_id": book_id,
+                "stored": None if book_id not in stored else str(stored[book_id]),
+                "ledger": str(derived),
+            })
+    return len(stored), mismatches
+
+
+def reconcile(chunk_size: int = LEDGER_RECONCILE_CHUNK, workers: int = LEDGER_RECONCILE_WORKERS) -> dict:
+    """Compare every account and card balance with the ledger."""
+    jobs = []
+    with SessionLocal() as db:
+        for book, model in BOOK_TABLES.items():
+            low, high = db.query(func.min(model.id), func.max(model.id)).one()
+            entry_low, entry_high = (
+                db.query(func.min(LedgerEntry.book_id), func.max(LedgerEntry.book_id))
+                .filter(LedgerEntry.book == book)
+                .one()
+            )
+            bounds = [value for value in (low, high, entry_low, entry_high) if value is not None]
+            if not bounds:
+                continue
+            for start in range(min(bounds), max(bounds) + 1, chunk_size):
+                jobs.append((book, start, start + chunk_size))
+        # Entries missing their other half would show up here.
+        imbalance = db.query(func.coalesce(func.sum(LedgerEntry.amount), 0)).scalar()
+
+    checked = 0
+    mismatches: list[dict] = []
+    with ThreadPoolExecutor(max(1, workers)) as executor:
+        for count, found in executor.map(lambda job: _reconcile_chunk(*job), jobs):
+            checked += count
+            mismatches += found
+    return {
+        "checked": checked,
+        "mismatched": len(mismatches),
+        "mismatches": mismatches[:MAX_REPORTED_MISMATCHES],
+        "imbalance": str(Decimal(imbalance)),
+    }
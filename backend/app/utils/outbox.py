@@ -0,0 +1,244 @@
+"""Transactional outbox for money movements.
+
+Routes call emit() next to the rows they write, so an event is stored if and
+only if the money moved. Side work hangs off register()ed handlers and runs
+after the response, on OutboxDispatcher threads:
+
+* Each worker claims up to OUTBOX_BATCH_SIZE due events, oldest first, with
+  SELECT ... FOR UPDATE SKIP LOCKED, so workers in any process never share an
+  event. It runs every handler registered for the event type (and for "*")
+  while holding the claim. Then it deletes the delivered events in the same
+  transaction.
+* Delivery is at least once. A crash before that commit releases the claim
+  and the events are delivered again, so handlers must be idempotent. The
+  event id is a natural dedupe key.
+* If a handler raises, the event is rescheduled. The delay starts at
+  OUTBOX_RETRY_BASE_DELAY, doubles each attempt and is capped at
+  OUTBOX_RETRY_MAX_DELAY. After OUTBOX_MAX_ATTEMPTS the event is marked dead
+  and kept for inspection.
+* Backpressure: the backlog waits in the table, not in memory, and producers
+  never wait for handlers. A worker claims only the batch it is about to run.
+  After a full batch it goes straight back for more. When nothing is due it
+  sleeps OUTBOX_POLL_INTERVAL.
+* stats() reports the backlog, the lag (age of the oldest pending event) and
+  the worker counters. GET /api/internal/outbox serves it.
+
+dispatch_once() runs one batch synchronously, so scripts and local checks need
+no broker. On SQLite, which has no SKIP LOCKED, run a single worker.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "1"))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETRY_BASE_DELAY = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "1"))
+OUTBOX_RETRY_MAX_DELAY = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "300"))
+OUTBOX_LOG_EVENTS = os.getenv("OUTBOX_LOG_EVENTS", "0").lower() in ("1", "true", "yes")
+
+ALL_EVENTS = "*"
+
+
+class Event(NamedTuple):
+    id: int
+    event_type: str
+    payload: dict
+    created_at: datetime
+    attempts: int
+
+
+Handler = Callable[[Event], None]
+_handlers: dict[str, list[Handler]] = defaultdict(list)
+
+
+def register(event_type: str, handler: Handler) -> Handler:
+    """Run handler for every event of event_type ("*" for all events)."""
+    _handlers[event_type].append(handler)
+    return handler
+
+
+def unregister(event_type: str, handler: Handler) -> None:
+    if handler in _handlers.get(event_type, ()):
+        _handlers[event_type].remove(handler)
+
+
+def handlers_for(event_type: str) -> list[Handler]:
+    return [*_handlers.get(event_type, ()), *_handlers.get(ALL_EVENTS, ())]
+
+
+def emit(db: Session, events: list[tuple[str, dict]]) -> None:
+    """Stage (event_type, payload) events in the caller's transaction with one INSERT."""
+    if not events:
+        return
+    now = datetime.utcnow()
+    db.execute(
+        insert(OutboxEvent),
+        [
+            {
+                "event_type": event_type,
+                "payload": json.dumps(payload, default=str),
+                "created_at": now,
+                "available_at": now,
+                "attempts": 0,
+            }
+            for event_type, payload in events
+        ],
+    )
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1), OUTBOX_RETRY_MAX_DELAY))
+
+
+class OutboxDispatcher:
+    """Daemon threads that deliver outbox events to the registered handlers."""
+
+    def __init__(
+        self,
+        workers: int = OUTBOX_WORKERS,
+        batch_size: int = OUTBOX_BATCH_SIZE,
+        poll_interval: float = OUTBOX_POLL_INTERVAL,
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.batches = 0
+        self.handler_seconds_total = 0.0
+        self.last_batch_at: Optional[datetime] = None
+
+    def start(self) -> None:
+        if self._threads or self.workers <= 0:
+            return
+        self._stop.clear()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"outbox-dispatcher-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self.dispatch_once()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def dispatch_once(self) -> int:
+        """Claim and deliver one batch of due events; returns how many were claimed."""
+        with SessionLocal() as db:
+            now = datetime.utcnow()
+            rows = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.dead_at.is_(None), OutboxEvent.available_at <= now)
+                .order_by(OutboxEvent.available_at, OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not rows:
+                db.rollback()
+                return 0
+
+            started = time.perf_counter()
+            delivered, retried, dead = [], 0, 0
+            for row in rows:
+                event = Event(row.id, row.event_type, json.loads(row.payload), row.created_at, row.attempts)
+                try:
+                    for handler in handlers_for(row.event_type):
+                        handler(event)
+                except Exception as exc:
+                    row.attempts += 1
+                    row.last_error = repr(exc)[:1000]
+                    if row.attempts >= OUTBOX_MAX_ATTEMPTS:
+                        row.dead_at = now
+                        dead += 1
+                        logger.error("Outbox event %d (%s) is dead after %d attempts: %r",
+                                     row.id, row.event_type, row.attempts, exc)
+                    else:
+                        row.available_at = now + _retry_delay(row.attempts)
+                        retried += 1
+                        logger.warning("Outbox event %d (%s) failed, retrying: %r", row.id, row.event_type, exc)
+                else:
+                    delivered.append(row.id)
+            elapsed = time.perf_counter() - started
+            if delivered:
+                db.execute(
+                    delete(OutboxEvent)
+                    .where(OutboxEvent.id.in_(delivered))
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+
+        with self._lock:
+            self.delivered += len(delivered)
+            self.retried += retried
+            self.dead += dead
+            self.batches += 1
+            self.handler_seconds_total += elapsed
+            self.last_batch_at = now
+        return len(rows)
+
+    def stats(self) -> dict:
+        with SessionLocal() as db:
+            pending, oldest = (
+                db.query(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at))
+                .filter(OutboxEvent.dead_at.is_(None))
+                .one()
+            )
+            dead_rows = db.query(func.count(OutboxEvent.id)).filter(OutboxEvent.dead_at.isnot(None)).scalar()
+        now = datetime.utcnow()
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "pending": pending,
+                "dead_rows": dead_rows,
+                "lag_seconds": round((now - oldest).total_seconds(), 3) if oldest else 0.0,
+                "delivered": self.delivered,
+                "retried": self.retried,
+                "dead": self.dead,
+                "batches": self.batches,
+                "handler_seconds_total": round(self.handler_seconds_total, 6),
+                "last_batch_at": self.last_batch_at.isoformat() if self.last_batch_at else None,
+                "handlers": {event_type: len(handlers) for event_type, handlers in _handlers.items() if handlers},
+            }
+
+
+# The worker's dispatcher; main.py starts it (OUTBOX_WORKERS=0 leaves it off).
+dispatcher = OutboxDispatcher()
+
+
+def _log_event(event: Event) -> None:
+    logger.info("outbox %s #%d %s", event.event_type, event.id, event.payload)
+
+
+if OUTBOX_LOG_EVENTS:
+    register(ALL_EVENTS, _log_event)
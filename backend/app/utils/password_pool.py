@@ -0,0 +1,124 @@
+"""Dedicated process pool for bcrypt.
+
+Hashing and verifying a password costs tens of milliseconds of CPU. Running it
+inline ties up a request thread for that long and competes with every other
+request on the worker, so a login storm slows down unrelated reads. Instead the
+work is shipped to PASSWORD_POOL_WORKERS child processes.
+
+At most PASSWORD_POOL_MAX_PENDING calls may be queued or running at once;
+beyond that submit() raises PasswordPoolBusy straight away (the API answers 503)
+rather than letting logins pile up behind each other. PASSWORD_POOL_WORKERS=0
+runs the work inline, which is what tests and one-off scripts want.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv("PASSWORD_POOL_MAX_PENDING", str(max(PASSWORD_POOL_WORKERS, 1) * 8)))
+
+
+class PasswordPoolBusy(RuntimeError):
+    pass
+
+
+class PasswordPool:
+    def __init__(self, workers: int = PASSWORD_POOL_WORKERS, max_pending: int = PASSWORD_POOL_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.workers <= 0:
+            return
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the parent has DB connections and threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+
+    def submit(self, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise PasswordPoolBusy("Password hashing queue is full")
+            self._pending += 1
+        if self.workers <= 0:
+            future: Future = Future()
+            try:
+                future.set_result(fn(*args))
+            except BaseException as exc:
+                future.set_exception(exc)
+        else:
+            self.start()
+            try:
+                future = self._executor.submit(fn, *args)
+            except BaseException:
+                with self._lock:
+                    self._pending -= 1
+                raise
+        future.add_done_callback(self._release)
+        return future
+
+    def run(self, fn, *args):
+        """Run fn in the pool and wait for it (sync routes; blocks only the calling thread)."""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        if self.workers <= 0:
+            return await asyncio.to_thread(self.run, fn, *args)
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def map(self, fn, items: list) -> list:
+        """fn over items for batch jobs: uses at most half the queue, leaving room for logins."""
+        limit = max(1, self.max_pending // 2)
+        results = [None] * len(items)
+        in_flight: deque[tuple[int, Future]] = deque()
+        for index, item in enumerate(items):
+            if len(in_flight) >= limit:
+                done, future = in_flight.popleft()
+                results[done] = future.result()
+            while True:
+                try:
+                    in_flight.append((index, self.submit(fn, item)))
+                    break
+                except PasswordPoolBusy:
+                    if in_flight:
+                        done, future = in_flight.popleft()
+                        results[done] = future.result()
+                    else:
+                        time.sleep(0.05)
+        for done, future in in_flight:
+            results[done] = future.result()
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
@@ -0,0 +1,86 @@
+"""Per-worker cache of authenticated principals, keyed by session token.
+
+get_current_user used to load the whole User row on every request just to
+learn who is calling. A Principal is the immutable part of that answer (id,
+role, is_active, display name); it is cached for PRINCIPAL_CACHE_TTL seconds
+so routes that only need the caller's identity never touch the database.
+
+Entries are dropped explicitly when the user's status, role or profile changes
+and when their sessions are revoked. Each worker keeps its own cache, so a
+change made on another worker is picked up once the TTL runs out.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+from app.models.user import RoleEnum
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+
+
+class Principal(NamedTuple):
+    id: int
+    role: RoleEnum
+    is_active: bool
+    display_name: Optional[str]
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(user.id, user.role, user.is_active, user.display_name)
+
+
+class PrincipalCache:
+    def __init__(self, maxsize: int = PRINCIPAL_CACHE_SIZE, ttl: float = PRINCIPAL_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _forget(self, token: str) -> None:
+        cached = self._cache.pop(token, None)
+        if cached is not None:
+            tokens = self._by_user.get(cached[1].id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_user[cached[1].id]
+
+    def get(self, token: str) -> Optional[Principal]:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is None:
+                return None
+            if cached[0] <= time.monotonic():
+                self._forget(token)
+                return None
+            self._cache.move_to_end(token)
+            return cached[1]
+
+    def put(self, token: str, principal: Principal) -> None:
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._forget(token)
+            self._cache[token] = (time.monotonic() + self.ttl, principal)
+            self._by_user.setdefault(principal.id, set()).add(token)
+            while len(self._cache) > self.maxsize:
+                self._forget(next(iter(self._cache)))
+
+    def invalidate_token(self, token: str) -> None:
+        with self._lock:
+            self._forget(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._forget(token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"principals": len(self._cache), "principal_users": len(self._by_user)}
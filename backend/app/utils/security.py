@@ -1,3 +1,5 @@
+import os
+
 import bcrypt
 
 # passlib expects bcrypt.__about__.__version__, but some builds of bcrypt omit
@@ -11,7 +13,11 @@ if not hasattr(bcrypt, "__about__"):
 
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt work factor for new hashes. Each +1 doubles the cost of a login;
+# existing hashes are upgraded (or downgraded) on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=BCRYPT_ROUNDS)
 MAX_BCRYPT_LENGTH = 72
 
 
@@ -24,7 +30,7 @@ def hash_password(password: str) -> str:
         return pwd_context.hash(password)
     except ValueError:
     
-        hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+        hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=BCRYPT_ROUNDS))
         return hashed.decode("utf-8")
 
 
@@ -38,3 +44,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except ValueError:
         # fallback verify using bcrypt directly
         return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+
+def bcrypt_rounds(hashed_password: str) -> int | None:
+    # $2b$12$<salt+hash>
+    parts = hashed_password.split("$")
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    return bcrypt_rounds(hashed_password) != BCRYPT_ROUNDS
+
+
+def verify_and_rehash(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify a password; on success also return a fresh hash if the stored cost is stale."""
+    if not verify_password(plain_password, hashed_password):
+        return False, None
+    if needs_rehash(hashed_password):
+        return True, hash_password(plain_password)
+    return True, None
@@ -9,19 +9,21 @@ SESSION_EXPIRY_HOURS = 24
 def create_session(db: DBSession, user_id: int) -> str:
     token = secrets.token_urlsafe(32)
     expires = datetime.utcnow() + timedelta(hours=SESSION_EXPIRY_HOURS)
+    save_session(db, token, user_id, expires)
+    return token
+
 
-    session = Session(
-        user_id=user_id,
-        session_token=token,
-        expires_at=expires
-    )
-    db.add(session)
+def save_session(db: DBSession, token: str, user_id: int, expires_at: datetime) -> None:
+    db.add(Session(user_id=user_id, session_token=token, expires_at=expires_at))
     db.commit()
-    return token
+
+
+def find_session(db: DBSession, token: str) -> Session | None:
+    return db.query(Session).filter(Session.session_token == token).first()
 
 
 def get_user_by_session(db: DBSession, token: str):
-    session = db.query(Session).filter(Session.session_token == token).first()
+    session = find_session(db, token)
 
     if not session or session.expires_at < datetime.utcnow():
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired session")
@@ -32,3 +34,19 @@ def get_user_by_session(db: DBSession, token: str):
 def delete_session(db: DBSession, token: str):
     db.query(Session).filter(Session.session_token == token).delete()
     db.commit()
+
+
+def delete_user_sessions(db: DBSession, user_id: int) -> int:
+    deleted = db.query(Session).filter(Session.user_id == user_id).delete()
+    db.commit()
+    return deleted
+
+
+def delete_expired_sessions(db: DBSession, now: datetime) -> int:
+    deleted = db.query(Session).filter(Session.expires_at < now).delete()
+    db.commit()
+    return deleted
+
+
+def count_active_sessions(db: DBSession, now: datetime) -> int:
+    return db.query(Session).filter(Session.expires_at >= now).count()
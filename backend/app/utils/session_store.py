@@ -0,0 +1,398 @@
+"""Pluggable storage for login sessions.
+
+SESSION_BACKEND selects where bearer tokens live:
+
+* ``memory`` - a dict in the worker process (single-worker deployments only)
+* ``db``     - the ``sessions`` table, shared by every worker
+* ``redis``  - any Redis-protocol server at SESSION_REDIS_URL
+
+Shared backends are wrapped in a small per-worker LRU so validating a hot
+token does not cost a round trip on every request. A logout on one worker
+reaches the others once their cached entry expires (SESSION_CACHE_TTL).
+
+A SessionSweeper thread periodically drops expired sessions so tokens that are
+never presented again do not accumulate.
+"""
+import heapq
+import logging
+from abc import ABC, abstractmethod
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, NamedTuple, Optional, Sequence
+
+from app.database import SessionLocal
+from app.utils import session_manager
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_REDIS_URL = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "30"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "500000"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+logger = logging.getLogger(__name__)
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class SessionRecord(NamedTuple):
+    user_id: int
+    expires_at: datetime
+
+
+class SessionStore(ABC):
+    """Interface shared by every backend."""
+
+    # True when calls may block on I/O; async callers then use the threadpool.
+    blocking = False
+
+    @abstractmethod
+    def save(self, token: str, record: SessionRecord) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, token: str) -> Optional[SessionRecord]:
+        ...
+
+    @abstractmethod
+    def delete(self, token: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete_user_sessions(self, user_id: int) -> int:
+        """Revoke every session of user_id; returns how many were removed."""
+
+    def sweep(self, now: datetime) -> int:
+        """Drop sessions that expired before now; returns how many were removed."""
+        return 0
+
+    def stats(self) -> dict:
+        return {"backend": type(self).__name__}
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions in this process.
+
+    Records are SessionRecord tuples. A per-user token index makes logout-all
+    O(sessions of the user), and a min-heap on expiry lets the sweeper and the
+    SESSION_MAX_COUNT eviction find the oldest sessions without scanning.
+    Heap entries for deleted tokens are skipped lazily.
+    """
+
+    def __init__(self, max_sessions: int = SESSION_MAX_COUNT):
+        self.max_sessions = max_sessions
+        self.sessions: dict[str, SessionRecord] = {}
+        self.by_user: dict[int, set[str]] = {}
+        self._expiry_heap: list[tuple[datetime, str]] = []
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.swept = 0
+
+    def _remove(self, token: str) -> Optional[SessionRecord]:
+        record = self.sessions.pop(token, None)
+        if record is not None:
+            tokens = self.by_user.get(record.user_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self.by_user[record.user_id]
+        return record
+
+    def _pop_heap_until(self, stop) -> int:
+        """Pop heap entries while stop(expires_at) holds; returns live sessions removed."""
+        removed = 0
+        heap = self._expiry_heap
+        while heap and stop(heap[0][0]):
+            expires_at, token = heapq.heappop(heap)
+            record = self.sessions.get(token)
+            if record is not None and record.expires_at == expires_at:
+                self._remove(token)
+                removed += 1
+        return removed
+
+    def save(self, token: str, record: SessionRecord) -> None:
+        with self._lock:
+            self._remove(token)
+            self.sessions[token] = record
+            self.by_user.setdefault(record.user_id, set()).add(token)
+            heapq.heappush(self._expiry_heap, (record.expires_at, token))
+            if len(self.sessions) > self.max_sessions:
+                # Evict the sessions closest to expiry first.
+                self.evicted += self._pop_heap_until(lambda _: len(self.sessions) > self.max_sessions)
+            if len(self._expiry_heap) > 2 * len(self.sessions) + 1024:
+                self._expiry_heap = [(r.expires_at, t) for t, r in self.sessions.items()]
+                heapq.heapify(self._expiry_heap)
+
+    def get(self, token: str) -> Optional[SessionRecord]:
+        return self.sessions.get(token)
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            self._remove(token)
+
+    def delete_user_sessions(self, user_id: int) -> int:
+        with self._lock:
+            tokens = self.by_user.pop(user_id, set())
+            for token in tokens:
+                self.sessions.pop(token, None)
+            return len(tokens)
+
+    def sweep(self, now: datetime) -> int:
+        with self._lock:
+            removed = self._pop_heap_until(lambda expires_at: expires_at < now)
+            self.swept += removed
+            return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            count = len(self.sessions)
+            per_session = 0
+            if count:
+                token, record = next(iter(self.sessions.items()))
+                per_session = (
+                    sys.getsizeof(token) + sys.getsizeof(record) + sys.getsizeof(record.expires_at)
+                    + sys.getsizeof((record.expires_at, token))
+                )
+            approx_bytes = (
+                sys.getsizeof(self.sessions)
+                + sys.getsizeof(self.by_user)
+                + sys.getsizeof(self._expiry_heap)
+                + sum(sys.getsizeof(tokens) for tokens in self.by_user.values())
+                + count * per_session
+            )
+            return {
+                "backend": "memory",
+                "sessions": count,
+                "users": len(self.by_user),
+                "heap_entries": len(self._expiry_heap),
+                "max_sessions": self.max_sessions,
+                "evicted": self.evicted,
+                "swept": self.swept,
+                "approx_bytes": approx_bytes,
+            }
+
+
+class DatabaseSessionStore(SessionStore):
+    """Sessions in the ``sessions`` table, each call on its own short DB session."""
+
+    blocking = True
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def save(self, token: str, record: SessionRecord) -> None:
+        with self.session_factory() as db:
+            session_manager.save_session(db, token, record.user_id, record.expires_at)
+
+    def get(self, token: str) -> Optional[SessionRecord]:
+        with self.session_factory() as db:
+            row = session_manager.find_session(db, token)
+            if row is None:
+                return None
+            return SessionRecord(row.user_id, row.expires_at)
+
+    def delete(self, token: str) -> None:
+        with self.session_factory() as db:
+            session_manager.delete_session(db, token)
+
+    def delete_user_sessions(self, user_id: int) -> int:
+        with self.session_factory() as db:
+            return session_manager.delete_user_sessions(db, user_id)
+
+    def sweep(self, now: datetime) -> int:
+        with self.session_factory() as db:
+            return session_manager.delete_expired_sessions(db, now)
+
+    def stats(self) -> dict:
+        with self.session_factory() as db:
+            count = session_manager.count_active_sessions(db, datetime.utcnow())
+        return {"backend": "db", "sessions": count}
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions as ``session:<token>`` keys that Redis expires on its own.
+
+    ``client`` is anything speaking the redis-py API (get/set/delete), so a
+    local stand-in such as fakeredis works for development and tests.
+    """
+
+    blocking = True
+    key_prefix = "session:"
+    user_key_prefix = "session_user:"
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisSessionStore":
+        import redis
+
+        return cls(redis.Redis.from_url(url))
+
+    def save(self, token: str, record: SessionRecord) -> None:
+        ttl_ms = int((record.expires_at - datetime.utcnow()).total_seconds() * 1000)
+        if ttl_ms <= 0:
+            return
+        value = f"{record.user_id}:{(record.expires_at - _EPOCH).total_seconds():.6f}"
+        user_key = f"{self.user_key_prefix}{record.user_id}"
+        pipe = self.client.pipeline()
+        pipe.set(self.key_prefix + token, value, px=ttl_ms)
+        pipe.sadd(user_key, token)
+        pipe.pexpire(user_key, ttl_ms)
+        pipe.execute()
+
+    def get(self, token: str) -> Optional[SessionRecord]:
+        raw = self.client.get(self.key_prefix + token)
+        if raw is None:
+            return None
+        if isinstance(raw, bytes):
+            raw = raw.decode()
+        user_id, expires_ts = raw.split(":", 1)
+        return SessionRecord(int(user_id), _EPOCH + timedelta(seconds=float(expires_ts)))
+
+    def delete(self, token: str) -> None:
+        record = self.get(token)
+        self.client.delete(self.key_prefix + token)
+        if record is not None:
+            self.client.srem(f"{self.user_key_prefix}{record.user_id}", token)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+    def delete_user_sessions(self, user_id: int) -> int:
+        user_key = f"{self.user_key_prefix}{user_id}"
+        tokens = [t.decode() if isinstance(t, bytes) else t for t in self.client.smembers(user_key)]
+        removed = self.client.delete(*[self.key_prefix + t for t in tokens]) if tokens else 0
+        self.client.delete(user_key)
+        return removed
+
+
+class CachedSessionStore(SessionStore):
+    """Per-worker LRU in front of a shared store. Only hits are cached."""
+
+    def __init__(self, backend: SessionStore, maxsize: int = SESSION_CACHE_SIZE, ttl: float = SESSION_CACHE_TTL):
+        self.backend = backend
+        self.blocking = backend.blocking
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache: OrderedDict[str, tuple[float, SessionRecord]] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _forget(self, token: str) -> None:
+        cached = self._cache.pop(token, None)
+        if cached is not None:
+            tokens = self._by_user.get(cached[1].user_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._by_user[cached[1].user_id]
+
+    def _remember(self, token: str, record: SessionRecord) -> None:
+        with self._lock:
+            self._forget(token)
+            self._cache[token] = (time.monotonic() + self.ttl, record)
+            self._by_user.setdefault(record.user_id, set()).add(token)
+            while len(self._cache) > self.maxsize:
+                self._forget(next(iter(self._cache)))
+
+    def save(self, token: str, record: SessionRecord) -> None:
+        self.backend.save(token, record)
+        self._remember(token, record)
+
+    def get(self, token: str) -> Optional[SessionRecord]:
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                if cached[0] > time.monotonic():
+                    self._cache.move_to_end(token)
+                    return cached[1]
+                self._forget(token)
+        record = self.backend.get(token)
+        if record is not None:
+            self._remember(token, record)
+        return record
+
+    def delete(self, token: str) -> None:
+        with self._lock:
+            self._forget(token)
+        self.backend.delete(token)
+
+    def delete_user_sessions(self, user_id: int) -> int:
+        with self._lock:
+            for token in list(self._by_user.get(user_id, ())):
+                self._forget(token)
+        return self.backend.delete_user_sessions(user_id)
+
+    def sweep(self, now: datetime) -> int:
+        return self.backend.sweep(now)
+
+    def stats(self) -> dict:
+        stats = self.backend.stats()
+        with self._lock:
+            stats["cached_sessions"] = len(self._cache)
+        return stats
+
+
+def build_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "db":
+        return CachedSessionStore(DatabaseSessionStore())
+    if backend == "redis":
+        return CachedSessionStore(RedisSessionStore.from_url(SESSION_REDIS_URL))
+    raise ValueError(f"Unknown SESSION_BACKEND {backend!r}; expected memory, db or redis")
+
+
+class SessionSweeper:
+    """Daemon thread that calls store.sweep() every interval seconds.
+
+    extra_sweeps are other ``fn(now) -> removed`` purges of expiring rows that
+    piggyback on the same thread.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        interval: float = SESSION_SWEEP_INTERVAL,
+        extra_sweeps: Sequence[Callable[[datetime], int]] = (),
+    ):
+        self.store = store
+        self.interval = interval
+        self.extra_sweeps = list(extra_sweeps)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                removed = self.store.sweep(datetime.utcnow())
+                if removed:
+                    logger.info("Swept %d expired sessions", removed)
+            except Exception:
+                logger.exception("Session sweep failed")
+            for sweep in self.extra_sweeps:
+                try:
+                    removed = sweep(datetime.utcnow())
+                    if removed:
+                        logger.info("%s processed %d rows", sweep.__name__, removed)
+                except Exception:
+                    logger.exception("%s failed", sweep.__name__)
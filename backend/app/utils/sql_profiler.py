@@ -0,0 +1,168 @@
+"""Request-scoped SQL instrumentation.
+
+Engine events time every statement and charge it to the profile of the request
+being served (tracked through a ContextVar, which follows the request into the
+threadpool and into AsyncSession greenlets). The ASGI middleware reports the
+totals as response headers and folds them into per-route statistics, and warns
+when one request repeats the same statement often enough to look like an N+1.
+"""
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILING = os.getenv("SQL_PROFILING", "1").lower() in ("1", "true", "yes")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "10"))
+SLOWEST_KEPT = 5
+
+QUERY_COUNT_HEADER = "x-db-query-count"
+QUERY_TIME_HEADER = "x-db-time-ms"
+
+
+class RequestProfile:
+    __slots__ = ("query_count", "db_seconds", "statements", "slowest", "warned")
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.statements: Counter[str] = Counter()
+        self.slowest: list[tuple[float, str]] = []
+        self.warned: set[str] = set()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.query_count += 1
+        self.db_seconds += seconds
+        self.statements[statement] += 1
+        _keep_slowest(self.slowest, seconds, statement)
+
+
+def _keep_slowest(slowest: list[tuple[float, str]], seconds: float, statement: str) -> None:
+    if len(slowest) < SLOWEST_KEPT or seconds > slowest[-1][0]:
+        slowest.append((seconds, statement))
+        slowest.sort(key=lambda item: item[0], reverse=True)
+        del slowest[SLOWEST_KEPT:]
+
+
+_current_profile: ContextVar[RequestProfile | None] = ContextVar("sql_profile", default=None)
+
+
+class RouteStats:
+    __slots__ = ("requests", "query_count", "db_seconds", "max_queries", "slowest")
+
+    def __init__(self):
+        self.requests = 0
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self.max_queries = 0
+        self.slowest: list[tuple[float, str]] = []
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "queries": self.query_count,
+            "avg_queries": round(self.query_count / self.requests, 2) if self.requests else 0,
+            "max_queries": self.max_queries,
+            "db_ms_total": round(self.db_seconds * 1000, 3),
+            "db_ms_avg": round(self.db_seconds * 1000 / self.requests, 3) if self.requests else 0,
+            "slowest": [
+                {"ms": round(seconds * 1000, 3), "statement": statement}
+                for seconds, statement in self.slowest
+            ],
+        }
+
+
+_route_stats: dict[str, RouteStats] = {}
+_route_stats_lock = threading.Lock()
+
+
+def _record_route(route: str, profile: RequestProfile) -> None:
+    with _route_stats_lock:
+        stats = _route_stats.get(route)
+        if stats is None:
+            stats = _route_stats[route] = RouteStats()
+        stats.requests += 1
+        stats.query_count += profile.query_count
+        stats.db_seconds += profile.db_seconds
+        stats.max_queries = max(stats.max_queries, profile.query_count)
+        for seconds, statement in profile.slowest:
+            _keep_slowest(stats.slowest, seconds, statement)
+
+
+def route_stats() -> dict:
+    with _route_stats_lock:
+        return {route: stats.as_dict() for route, stats in sorted(_route_stats.items())}
+
+
+def reset_route_stats() -> None:
+    with _route_stats_lock:
+        _route_stats.clear()
+
+
+def install(sync_engine) -> None:
+    """Attach the timing listeners to an engine (use .sync_engine for async engines)."""
+    if not SQL_PROFILING:
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        if _current_profile.get() is not None:
+            conn.info.setdefault("sql_profiler_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        profile = _current_profile.get()
+        starts = conn.info.get("sql_profiler_start")
+        if profile is None or not starts:
+            return
+        profile.record(statement, time.perf_counter() - starts.pop())
+        if profile.statements[statement] > N_PLUS_ONE_THRESHOLD and statement not in profile.warned:
+            profile.warned.add(statement)
+            logger.warning(
+                "Possible N+1: statement issued more than %d times in one request: %s",
+                N_PLUS_ONE_THRESHOLD,
+                statement,
+            )
+
+
+def _route_name(scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or "<unmatched>"
+    return f"{scope.get('method', '')} {path}"
+
+
+class SQLProfilerMiddleware:
+    """ASGI middleware that opens a RequestProfile per HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_PROFILING:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((QUERY_COUNT_HEADER.encode(), str(profile.query_count).encode()))
+                headers.append(
+                    (QUERY_TIME_HEADER.encode(), f"{profile.db_seconds * 1000:.3f}".encode())
+                )
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_profile.reset(token)
+            if profile.query_count:
+                _record_route(_route_name(scope), profile)
@@ -0,0 +1,157 @@
+"""Admin search over the whole transactions table (GET /api/transactions/admin/search).
+
+Every filter is optional. The ones that narrow a hundred-million-row table have
+an index behind them:
+
+* created_at ranges use the btree ``ix_transactions_created_at``, which also
+  serves the newest-first order, so a page stops after its first rows.
+* note substrings use the pg_trgm GIN index ``ix_transactions_note_trgm``
+  (migration 8).
+  ILIKE '%term%' needs at least three characters to use it.
+* user and counterparty filters become one branch per side of a UNION ALL over
+  the (party, created_at, id) indexes, like the history query.
+
+Pages are keyset pages on (created_at, id), newest first. Totals come from the
+planner's row estimate on Postgres. Elsewhere they are exact counts, capped at
+SEARCH_COUNT_CAP.
+"""
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+from sqlalchemy import Select, and_, func, or_, select, tuple_, union_all
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Query as ORMQuery, Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.models.transaction import Transaction, TxType
+
+SEARCH_COUNT_CAP = int(os.getenv("SEARCH_COUNT_CAP", "10000"))
+# Shortest note term the trigram index can serve.
+MIN_NOTE_LENGTH = 3
+
+# What the list endpoints serialize; history and search pages select only these.
+LIST_COLUMNS = (
+    Transaction.id,
+    Transaction.sender_id,
+    Transaction.receiver_id,
+    Transaction.amount,
+    Transaction.note,
+    Transaction.created_at,
+    Transaction.tx_type,
+)
+
+
+class SearchFilters(NamedTuple):
+    start: datetime | None = None
+    end: datetime | None = None
+    min_amount: Decimal | None = None
+    max_amount: Decimal | None = None
+    tx_type: TxType | None = None
+    note: str | None = None
+    user_id: int | None = None
+    counterparty_id: int | None = None
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) around a statement, compiled with its bind parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _conditions(filters: SearchFilters) -> list:
+    conditions = []
+    if filters.start is not None:
+        conditions.append(Transaction.created_at >= filters.start)
+    if filters.end is not None:
+        conditions.append(Transaction.created_at < filters.end)
+    if filters.min_amount is not None:
+        conditions.append(Transaction.amount >= filters.min_amount)
+    if filters.max_amount is not None:
+        conditions.append(Transaction.amount <= filters.max_amount)
+    if filters.tx_type is not None:
+        conditions.append(Transaction.tx_type == filters.tx_type)
+    if filters.note:
+        conditions.append(Transaction.note.ilike(f"%{_escape_like(filters.note)}%", escape="\\"))
+    return conditions
+
+
+def _party_sides(filters: SearchFilters) -> list:
+    """One condition per UNION ALL branch; the branches never share a row."""
+    parties = [p for p in dict.fromkeys((filters.user_id, filters.counterparty_id)) if p is not None]
+    if not parties:
+        return [None]
+    if len(parties) == 1:
+        (party,) = parties
+        return [
+            Transaction.sender_id == party,
+            and_(
+                Transaction.receiver_id == party,
+                or_(Transaction.sender_id.is_(None), Transaction.sender_id != party),
+            ),
+        ]
+    a, b = parties
+    return [
+        and_(Transaction.sender_id == a, Transaction.receiver_id == b),
+        and_(Transaction.sender_id == b, Transaction.receiver_id == a),
+    ]
+
+
+def _filtered(filters: SearchFilters, side, columns) -> Select:
+    q = select(*columns).where(*_conditions(filters))
+    if side is not None:
+        q = q.where(side)
+    return q
+
+
+def search_query(
+    db: Session,
+    filters: SearchFilters,
+    fetch: int,
+    before: tuple[datetime, int] | None = None,
+) -> ORMQuery:
+    """LIST_COLUMNS rows of matching transactions, newest first; each branch stops after ``fetch`` rows."""
+    sides = _party_sides(filters)
+    branches = []
+    for side in sides:
+        q = _filtered(filters, side, LIST_COLUMNS)
+        if before is not None:
+            q = q.where(tuple_(Transaction.created_at, Transaction.id) < tuple_(*before))
+        q = q.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(fetch)
+        branches.append(select(q.subquery()))
+    merged = (branches[0] if len(branches) == 1 else union_all(*branches)).subquery()
+    return db.query(*merged.c).order_by(merged.c.created_at.desc(), merged.c.id.desc())
+
+
+def estimate_count(db: Session, filters: SearchFilters) -> int:
+    """Rows matching filters: the planner's estimate on Postgres, else an exact count up to SEARCH_COUNT_CAP."""
+    sides = _party_sides(filters)
+    if db.get_bind().dialect.name == "postgresql":
+        total = 0
+        for side in sides:
+            plan = db.execute(_Explain(_filtered(filters, side, [Transaction.id]))).scalar()
+            if isinstance(plan, str):  # asyncpg hands json back undecoded
+                plan = json.loads(plan)
+            total += int(plan[0]["Plan"]["Plan Rows"])
+        return total
+    total = 0
+    for side in sides:
+        capped = _filtered(filters, side, [Transaction.id]).limit(SEARCH_COUNT_CAP - total).subquery()
+        total += db.execute(select(func.count()).select_from(capped)).scalar()
+        if total >= SEARCH_COUNT_CAP:
+            break
+    return total
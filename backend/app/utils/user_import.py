@@ -0,0 +1,211 @@
+"""Bulk user import for onboarding a partner's customers.
+
+The request body is CSV (first line is the header) or NDJSON, one user per
+line. It is consumed as a stream and handled USER_IMPORT_BATCH_SIZE records at a
+time: each batch is validated in memory, checked against existing users with one
+IN query per unique column, then written with a single multi-row INSERT for the
+users and one for their accounts, and committed. Rows that fail are reported
+with their line number and skipped; the rest of the import carries on.
+
+Each record needs either ``password`` (hashed in the password pool) or a bcrypt
+``hashed_password`` carried over from the partner's system.
+"""
+import codecs
+import csv
+import json
+import os
+from typing import AsyncIterator, Callable, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.account import Account
+from app.models.user import User
+from app.schemas.user import UserImportRow
+from app.utils.security import bcrypt_rounds
+
+USER_IMPORT_BATCH_SIZE = int(os.getenv("USER_IMPORT_BATCH_SIZE", "1000"))
+MAX_REPORTED_ERRORS = 100
+
+# Unique user columns and the message registration has always returned for them.
+UNIQUE_VIOLATIONS = (
+    ("email", "Email already registered"),
+    ("username", "Username already taken"),
+    ("phone_number", "Phone number already registered"),
+)
+
+
+def unique_violation_detail(exc: IntegrityError) -> Optional[str]:
+    message = str(exc.orig)
+    for column, detail in UNIQUE_VIOLATIONS:
+        # SQLite: "UNIQUE constraint failed: users.email"
+        # Postgres: 'Key (email)=(...) already exists.'
+        if f"users.{column}" in message or f"({column})" in message:
+            return detail
+    return None
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    line_no = 0
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_no += 1
+            yield line_no, line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield line_no + 1, pending.rstrip("\r")
+
+
+class UserImporter:
+    def __init__(self, hash_many: Callable[[list[str]], list[str]], batch_size: int = USER_IMPORT_BATCH_SIZE):
+        self.hash_many = hash_many
+        self.batch_size = batch_size
+        self.created = 0
+        self.skipped = 0
+        self.errors: list[dict] = []
+        self._seen: dict[str, set] = {column: set() for column, _ in UNIQUE_VIOLATIONS}
+
+    def _reject(self, line: int, error: str) -> None:
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    async def batches(self, chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[list[tuple[int, dict]]]:
+        """Parse the body into batches of (line number, raw record)."""
+        header: Optional[list[str]] = None
+        batch: list[tuple[int, dict]] = []
+        async for line_no, line in _iter_lines(chunks):
+            if not line.strip():
+                continue
+            try:
+                if fmt == "csv":
+                    values = next(csv.reader([line]))
+                    if header is None:
+                        header = [name.strip() for name in values]
+                        continue
+                    if len(values) != len(header):
+                        raise ValueError(f"expected {len(header)} columns, got {len(values)}")
+                    record = {name: value for name, value in zip(header, values) if value != ""}
+                else:
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError("expected a JSON object")
+            except ValueError as exc:
+                self._reject(line_no, f"Malformed record: {exc}")
+                continue
+            batch.append((line_no, record))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def validate(self, batch: list[tuple[int, dict]]) -> list[tuple[int, UserImportRow]]:
+        rows = []
+        for line_no, record in batch:
+            try:
+                row = UserImportRow.model_validate(record)
+            except ValidationError as exc:
+                first = exc.errors()[0]
+                self._reject(line_no, f"{'.'.join(str(p) for p in first['loc'])}: {first['msg']}")
+                continue
+            if not row.password and not row.hashed_password:
+                self._reject(line_no, "password or hashed_password is required")
+                continue
+            if row.hashed_password and bcrypt_rounds(row.hashed_password) is None:
+                self._reject(line_no, "hashed_password is not a bcrypt hash")
+                continue
+            duplicate = next(
+                (detail for column, detail in UNIQUE_VIOLATIONS if getattr(row, column) in self._seen[column]),
+                None,
+            )
+            if duplicate:
+                self._reject(line_no, duplicate)
+                continue
+            for column, _ in UNIQUE_VIOLATIONS:
+                self._seen[column].add(getattr(row, column))
+            rows.append((line_no, row))
+        return rows
+
+    def drop_existing(self, db: Session, rows: list[tuple[int, UserImportRow]]) -> list[tuple[int, UserImportRow]]:
+        taken = {}
+        for column, _ in UNIQUE_VIOLATIONS:
+            values = [getattr(row, column) for _, row in rows]
+            attr = getattr(User, column)
+            taken[column] = {value for (value,) in db.query(attr).filter(attr.in_(values))} if values else set()
+        kept = []
+        for line_no, row in rows:
+            conflict = next(
+                (detail for column, detail in UNIQUE_VIOLATIONS if getattr(row, column) in taken[column]),
+                None,
+            )
+            if conflict:
+                self._reject(line_no, conflict)
+            else:
+                kept.append((line_no, row))
+        return kept
+
+    def hash_passwords(self, rows: list[tuple[int, UserImportRow]]) -> None:
+        plain = [row for _, row in rows if not row.hashed_password]
+        for row, hashed in zip(plain, self.hash_many([row.password for row in plain])):
+            row.hashed_password = hashed
+
+    @staticmethod
+    def _user_values(row: UserImportRow) -> dict:
+        return {
+            "email": row.email,
+            "username": row.username,
+            "hashed_password": row.hashed_password,
+            "first_name": row.first_name,
+            "last_name": row.last_name,
+            "phone_number": row.phone_number,
+            "country": row.country,
+            "city": row.city,
+            "display_name": row.display_name
+            or f"{row.first_name} {row.last_name}".strip()
+            or row.username,
+            "role": row.role,
+            "is_active": True,
+        }
+
+    @staticmethod
+    def _account_values(user_id: int) -> dict:
+        return {"user_id": user_id, "balance": 0, "card_number": None, "card_active": False}
+
+    def insert(self, db: Session, rows: list[tuple[int, UserImportRow]]) -> None:
+        if not rows:
+            return
+        try:
+            user_ids = db.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [self._user_values(row) for _, row in rows],
+            ).scalars().all()
+            db.execute(insert(Account), [self._account_values(user_id) for user_id in user_ids])
+            db.commit()
+            self.created += len(user_ids)
+        except IntegrityError:
+            # Someone registered one of these users since drop_existing ran;
+            # fall back to row-by-row so only the clashing rows are lost.
+            db.rollback()
+            for line_no, row in rows:
+                self._insert_one(db, line_no, row)
+
+    def _insert_one(self, db: Session, line_no: int, row: UserImportRow) -> None:
+        try:
+            user_id = db.execute(insert(User).returning(User.id), [self._user_values(row)]).scalar_one()
+            db.execute(insert(Account), [self._account_values(user_id)])
+            db.commit()
+            self.created += 1
+        except IntegrityError as exc:
+            db.rollback()
+            self._reject(line_no, unique_violation_detail(exc) or "Conflicts with an existing user")
+
+    def report(self) -> dict:
+        errors = sorted(self.errors, key=lambda error: error["line"])
+        return {"created": self.created, "skipped": self.skipped, "errors": errors}
@@ -0,0 +1,57 @@
+"""Fill user_daily_totals from the transactions table.
+
+Run once after migration 7 to cover the history from before the aggregate was
+maintained. It can be run again later to repair a range. Each chunk of
+--chunk-days days is deleted and recomputed in its own transaction. While a
+chunk is rebuilt, new transfers wait for it, so ranges that include today are
+safe too.
+
+    python backfill_daily_totals.py
+    python backfill_daily_totals.py --since 2024-01-01 --until 2024-07-01 --chunk-days 7
+"""
+import argparse
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import app.main  # noqa: F401  (registers every mapper)
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.models.transaction import Transaction
+from app.utils.analytics import rebuild
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", type=date.fromisoformat, help="first day (default: oldest transaction)")
+    parser.add_argument("--until", type=date.fromisoformat, help="day after the last one (default: tomorrow, UTC)")
+    parser.add_argument("--chunk-days", type=int, default=31)
+    args = parser.parse_args(argv)
+
+    since = args.since
+    if since is None:
+        with SessionLocal() as db:
+            oldest = db.query(func.min(Transaction.created_at)).scalar()
+        if oldest is None:
+            print("no transactions to backfill")
+            return 0
+        since = oldest.date()
+    until = args.until or datetime.utcnow().date() + timedelta(days=1)
+
+    started = time.perf_counter()
+    total = 0
+    day = since
+    while day < until:
+        chunk_end = min(day + timedelta(days=args.chunk_days), until)
+        with SessionLocal() as db:
+            rows = rebuild(db, datetime.combine(day, datetime.min.time()), datetime.combine(chunk_end, datetime.min.time()))
+        total += rows
+        print(f"{day} .. {chunk_end}: {rows} rows")
+        day = chunk_end
+    print(f"done: {total} rows in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
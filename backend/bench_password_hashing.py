@@ -0,0 +1,117 @@
+"""Login throughput and collateral latency: inline bcrypt vs the password pool.
+
+Simulates a login storm (CONCURRENCY request threads verifying passwords, like
+the sync routes on the AnyIO threadpool) while a probe thread does a small
+pure-Python unit of work every few milliseconds, standing in for a balance read
+on the same worker. Prints logins/s, logins/s per core and the probe latency.
+
+    BCRYPT_ROUNDS=12 python bench_password_hashing.py --seconds 10
+    python bench_password_hashing.py --workers 4 --concurrency 40
+
+No database is needed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.password_pool import PasswordPool, PasswordPoolBusy
+from app.utils.security import BCRYPT_ROUNDS, hash_password, verify_password
+
+PROBE_INTERVAL = 0.005
+
+
+def _probe_work() -> None:
+    # Roughly what serializing a small account response costs.
+    json.dumps([{"id": i, "balance": str(i * 1.01), "currency": "EUR"} for i in range(50)])
+
+
+def run(mode: str, verify, seconds: float, concurrency: int) -> dict:
+    stop = threading.Event()
+    logins = 0
+    rejected = 0
+    counter_lock = threading.Lock()
+    probe_latencies: list[float] = []
+
+    def storm():
+        nonlocal logins, rejected
+        while not stop.is_set():
+            try:
+                verify()
+            except PasswordPoolBusy:
+                with counter_lock:
+                    rejected += 1
+                time.sleep(0.01)
+                continue
+            with counter_lock:
+                logins += 1
+
+    def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            _probe_work()
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(PROBE_INTERVAL)
+
+    cpu_start = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency + 1) as executor:
+        executor.submit(probe)
+        for _ in range(concurrency):
+            executor.submit(storm)
+        time.sleep(seconds)
+        stop.set()
+    elapsed = time.perf_counter() - started
+
+    cores = os.cpu_count() or 1
+    probe_latencies.sort()
+    p99 = probe_latencies[int(len(probe_latencies) * 0.99) - 1] if probe_latencies else 0.0
+    return {
+        "mode": mode,
+        "logins_per_s": round(logins / elapsed, 1),
+        "logins_per_s_per_core": round(logins / elapsed / cores, 1),
+        "rejected_503": rejected,
+        "parent_cpu_s": round(time.process_time() - cpu_start, 2),
+        "probe_p50_ms": round(statistics.median(probe_latencies) * 1000, 3) if probe_latencies else 0.0,
+        "probe_p99_ms": round(p99 * 1000, 3),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--concurrency", type=int, default=40, help="simulated request threads")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="pool processes")
+    parser.add_argument("--max-pending", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    hashed = hash_password("correct horse battery staple")
+    print(f"bcrypt rounds={BCRYPT_ROUNDS} cores={os.cpu_count()} concurrency={args.concurrency}")
+
+    results = [run("inline", lambda: verify_password("correct horse battery staple", hashed),
+                   args.seconds, args.concurrency)]
+
+    pool = PasswordPool(workers=args.workers, max_pending=args.max_pending or args.workers * 8)
+    pool.start()
+    pool.run(verify_password, "warm up", hashed)
+    try:
+        results.append(run(
+            f"pool({args.workers})",
+            lambda: pool.run(verify_password, "correct horse battery staple", hashed),
+            args.seconds,
+            args.concurrency,
+        ))
+    finally:
+        pool.stop()
+
+    for result in results:
+        print("  ".join(f"{key}={value}" for key, value in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,224 @@
+"""Query-plan regression check for the transactions hot paths.
+
+Runs EXPLAIN on the history query (offset and cursor pages) and the
+duplicate-submission check against DATABASE_URL and fails (exit 1) if either
+stops using the composite (party, created_at, id) indexes. Works on Postgres
+and SQLite. On Postgres it also checks that admin searches by date range and
+note use the created_at and trigram indexes rather than a sequential scan;
+the note check is skipped when the pg_trgm extension is not installed.
+
+    python check_query_plans.py --seed --users 2000 --transactions 500000
+    python check_query_plans.py
+
+--seed fills the database with synthetic users and transactions first; only
+point it at a throwaway database.
+"""
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import event, func, insert, text
+
+from app.database import SessionLocal, engine
+from app.migrations import migrate
+from app.models.transaction import Transaction, TxType
+from app.models.user import User, RoleEnum
+from app.api.transactions import _duplicate_query, _history_query
+from app.utils.transaction_search import SearchFilters, search_query
+
+SENDER_INDEX = "ix_transactions_sender_created"
+RECEIVER_INDEX = "ix_transactions_receiver_created"
+CREATED_INDEX = "ix_transactions_created_at"
+TRGM_INDEX = "ix_transactions_note_trgm"
+BATCH = 10_000
+
+
+def seed(db, users: int, transactions: int) -> None:
+    start_id = (db.query(func.max(User.id)).scalar() or 0) + 1
+    rows = [
+        {
+            "email": f"plancheck_{i}@example.com",
+            "username": f"plancheck_{i}",
+            "hashed_password": "!",
+            "first_name": "Plan",
+            "last_name": str(i),
+            "phone_number": f"+999{i:09d}",
+            "role": RoleEnum.user,
+            "is_active": True,
+            "created_at": datetime.utcnow(),
+        }
+        for i in range(start_id, start_id + users)
+    ]
+    for i in range(0, len(rows), BATCH):
+        db.execute(insert(User), rows[i:i + BATCH])
+    user_ids = [uid for (uid,) in db.query(User.id).filter(User.username.like("plancheck_%"))]
+
+    now = datetime.utcnow()
+    # A skewed distribution, so a few "heavy" users own long histories.
+    weights = [1.0 / (rank + 1) for rank in range(len(user_ids))]
+    batch = []
+    for n in range(transactions):
+        sender, receiver = random.choices(user_ids, weights=weights, k=2)
+        top_up = sender == receiver
+        batch.append(
+            {
+                "sender_id": None if top_up else sender,
+                "receiver_id": receiver,
+                "amount": Decimal(random.randint(1, 50_000)) / 100,
+                "note": f"invoice {n}" if n % 3 == 0 else None,
+                "created_at": now - timedelta(seconds=random.randint(0, 365 * 86400)),
+                "tx_type": TxType.received if top_up else TxType.sent,
+            }
+        )
+        if len(batch) == BATCH or n == transactions - 1:
+            db.execute(insert(Transaction), batch)
+            batch = []
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+
+def explain(db, query) -> str:
+    """Run query once to capture the exact SQL and bound parameters, then EXPLAIN it."""
+    conn = db.connection()
+    captured = []
+
+    def grab(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", grab)
+    try:
+        query.all()
+    finally:
+        event.remove(conn, "before_cursor_execute", grab)
+
+    statement, parameters = captured[-1]
+    if conn.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+    return "\n".join(row[0] for row in rows)
+
+
+def full_scan_markers(dialect: str) -> list[str]:
+    if dialect == "sqlite":
+        return ["SCAN transactions", "MULTI-INDEX OR"]
+    return ["Seq Scan on transactions", "BitmapOr"]
+
+
+def check(name: str, plan: str, dialect: str, all_of=(), any_of=()) -> bool:
+    problems = [f"missing {index}" for index in all_of if index not in plan]
+    if any_of and not any(index in plan for index in any_of):
+        problems.append(f"uses none of {', '.join(any_of)}")
+    problems += [f"found {marker!r}" for marker in full_scan_markers(dialect) if marker in plan]
+    status = "ok" if not problems else "FAIL: " + ", ".join(problems)
+    print(f"[{status}] {name}")
+    if problems:
+        print("    " + plan.replace("\n", "\n    "))
+    return not problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", action="store_true", help="insert synthetic data first")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--transactions", type=int, default=200_000)
+    args = parser.parse_args(argv)
+
+    migrate(engine)
+    db = SessionLocal()
+    try:
+        if args.seed:
+            seed(db, args.users, args.transactions)
+
+        dialect = db.get_bind().dialect.name
+        heavy_user = (
+            db.query(Transaction.receiver_id)
+            .group_by(Transaction.receiver_id)
+            .order_by(func.count().desc())
+            .limit(1)
+            .scalar()
+        )
+        if heavy_user is None:
+            print("no transactions found; run with --seed against a throwaway database")
+            return 1
+
+        ok = True
+        ok &= check(
+            "history (all)",
+            explain(db, _history_query(db, heavy_user, None, 50).limit(50)),
+            dialect,
+            all_of=[SENDER_INDEX, RECEIVER_INDEX],
+        )
+        ok &= check(
+            "history (received, deep page)",
+            explain(db, _history_query(db, heavy_user, TxType.received, 1_050).offset(1_000).limit(50)),
+            dialect,
+            all_of=[SENDER_INDEX, RECEIVER_INDEX],
+        )
+        newest = _history_query(db, heavy_user, None, 1).first()
+        ok &= check(
+            "history (cursor page)",
+            explain(db, _history_query(db, heavy_user, None, 51, (newest.created_at, newest.id)).limit(51)),
+            dialect,
+            all_of=[SENDER_INDEX, RECEIVER_INDEX],
+        )
+
+        transfer_check = _duplicate_query(
+            db,
+            sender_id=heavy_user,
+            receiver_id=heavy_user + 1,
+            amount=Decimal("10.00"),
+            tx_type=TxType.sent,
+        )
+        top_up_check = _duplicate_query(
+            db,
+            sender_id=None,
+            receiver_id=heavy_user,
+            amount=Decimal("10.00"),
+            tx_type=TxType.received,
+            note="Top up via card",
+        )
+        # Either party index narrows a transfer to one user's last few seconds.
+        ok &= check(
+            "duplicate check (transfer)",
+            explain(db, transfer_check.limit(1)),
+            dialect,
+            any_of=[SENDER_INDEX, RECEIVER_INDEX],
+        )
+        ok &= check(
+            "duplicate check (top up)",
+            explain(db, top_up_check.limit(1)),
+            dialect,
+            any_of=[RECEIVER_INDEX],
+        )
+
+        if dialect == "postgresql":
+            newest_at = db.query(func.max(Transaction.created_at)).scalar()
+            day = SearchFilters(start=newest_at - timedelta(days=31), end=newest_at - timedelta(days=30))
+            ok &= check(
+                "admin search (one day)",
+                explain(db, search_query(db, day, 51).limit(51)),
+                dialect,
+                all_of=[CREATED_INDEX],
+            )
+            # Migration 8 skips the trigram index when pg_trgm cannot be installed.
+            has_trgm = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar()
+            if has_trgm:
+                ok &= check(
+                    "admin search (note)",
+                    explain(db, search_query(db, SearchFilters(note="invoice 123"), 51).limit(51)),
+                    dialect,
+                    all_of=[TRGM_INDEX],
+                )
+            else:
+                print("[skip] admin search (note): pg_trgm is not installed")
+        return 0 if ok else 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""Fold settled ledger entries into balance_checkpoints.
+
+API workers do not do this themselves. Run one copy of this job next to them,
+as a service with --interval or from cron without it:
+
+    python checkpoint_ledger.py                 # one pass
+    python checkpoint_ledger.py --interval 60   # every 60 s until interrupted
+
+A second copy is harmless on Postgres, where runs take an advisory lock, but
+it does no useful work.
+"""
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime
+
+import app.main  # noqa: F401  (registers every mapper)
+from app.utils.ledger import checkpoint_balances
+
+logger = logging.getLogger("checkpoint_ledger")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=float, default=0, help="seconds between passes (default: run once)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    while True:
+        try:
+            logger.info("checkpointed %d books", checkpoint_balances(datetime.utcnow()))
+        except Exception:
+            if not args.interval:
+                raise
+            logger.exception("checkpoint pass failed")
+        if not args.interval:
+            return 0
+        try:
+            time.sleep(args.interval)
+        except KeyboardInterrupt:
+            return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
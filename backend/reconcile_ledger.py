@@ -0,0 +1,41 @@
+"""Check every account and card balance against the ledger.
+
+Compares Account.balance and Card.balance with each book's ledger balance (its
+checkpoint plus the entries since), in parallel chunks of book ids, and checks
+that all entries sum to zero. Exits 1 on any mismatch.
+
+    python reconcile_ledger.py
+    python reconcile_ledger.py --workers 8 --chunk 50000 --checkpoint
+
+--checkpoint first folds the settled entries into balance_checkpoints, as
+checkpoint_ledger.py does.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import app.main  # noqa: F401  (registers every mapper)
+from app.utils.ledger import LEDGER_RECONCILE_CHUNK, LEDGER_RECONCILE_WORKERS, checkpoint_balances, reconcile
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk", type=int, default=LEDGER_RECONCILE_CHUNK, help="book ids per chunk")
+    parser.add_argument("--workers", type=int, default=LEDGER_RECONCILE_WORKERS)
+    parser.add_argument("--checkpoint", action="store_true", help="advance checkpoints first")
+    args = parser.parse_args(argv)
+
+    if args.checkpoint:
+        print(f"checkpointed {checkpoint_balances(datetime.utcnow())} books")
+    started = time.perf_counter()
+    report = reconcile(args.chunk, args.workers)
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(report, indent=2))
+    return 0 if not report["mismatched"] and Decimal(report["imbalance"]) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
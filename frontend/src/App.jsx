@@ -24,14 +24,12 @@ import AccountControlPage from './pages/AccountControlPage';
 import AccountManagerWorkspace from './pages/AccountManagerWorkspace';
 import {
   clearSessionToken,
+  dashboard as fetchDashboard,
   getSessionToken,
   listContacts,
-  listCards,
   login as loginRequest,
   logout as logoutRequest,
   me as fetchProfile,
-  myAccount as fetchAccount,
-  myTransactions as fetchTransactions,
   orderCard as orderCardRequest,
   register as registerRequest,
   saveSessionToken,
@@ -220,13 +218,14 @@ const App = () => {
     setLoadingData(true);
     setAppError('');
     try {
-      const [profile, account, transactions, contactsResponse, cardsResponse] = await Promise.all([
+      const [profile, overview, contactsResponse] = await Promise.all([
         fetchProfile(),
-        fetchAccount().catch(() => null),
-        fetchTransactions(20).catch(() => []),
+        fetchDashboard({ sections: ['account', 'transactions', 'cards'], transactionsLimit: 20 }).catch(() => null),
         listContacts().catch(() => []),
-        listCards().catch(() => []),
       ]);
+      const account = overview?.account ?? null;
+      const transactions = overview?.transactions ?? [];
+      const cardsResponse = overview?.cards ?? [];
 
       const fullName = `${profile.first_name ?? ''} ${profile.last_name ?? ''}`.trim() || profile.username;
       const displayName = profile.display_name?.trim() || fullName || profile.username;
@@ -438,7 +437,7 @@ const App = () => {
     async ({ username, password }) => {
       try {
         const response = await loginRequest({ username, password });
-        saveSessionToken(response.session_token);
+        saveSessionToken(response.session_token, response.refresh_token ?? null);
         await hydrateUser();
         setCurrentPage('dashboard');
       } catch (error) {
@@ -450,9 +449,9 @@ const App = () => {
   );
 
   const handleTopUp = useCallback(
-    async ({ amount, cardId }) => {
+    async ({ amount, cardId, idempotencyKey }) => {
       try {
-        await topUpRequest({ amount, card_id: cardId });
+        await topUpRequest({ amount, card_id: cardId }, idempotencyKey);
         await hydrateUser();
       } catch (error) {
         console.error('Unable to top up balance', error);
@@ -1,7 +1,7 @@
 import React, { useEffect, useMemo, useState } from 'react';
 import { DollarSign, ArrowDownRight, ArrowUpRight, Wifi, CreditCard, X } from 'lucide-react';
 import RecipientModal from '../components/RecipientModal';
-import { addRecipient, verifyRecipient } from '../services/apiClient';
+import { addRecipient, newIdempotencyKey, verifyRecipient } from '../services/apiClient';
 
 const SPENDING_COLORS = ['bg-blue-500', 'bg-purple-500', 'bg-green-500', 'bg-orange-500'];
 
@@ -27,6 +27,8 @@ const DashboardPage = ({
   const [topUpCardId, setTopUpCardId] = useState(null);
   const [topUpError, setTopUpError] = useState('');
   const [topUpLoading, setTopUpLoading] = useState(false);
+  // One key per opened top-up dialog, so a resubmitted top up is not applied twice.
+  const [topUpKey, setTopUpKey] = useState(null);
   const [showTopUpModal, setShowTopUpModal] = useState(false);
 
   const { labels: chartDays, dailyIncome, dailyExpense, dailyNet } = useMemo(() => {
@@ -192,8 +194,9 @@ const DashboardPage = ({
     }
     try {
       setTopUpLoading(true);
-      await onTopUp({ amount: amountNum, cardId });
+      await onTopUp({ amount: amountNum, cardId, idempotencyKey: topUpKey });
       setTopUpAmount('');
+      setTopUpKey(null);
       setShowTopUpModal(false);
     } catch (error) {
       setTopUpError(error?.detail || error?.message || 'Unable to top up balance');
@@ -234,6 +237,7 @@ const DashboardPage = ({
       setTopUpCardId(activeCards[0].id);
     }
     setTopUpError('');
+    setTopUpKey(newIdempotencyKey());
     setShowTopUpModal(true);
   };
 
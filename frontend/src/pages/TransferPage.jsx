@@ -3,6 +3,7 @@ import { ArrowRight, CreditCard, Calendar, Repeat, FileUp, Save } from 'lucide-r
 import {
   searchUsers,
   sendTransfer,
+  newIdempotencyKey,
   listRecipients,
   addRecipient,
   verifyRecipient,
@@ -23,6 +24,9 @@ const TransferPage = ({ contacts = [], accountInfo, onTransferComplete }) => {
   const [frequency, setFrequency] = useState('monthly');
   const [errors, setErrors] = useState({});
   const [showConfirm, setShowConfirm] = useState(false);
+  // One key per confirmed transfer: retries reuse it, so a double click or a
+  // retry after a network error cannot send the money twice.
+  const [transferKey, setTransferKey] = useState(null);
   const [showReceipt, setShowReceipt] = useState(false);
   const [otpCode, setOtpCode] = useState('');
   const [purpose, setPurpose] = useState('personal');
@@ -227,11 +231,14 @@ const TransferPage = ({ contacts = [], accountInfo, onTransferComplete }) => {
     setTransferError('');
     const amountNumeric = sendAmount;
     try {
-      const response = await sendTransfer({
-        receiver_id: Number(recipientId),
-        amount: amountNumeric,
-        description: note || undefined,
-      });
+      const response = await sendTransfer(
+        {
+          receiver_id: Number(recipientId),
+          amount: amountNumeric,
+          description: note || undefined,
+        },
+        transferKey
+      );
       const reference = response?.reference || `DB-${Date.now().toString().slice(-6)}`;
       if (saveAsTemplate && templateName.trim()) {
         const id = `t${Date.now()}`;
@@ -244,6 +251,7 @@ const TransferPage = ({ contacts = [], accountInfo, onTransferComplete }) => {
       setCompletedRecipient(recipient);
       setCompletedAmount(amountNumeric);
       setShowConfirm(false);
+      setTransferKey(null);
       setShowReceipt(true);
       setOtpCode('');
       setTemplateName('');
@@ -274,6 +282,7 @@ const TransferPage = ({ contacts = [], accountInfo, onTransferComplete }) => {
     if (schedule === 'later' && !scheduleDate) nextErrors.scheduleDate = 'Pick a date';
     setErrors(nextErrors);
     if (Object.keys(nextErrors).length) return;
+    setTransferKey(newIdempotencyKey());
     setShowConfirm(true);
   };
 
@@ -2,24 +2,68 @@ const API_BASE_URL =
   import.meta.env?.VITE_API_BASE_URL?.replace(/\/$/, '') ?? 'http://127.0.0.1:8000';
 
 const TOKEN_STORAGE_KEY = 'dicebank.session';
+// Only set when the server runs AUTH_TOKEN_MODE=signed.
+const REFRESH_STORAGE_KEY = 'dicebank.refresh';
 
 const isBrowser = () => typeof window !== 'undefined';
 
 export const getSessionToken = () => (isBrowser() ? localStorage.getItem(TOKEN_STORAGE_KEY) : null);
 
-export const saveSessionToken = (token) => {
+const getRefreshToken = () => (isBrowser() ? localStorage.getItem(REFRESH_STORAGE_KEY) : null);
+
+// Pass refreshToken (null to forget it) on login; a refreshed access token
+// keeps the stored one.
+export const saveSessionToken = (token, refreshToken) => {
   if (isBrowser()) {
     localStorage.setItem(TOKEN_STORAGE_KEY, token);
+    if (refreshToken) {
+      localStorage.setItem(REFRESH_STORAGE_KEY, refreshToken);
+    } else if (refreshToken === null) {
+      localStorage.removeItem(REFRESH_STORAGE_KEY);
+    }
   }
 };
 
 export const clearSessionToken = () => {
   if (isBrowser()) {
     localStorage.removeItem(TOKEN_STORAGE_KEY);
+    localStorage.removeItem(REFRESH_STORAGE_KEY);
+  }
+};
+
+let refreshInFlight = null;
+
+// Trades the refresh token for a new access token; concurrent callers share
+// one request. Resolves to the new token, or null if there is none.
+const refreshAccessToken = () => {
+  const refreshToken = getRefreshToken();
+  if (!refreshToken) return Promise.resolve(null);
+  if (!refreshInFlight) {
+    refreshInFlight = fetch(`${API_BASE_URL}/api/auth/refresh`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    })
+      .then(async (response) => {
+        if (response.status === 401) {
+          // The refresh session expired or was revoked: the user is logged out.
+          clearSessionToken();
+          return null;
+        }
+        const payload = response.ok ? await response.json().catch(() => null) : null;
+        if (!payload?.access_token) return null;
+        saveSessionToken(payload.access_token);
+        return payload.access_token;
+      })
+      .catch(() => null)
+      .finally(() => {
+        refreshInFlight = null;
+      });
   }
+  return refreshInFlight;
 };
 
-export async function apiFetch(path, options = {}) {
+export async function apiFetch(path, options = {}, retried = false) {
   const token = getSessionToken();
   const isFormData = options.body instanceof FormData;
   const headers = {
@@ -39,6 +83,13 @@ export async function apiFetch(path, options = {}) {
     headers,
   });
 
+  // Signed access tokens are short-lived: refresh once and replay the request.
+  if (response.status === 401 && !retried && getRefreshToken()) {
+    if (await refreshAccessToken()) {
+      return apiFetch(path, options, true);
+    }
+  }
+
   const contentType = response.headers.get('content-type');
   const isJson = contentType && contentType.includes('application/json');
   const payload = isJson ? await response.json().catch(() => null) : null;
@@ -66,18 +117,31 @@ export const register = (payload) =>
     body: JSON.stringify(payload),
   });
 
-export const logout = () =>
-  apiFetch('/api/auth/logout', {
+export const logout = () => {
+  // Revoke the refresh session too, not only the current access token.
+  const refreshToken = getRefreshToken();
+  return apiFetch('/api/auth/logout', {
     method: 'POST',
+    ...(refreshToken ? { body: JSON.stringify({ refresh_token: refreshToken }) } : {}),
   }).catch((err) => {
     
     console.warn('Logout request failed', err);
   });
+};
 
 export const me = () => apiFetch('/api/auth/me');
 
 export const myAccount = () => apiFetch('/api/accounts/me');
 
+// One round trip for the landing page; pass a subset of sections to fetch less.
+export const dashboard = ({ sections, transactionsLimit } = {}) => {
+  const params = new URLSearchParams();
+  if (sections?.length) params.set('sections', sections.join(','));
+  if (transactionsLimit) params.set('transactions_limit', String(transactionsLimit));
+  const query = params.toString();
+  return apiFetch(`/api/dashboard${query ? `?${query}` : ''}`);
+};
+
 export const myTransactions = (limit = 20, direction) => {
   const params = new URLSearchParams();
   if (limit) params.set('limit', String(limit));
@@ -86,6 +150,14 @@ export const myTransactions = (limit = 20, direction) => {
   return apiFetch(`/api/transactions${query ? `?${query}` : ''}`);
 };
 
+export const transactionAnalytics = ({ period = 'month', start, end, top } = {}) => {
+  const params = new URLSearchParams({ period });
+  if (start) params.set('start', start);
+  if (end) params.set('end', end);
+  if (top) params.set('top', String(top));
+  return apiFetch(`/api/transactions/analytics?${params.toString()}`);
+};
+
 export const listContacts = () => apiFetch('/api/contacts');
 
 export const listCards = () => apiFetch('/api/cards');
@@ -105,15 +177,33 @@ export const updateCardStatus = (cardId, status) =>
 export const searchUsers = (query) =>
   apiFetch(`/api/users/search?query=${encodeURIComponent(query)}`);
 
-export const sendTransfer = (payload) =>
+// Create one key per transfer intent (e.g. when the confirm step opens) and
+// reuse it for every retry of that intent, so the server replays the first
+// result instead of moving the money twice. Without a key every request is
+// a new payment.
+export const newIdempotencyKey = () => crypto.randomUUID();
+
+const idempotencyHeaders = (idempotencyKey) =>
+  idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {};
+
+export const sendTransfer = (payload, idempotencyKey) =>
   apiFetch('/api/transactions/send', {
     method: 'POST',
+    headers: idempotencyHeaders(idempotencyKey),
     body: JSON.stringify(payload),
   });
 
-export const topUp = ({ amount, card_id }) =>
+export const sendBatchTransfer = (items, mode = 'all_or_nothing', idempotencyKey) =>
+  apiFetch('/api/transactions/batch', {
+    method: 'POST',
+    headers: idempotencyHeaders(idempotencyKey),
+    body: JSON.stringify({ items, mode }),
+  });
+
+export const topUp = ({ amount, card_id }, idempotencyKey) =>
   apiFetch('/api/transactions/topup', {
     method: 'POST',
+    headers: idempotencyHeaders(idempotencyKey),
     body: JSON.stringify({ amount, card_id }),
   });
 
@@ -154,6 +244,15 @@ export const adminListTransactions = (userId, limit = 20) => {
   return apiFetch(`/api/transactions/admin?${params.toString()}`);
 };
 
+export const adminSearchTransactions = (filters = {}) => {
+  const params = new URLSearchParams();
+  Object.entries(filters).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') params.set(key, String(value));
+  });
+  const query = params.toString();
+  return apiFetch(`/api/transactions/admin/search${query ? `?${query}` : ''}`);
+};
+
 export const updateProfile = (payload) =>
   apiFetch('/api/users/me', {
     method: 'PUT',